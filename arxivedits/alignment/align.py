@@ -74,6 +74,50 @@ def to_diff_with_ids(
     return diff_with_ids
 
 
+def get_boring_verdicts(
+    line_diff_with_ids: List[Tuple[int, str, List[SentenceID]]],
+    arxivid: str,
+    version1: int,
+    version2: int,
+    lines1: List[str],
+    lines2: List[str],
+) -> List[bool]:
+    """
+    Looks up the stored is_boring() flag for every line in a diff, instead of running the filters again. lines1 and lines2 are the lines the diff was made from; stored flags that weren't computed for them are computed again.
+    """
+    flags1 = filters.get_sentence_flags(arxivid, version1, lines1)
+    flags2 = filters.get_sentence_flags(arxivid, version2, lines2)
+
+    if isinstance(flags1, Exception):
+        raise flags1
+
+    if isinstance(flags2, Exception):
+        raise flags2
+
+    boring1 = flags1["flags"] & filters.BORING
+    boring2 = flags2["flags"] & filters.BORING
+
+    verdicts = []
+
+    line_index_1 = 0
+    line_index_2 = 0
+
+    for code, _, _ in line_diff_with_ids:
+        if code in [-1, 0]:
+            verdicts.append(bool(boring1[line_index_1]))
+            line_index_1 += 1
+        else:
+            verdicts.append(bool(boring2[line_index_2]))
+
+        if code in [0, 1]:
+            line_index_2 += 1
+
+    # line_diff() drops the blank line at the end of each document
+    assert line_index_1 <= len(boring1) and line_index_2 <= len(boring2)
+
+    return verdicts
+
+
 def identical_align(
     arxivid: str, version1: int, version2: int
 ) -> Tuple[
@@ -177,6 +221,10 @@ def easy_align(
 
     line_diff_with_ids = to_diff_with_ids(line_diff, arxivid, version1, version2)
 
+    boring_verdicts = get_boring_verdicts(
+        line_diff_with_ids, arxivid, version1, version2, lines1, lines2
+    )
+
     idx_and_content_grouped_by_paragraph = []
     current_paragraph = []
     aligned_paragraphs = []
@@ -216,27 +264,25 @@ def easy_align(
             i for i, sentence in enumerate(pg) if sentence.diff.code == 1
         ]
 
+        # checked once per sentence, not once per pair
+        is_boring = {
+            i: boring_verdicts[pg[i].index]
+            for i in removed_sent_indices + added_sent_indices
+        }
+
         for removed_sent_idx in removed_sent_indices:
-            if filters.is_title_or_newline(pg[removed_sent_idx].diff.sentence):
+            if is_boring[removed_sent_idx]:
                 pg[removed_sent_idx].status = STATUS.BORING  # changed from Chao's code
                 continue
 
-            if not filters.sent_filter(pg[removed_sent_idx].diff.sentence):
-                pg[removed_sent_idx].status = STATUS.BORING
-                continue
-
             for added_sent_idx in added_sent_indices:
 
-                if filters.is_title_or_newline(pg[added_sent_idx].diff.sentence):
+                if is_boring[added_sent_idx]:
                     pg[
                         added_sent_idx
                     ].status = STATUS.BORING  # changed from Chao's code
                     continue
 
-                if not filters.sent_filter(pg[added_sent_idx].diff.sentence):
-                    pg[added_sent_idx].status = STATUS.BORING
-                    continue
-
                 the_sent_got_removed = pg[removed_sent_idx].diff.sentence
                 the_sent_got_added = pg[added_sent_idx].diff.sentence
 
@@ -286,20 +332,20 @@ def easy_align_outside_doc(
 
     aligned_sentences: List[SentenceStruct] = []
 
-    for removed_sentence in removed_sentences:
-        if filters.is_title_or_newline(removed_sentence.diff.sentence):
-            continue
-
-        if not filters.sent_filter(removed_sentence.diff.sentence):
-            continue
+    # both lists already passed sent_filter(), so only titles are left to skip
+    removed_sentences = [
+        sentence
+        for sentence in removed_sentences
+        if not filters.is_title_or_newline(sentence.diff.sentence)
+    ]
+    added_sentences = [
+        sentence
+        for sentence in added_sentences
+        if not filters.is_title_or_newline(sentence.diff.sentence)
+    ]
 
+    for removed_sentence in removed_sentences:
         for added_sentence in added_sentences:
-            if filters.is_title_or_newline(added_sentence.diff.sentence):
-                continue
-
-            if not filters.sent_filter(added_sentence.diff.sentence):
-                continue
-
             the_sent_got_removed = removed_sentence.diff.sentence
             the_sent_got_added = added_sentence.diff.sentence
 
@@ -441,6 +487,12 @@ class Alignment:
                 f"{sentence_id} is not version {self.version1} or {self.version2}"
             )
 
+    def is_boring(self, sentence_id: SentenceID) -> bool:
+        """
+        Checks whether a sentence is boring, using the flags stored with the sentences.
+        """
+        return filters.is_boring_id(sentence_id, self.lookup[sentence_id])
+
     def get_unaligned(self) -> List[SentenceID]:
         """
         Returns a list of all the unaligned sentence ids, both from the first and second versions.
@@ -448,7 +500,7 @@ class Alignment:
         unaligned = [
             _id
             for _id in self.lookup
-            if not self.is_aligned(_id) and not filters.is_boring(self.lookup[_id])
+            if not self.is_aligned(_id) and not self.is_boring(_id)
         ]
 
         return unaligned
@@ -4,8 +4,9 @@ Module to visualize a heatmap of similarities between two versions of a document
 import os
 import numpy as np
 from enum import Enum
-from typing import Callable, Optional, Any
+from typing import Callable, Optional, Any, List
 
+from matplotlib import image
 from tqdm import tqdm
 
 from arxivedits import data, diff, util, similarity
@@ -19,8 +20,13 @@ from arxivedits.alignment.align import (
 ALIGN_MODE = Enum("ALIGN_MODE", ["ALL", "DIFF", "EASY", "GOLD"])
 LABEL = Enum("LABEL", ["ALIGNED", "UNKNOWN", "BORING"])
 
+BORING_VALUE = -1.0
+ALIGNED_VALUE = 1.0
 
-def make_cell(value: float, tip: Optional[str] = "") -> str:
+DIFF_SIM = 1  # index of diff_sim in the last axis of similarity.similarity_matrix()
+
+
+def make_cell(value: float, tip: Optional[str] = "", width: int = 1) -> str:
     """
     Makes a span.cell with a background color `color`.
 
@@ -31,12 +37,41 @@ def make_cell(value: float, tip: Optional[str] = "") -> str:
         Similarity of the cell.
     tip : str, optional
         If included, it will be made visibile when the mouse hovers over the cell. Could be the sentence pair's ids, or their actual content, etc.
+    width : int, optional
+        Number of cells the span covers.
     """
     color = make_color_code(value)
 
     tip_str = f' tip="{tip}"' if tip else ""
 
-    return f'<span class="cell"{tip_str} style="background-color: {color};"></span>'
+    width_str = f" width: {width * 5}px;" if width > 1 else ""
+
+    return f'<span class="cell"{tip_str} style="background-color: {color};{width_str}"></span>'
+
+
+def make_row(x: int, row: np.ndarray) -> str:
+    """
+    Makes the cells of a row of the table, with runs of cells of the same value merged into one wide cell.
+    """
+    boundaries = np.flatnonzero(row[1:] != row[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(row)]))
+
+    cells = []
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        value = row[start]
+
+        if value <= 0:
+            tip = None
+        elif end - start == 1:
+            tip = f"v1:{x} v2:{start}"
+        else:
+            tip = f"v1:{x} v2:{start}-{end - 1}"
+
+        cells.append(make_cell(value, tip=tip, width=end - start))
+
+    return "".join(cells)
 
 
 def make_color_code(value: float) -> str:
@@ -51,11 +86,86 @@ def make_color_code(value: float) -> str:
     elif value == 1:
         color = "#ff0000"
     else:
-        color = f"rgb({value * 255},0,0)"
+        color = f"rgb({round(value * 255)},0,0)"
 
     return color
 
 
+def quantize(table: np.ndarray) -> np.ndarray:
+    """
+    Rounds similarities to the 256 shades of red they're drawn with, so neighbouring cells of the same color can be merged.
+    """
+    return np.where(table == BORING_VALUE, BORING_VALUE, np.round(table * 255) / 255)
+
+
+def make_image(table: np.ndarray) -> np.ndarray:
+    """
+    Colors a table the same way as make_color_code(), as an (rows x columns x 3) RGB image.
+    """
+    rgb = np.zeros(table.shape + (3,), dtype=np.uint8)
+
+    rgb[:, :, 0] = np.round(np.clip(table, 0, 1) * 255)
+    rgb[table == BORING_VALUE] = 255
+
+    return rgb
+
+
+def get_similarities(
+    sents1: List[str],
+    sents2: List[str],
+    similarity_func: Optional[Callable[[str, str], float]] = None,
+) -> np.ndarray:
+    """
+    Scores every sentence in sents1 against every sentence in sents2 as a (len(sents1) x len(sents2)) array. Uses the batched diff similarity unless a similarity_func is given.
+    """
+    if not sents1 or not sents2:
+        return np.zeros((len(sents1), len(sents2)))
+
+    if not similarity_func:
+        return similarity.similarity_matrix(sents1, sents2)[:, :, DIFF_SIM]
+
+    return np.array(
+        [[similarity_func(sent1, sent2) for sent2 in sents2] for sent1 in sents1],
+        dtype=np.float64,
+    )
+
+
+def fill_alignment(
+    table: np.ndarray,
+    alignment: Alignment,
+    similarity_func: Optional[Callable[[str, str], float]] = None,
+) -> None:
+    """
+    Fills a table with ALIGNED_VALUE for aligned pairs, similarities for pairs where neither sentence is aligned, and BORING_VALUE for the rest.
+    """
+    ids1 = sorted(alignment.alignments1.keys())
+    ids2 = sorted(alignment.alignments2.keys())
+
+    rows = {_id: x for x, _id in enumerate(ids1)}
+    columns = {_id: y for y, _id in enumerate(ids2)}
+
+    unaligned1 = [x for x, _id in enumerate(ids1) if not alignment.is_aligned(_id)]
+    unaligned2 = [y for y, _id in enumerate(ids2) if not alignment.is_aligned(_id)]
+
+    table[np.ix_(np.array(unaligned1, dtype=int), np.array(unaligned2, dtype=int))] = (
+        get_similarities(
+            [alignment.lookup[ids1[x]] for x in unaligned1],
+            [alignment.lookup[ids2[y]] for y in unaligned2],
+            similarity_func,
+        )
+    )
+
+    for _id1, aligned in alignment.alignments1.items():
+        for _id2 in aligned:
+            if _id2 in columns:
+                table[rows[_id1], columns[_id2]] = ALIGNED_VALUE
+
+    for _id2, aligned in alignment.alignments2.items():
+        for _id1 in aligned:
+            if _id1 in rows:
+                table[rows[_id1], columns[_id2]] = ALIGNED_VALUE
+
+
 def make_table(
     arxivid: str,
     v1: int,
@@ -74,12 +184,9 @@ def make_table(
     use_cache : bool, optional
         If false, will recalculate the table. Otherwise, it will use the locally written file with the table.
     similarity_func : Callable[[str, str], float], optional
-        A function that takes two sentences and returns a similarity measure. If none is provided, then a diff-based algorithm will be used.
+        A function that takes two sentences and returns a similarity measure. If none is provided, then diff similarities are computed for all pairs at once with `similarity.similarity_matrix()`.
     """
 
-    if not similarity_func:
-        similarity_func = lambda x, y: similarity.get_similarity(x, y).diff_sim
-
     filename = os.path.join(
         data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-{mode}-table.npy",
     )
@@ -99,34 +206,13 @@ def make_table(
     lines1 = util.paragraphs_to_lines(pgs1)
     lines2 = util.paragraphs_to_lines(pgs2)
 
-    BORING_VALUE = -1.0
-    ALIGNED_VALUE = 1.0
-
-    table = np.full((len(lines1), len(lines2)), BORING_VALUE, dtype=np.float_)
+    table = np.full((len(lines1), len(lines2)), BORING_VALUE, dtype=np.float64)
 
     if mode == ALIGN_MODE.ALL:
-        for x, line1 in enumerate(lines1):
-            for y, line2 in enumerate(lines2):
-                table[x, y] = similarity_func(line1, line2)
+        table[:, :] = get_similarities(lines1, lines2, similarity_func)
     elif mode == ALIGN_MODE.DIFF:
         diff_alignment = Alignment(arxivid, v1, v2)
-        for x, _id1 in enumerate(sorted(diff_alignment.alignments1.keys())):
-            for y, _id2 in enumerate(sorted(diff_alignment.alignments2.keys())):
-                if (
-                    _id2 in diff_alignment.alignments1[_id1]
-                    or _id1 in diff_alignment.alignments2[_id2]
-                ):
-                    table[x, y] = ALIGNED_VALUE
-                    continue
-
-                if diff_alignment.is_aligned(_id1) or diff_alignment.is_aligned(_id2):
-                    table[x, y] = BORING_VALUE
-                    continue
-
-                table[x, y] = similarity_func(
-                    diff_alignment.lookup[_id1], diff_alignment.lookup[_id2]
-                )
-
+        fill_alignment(table, diff_alignment, similarity_func)
     elif mode == ALIGN_MODE.EASY:
         diff_alignment = Alignment(arxivid, v1, v2)
         easy_alignments = easy_align(arxivid, v1, v2)
@@ -136,41 +222,10 @@ def make_table(
         process_easy_align(easy_alignments_outside, diff_alignment)
         diff._hashable_line_diff.cache_clear()  # clear it after finishing a document
 
-        for x, _id1 in enumerate(sorted(diff_alignment.alignments1.keys())):
-            for y, _id2 in enumerate(sorted(diff_alignment.alignments2.keys())):
-                if (
-                    _id2 in diff_alignment.alignments1[_id1]
-                    or _id1 in diff_alignment.alignments2[_id2]
-                ):
-                    table[x, y] = ALIGNED_VALUE
-                    continue
-
-                if diff_alignment.is_aligned(_id1) or diff_alignment.is_aligned(_id2):
-                    table[x, y] = BORING_VALUE
-                    continue
-
-                table[x, y] = similarity_func(
-                    diff_alignment.lookup[_id1], diff_alignment.lookup[_id2]
-                )
+        fill_alignment(table, diff_alignment, similarity_func)
     elif mode == ALIGN_MODE.GOLD:
         gold_alignment = Alignment.load(arxivid, v1, v2)
-        for x, _id1 in enumerate(sorted(gold_alignment.alignments1.keys())):
-            for y, _id2 in enumerate(sorted(gold_alignment.alignments2.keys())):
-                if (
-                    _id2 in gold_alignment.alignments1[_id1]
-                    or _id1 in gold_alignment.alignments2[_id2]
-                ):
-                    table[x, y] = ALIGNED_VALUE
-                    continue
-
-                if gold_alignment.is_aligned(_id1) or gold_alignment.is_aligned(_id2):
-                    table[x, y] = BORING_VALUE
-                    continue
-
-                table[x, y] = similarity_func(
-                    gold_alignment.lookup[_id1], gold_alignment.lookup[_id2]
-                )
-
+        fill_alignment(table, gold_alignment, similarity_func)
     else:
         raise ValueError(f"Mode {mode} must be a valid ALIGN_MODE.")
 
@@ -218,31 +273,43 @@ POSTHTML = r"""</div>"""
 
 
 def write_heatmap(
-    arxivid: str, v1: int, v2: int, mode: ALIGN_MODE, filename: str = "", **kwargs: Any
+    arxivid: str,
+    v1: int,
+    v2: int,
+    mode: ALIGN_MODE,
+    filename: str = "",
+    png: bool = False,
+    **kwargs: Any,
 ) -> str:
     """
-    Given a document pair and an ALIGN_MODE, creates a heatmap of similarities and writes it to an HTML file.
+    Given a document pair and an ALIGN_MODE, creates a heatmap of similarities and writes it to an HTML file, or to a PNG file with one pixel per cell.
 
     Parameters
     ----------
     filename : str
         A different filename to use.
+    png : bool, optional
+        If true, writes a PNG instead of HTML.
     **kwargs :
         keyword arguments to pass to make_table.
     """
+    extension = "png" if png else "html"
+
     if not filename:
         filename = os.path.join(
-            data.VISUAL_DIR, "heatmaps", f"{arxivid}-{v1}-{v2}-heatmap.html",
+            data.VISUAL_DIR, "heatmaps", f"{arxivid}-{v1}-{v2}-heatmap.{extension}",
         )
 
     table = make_table(arxivid, v1, v2, mode, **kwargs)
 
+    if png:
+        image.imsave(filename, make_image(table))
+        return filename
+
     with open(filename, "w") as htmlfile:
         htmlfile.write(PREHTML)
-        for x, row in enumerate(table):
-            for y, value in enumerate(row):
-                tip = f"v1:{x} v2:{y}" if value > 0 else None
-                htmlfile.write(make_cell(value, tip=tip))
+        for x, row in enumerate(quantize(table)):
+            htmlfile.write(make_row(x, row))
             htmlfile.write("<br/>")
 
         htmlfile.write(POSTHTML)
@@ -0,0 +1,113 @@
+"""
+Microbenchmarks for the per-document regex hot paths (detex, sentence splitting and filters).
+
+```
+python -m arxivedits.benchmark [file.tex ...]
+```
+"""
+
+import re
+import sys
+import timeit
+from typing import Callable, Dict, List, Pattern, Any
+
+from arxivedits import filters
+from arxivedits.detex import constants, latex, opendetex
+
+NUMBER = 200  # calls per measurement
+
+PATTERNS: Dict[str, Pattern[str]] = {
+    name: value
+    for name, value in vars(constants).items()
+    if name.endswith("_PATTERN") and isinstance(value, re.Pattern)
+}
+
+SAMPLE_DOCUMENT = (
+    r"""\documentclass{article}
+\begin{document}
+\begin{abstract}
+We study $x$ and $y$ % a comment
+\end{abstract}
+\section{Introduction}
+"""
+    + "\n".join(
+        rf"Sentence {i} has math $a_{i}$ $b$ $c$ and a citation \cite{{ref{i}}}. % note"
+        "\n\n$$ e = mc^2 $$\n\n"
+        for i in range(200)
+    )
+    + "\n\\end{document}\n"
+)
+
+
+def seconds_per_call(func: Callable[[], Any], number: int = NUMBER) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def compare_patterns(text: str, number: int = NUMBER) -> Dict[str, Dict[str, float]]:
+    """
+    Times every compiled pattern in `detex.constants` against passing its source string to `re.sub` on each call, the way the hot paths used to.
+    """
+    results = {}
+
+    for name, pattern in PATTERNS.items():
+        uncompiled = seconds_per_call(
+            lambda: re.sub(pattern.pattern, "", text, flags=pattern.flags),
+            number,
+        )
+        compiled = seconds_per_call(lambda: pattern.sub("", text), number)
+        results[name] = {"uncompiled": uncompiled, "compiled": compiled}
+
+    return results
+
+
+def time_document(text: str, number: int = NUMBER) -> Dict[str, float]:
+    """
+    Times the per-document functions that use the compiled patterns.
+    """
+    cleaned = latex.clean(text)
+    sentences = [s for s in cleaned.split(". ") if s]
+
+    return {
+        "latex.clean": seconds_per_call(lambda: latex.clean(text), number),
+        "opendetex.postprocess": seconds_per_call(
+            lambda: opendetex.postprocess(cleaned), number
+        ),
+        # __wrapped__ skips the lru_cache, which would hide the cost after the first call
+        "filters.sent_filter": seconds_per_call(
+            lambda: [filters.sent_filter.__wrapped__(s) for s in sentences], number
+        ),
+    }
+
+
+def report(text: str, number: int = NUMBER) -> List[str]:
+    lines = [f"{'pattern':40} {'uncompiled (us)':>16} {'compiled (us)':>14}"]
+
+    for name, result in compare_patterns(text, number).items():
+        lines.append(
+            f"{name:40} {result['uncompiled'] * 1e6:16.1f} {result['compiled'] * 1e6:14.1f}"
+        )
+
+    lines.append("")
+    lines.append(f"{'function':40} {'per document (ms)':>16}")
+
+    for name, seconds in time_document(text, number).items():
+        lines.append(f"{name:40} {seconds * 1e3:16.3f}")
+
+    return lines
+
+
+def main() -> None:
+    documents = sys.argv[1:]
+
+    if not documents:
+        print("\n".join(report(SAMPLE_DOCUMENT)))
+        return
+
+    for filepath in documents:
+        with open(filepath) as file:
+            print(filepath)
+            print("\n".join(report(file.read(), number=20)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+A content-addressed cache for text transformations that are expensive to redo, like detexing. Values are keyed on a hash of their inputs, so identical inputs (such as byte-identical versions of a paper) are only processed once.
+"""
+
+import os
+import hashlib
+from typing import Optional
+
+from arxivedits import data
+
+
+def key(*parts: str) -> str:
+    """
+    Hashes every part (the input text plus anything that changes the output, like a configuration string) into a single key.
+    """
+    digest = hashlib.sha256()
+
+    for part in parts:
+        digest.update(part.encode("utf-8", errors="surrogatepass"))
+        digest.update(b"\0")  # so ("ab", "c") and ("a", "bc") are different keys
+
+    return digest.hexdigest()
+
+
+def load(namespace: str, cache_key: str) -> Optional[str]:
+    """
+    Returns the cached value, or None if nothing is stored under `cache_key`.
+    """
+    try:
+        with open(data.cache_path(namespace, cache_key), "r") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def store(namespace: str, cache_key: str, value: str) -> None:
+    """
+    Stores a value under `cache_key`. Writes to a temporary file first so a crash never leaves a partial value behind.
+    """
+    filepath = data.cache_path(namespace, cache_key)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    tmppath = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmppath, "w") as file:
+        file.write(value)
+
+    os.replace(tmppath, filepath)
@@ -1,10 +1,12 @@
 import csv
 import os
+import json
 from typing import List, Set, Dict
 
+import numpy as np
 from tqdm import tqdm
 
-from arxivedits import data, util, filters
+from arxivedits import data, util
 from arxivedits.alignment.align import Alignment
 from arxivedits.alignment.sentence import SentenceID
 from arxivedits.preprocess import save_preprocess_sent_dict
@@ -74,7 +76,7 @@ def get_chunks(
         doc,
         lambda sent_id: (
             not alignment.is_aligned(sent_id)  # removed
-            or filters.is_boring(alignment.lookup[sent_id])  # boring, so we don't care
+            or alignment.is_boring(sent_id)  # boring, so we don't care
         ),
     )
 
@@ -98,8 +100,8 @@ def sents_not_solved_by_diff(
     result = set()
 
     for sent_id in relevant_alignment.keys():
-        if not diff_alignment.is_aligned(sent_id) and not filters.is_boring(
-            diff_alignment.lookup[sent_id]
+        if not diff_alignment.is_aligned(sent_id) and not diff_alignment.is_boring(
+            sent_id
         ):
             result.add(sent_id)
 
@@ -108,7 +110,7 @@ def sents_not_solved_by_diff(
 
 def get_examples_from(
     arxivid: str, v1: int, v2: int, min_length: int, window_size: int, group: str
-) -> List[List[float]]:
+) -> np.ndarray:
     """
     1. Load the annotated alignment and similarity lookup.
     2. Find all the sentences in the relevant version of a document.
@@ -116,13 +118,11 @@ def get_examples_from(
     4. Find negative examples of chunks (sentences that are not aligned, but not in a big enough group, and not boring)
     6. Use a sliding window, and whether the middle sentence is in positive or negative to determine gold label.
     7. Convert these sentences to feature vectors with labels.
-    8. Write these feature vectors with labels to .csv file.
+    8. Return these feature vectors with their label in the last column.
     """
 
     group_asserts(group)
 
-    examples = []
-
     # 1. Load the annotated alignment and similarity lookup.
     gold_alignment = Alignment.load(arxivid, v1, v2)
     similarity_lookup = load_lookup(arxivid, v1, v2)
@@ -132,7 +132,7 @@ def get_examples_from(
     sent_ids = [
         i
         for i in sorted(relevant_gold_alignment.keys())
-        if not filters.is_boring(gold_alignment.lookup[i])
+        if not gold_alignment.is_boring(i)
     ]
 
     # 3. Find positive examples of chunks (in a group of MIN_LENGTH)
@@ -149,8 +149,6 @@ def get_examples_from(
         not sentences_in_chunk & sentences_not_in_chunk
     ), f"There should be no common values between the positive and negative examples. However, there are: {sentences_in_chunk & sentences_not_in_chunk}"
 
-    sentence_features = []
-
     def get_label(sent_id: SentenceID) -> int:
         if sent_id in sentences_in_chunk:
             return IN_CHUNK
@@ -162,82 +160,95 @@ def get_examples_from(
             ), f"Since {sent_id} is not positive or negative, it must be aligned."
             return NOT_IN_CHUNK
 
-    # 6. Use a sliding window, and whether the middle sentence is in positive or negative to determine gold label.
-    for _id in sent_ids:
-        sentence_features.append(
-            # 7. Convert these sentences to feature vectors.
-            (
-                features.make_feature_vector(
-                    gold_alignment.lookup[_id],
-                    similarity_lookup.get_sentence_vector(gold_alignment.lookup[_id]),
-                ),
-                get_label(_id),
-            )
-        )
+    sentences = [gold_alignment.lookup[_id] for _id in sent_ids]
+
+    # 7. Convert these sentences to feature vectors.
+    feature_matrix = features.make_feature_matrix(
+        sentences,
+        similarity_lookup.get_similarity_array(sentences),
+    )
 
+    # 6. Use a sliding window, and whether the middle sentence is in positive or negative to determine gold label.
     # 8. Convert individual sentence features to a feature vector
-    for feature_tuple in util.sliding_window(
-        sentence_features,
-        size=window_size,
-        default_value=(FeatureVector.default(), NOT_IN_CHUNK),
-    ):
-        assert len(feature_tuple) % 2 == 1, f"{feature_tuple} should be an odd length."
+    labels = np.array([get_label(_id) for _id in sent_ids], dtype=float)
+
+    windows = util.stack_windows(feature_matrix, size=window_size)
+
+    return np.column_stack([windows, labels])
 
-        middle_index = len(feature_tuple) // 2
 
-        prev = feature_tuple[:middle_index]
-        after = feature_tuple[middle_index + 1 :]
+def examples_path(group: str, min_length: int, window_size: int, ext: str) -> str:
+    return os.path.join(
+        data.ALIGNMENT_DIR,
+        "chunks",
+        "data",
+        f"{group}-examples-{window_size}-{min_length}{ext}",
+    )
+
 
-        feat, label = feature_tuple[middle_index]
+def feature_columns(window_size: int) -> List[str]:
+    """
+    Names the columns of an example: each sentence's features, from `window_size` sentences before to `window_size` sentences after, then the label.
+    """
+    return [
+        f"{name}[{offset:+d}]"
+        for offset in range(-window_size, window_size + 1)
+        for name in features.FEATURE_NAMES
+    ] + ["label"]
 
-        feature_vector: List[float] = []
 
-        for f, _ in prev:
-            feature_vector.extend(f.to_list())
+def save_examples(
+    examples: np.ndarray, group: str, min_length: int, window_size: int
+) -> None:
+    """
+    Writes examples as a .npy array with a .json schema next to it, so they can be memory-mapped without parsing.
+    """
+    columns = feature_columns(window_size)
 
-        feature_vector.extend(feat.to_list())
+    assert examples.shape[1] == len(columns), f"{examples.shape} doesn't fit {columns}"
 
-        for f, _ in after:
-            feature_vector.extend(f.to_list())
+    filename = examples_path(group, min_length, window_size, ".npy")
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-        feature_vector.append(label)
+    tmpname = f"{filename}.{os.getpid()}.tmp.npy"
+    np.save(tmpname, examples)
+    os.replace(tmpname, filename)
 
-        examples.append(feature_vector)
+    schema = {
+        "group": group,
+        "min_length": min_length,
+        "window_size": window_size,
+        "dtype": str(examples.dtype),
+        "shape": list(examples.shape),
+        "columns": columns,
+    }
 
-    return examples
+    with open(examples_path(group, min_length, window_size, ".json"), "w") as file:
+        json.dump(schema, file, indent=2)
 
 
 def write_data(
     min_length: int, window_size: int, group: str, repeat: bool = True
 ) -> None:
     """
-    Writes removed/added data to .csv files. Doesn't do anything if the files already exist.
+    Writes removed/added data to .npy files. Doesn't do anything if the files already exist.
     """
 
     group_asserts(group)
 
-    filename = os.path.join(
-        data.ALIGNMENT_DIR,
-        "chunks",
-        "data",
-        f"{group}-examples-{window_size}-{min_length}.csv",
-    )
+    filename = examples_path(group, min_length, window_size, ".npy")
 
     if os.path.isfile(filename) and not repeat:
         return
 
-    examples = []
+    examples = [np.zeros((0, len(feature_columns(window_size))))]
 
     for arxivid, v1, v2 in tqdm(data.ANNOTATED_IDS):  # [('1902.05725', 1, 2)]:
-        examples.extend(
+        examples.append(
             get_examples_from(arxivid, v1, v2, min_length, window_size, group)
         )
 
-    with open(filename, "w") as file:
-        csvwriter = csv.writer(file, dialect="excel")
-
-        for f in examples:
-            csvwriter.writerow(f)
+    save_examples(np.concatenate(examples), group, min_length, window_size)
 
 
 def write_data_DEPRECATED(
@@ -281,7 +292,7 @@ def write_data_DEPRECATED(
         v1_sent_ids = [
             i
             for i in sorted(alignment.alignments1.keys())
-            if not filters.is_boring(alignment.lookup[i])
+            if not alignment.is_boring(i)
         ]
 
         # 3. Find positive examples of removed sentences (in a group of MIN_LENGTH)
@@ -327,7 +338,7 @@ def write_data_DEPRECATED(
         v2_sent_ids = [
             i
             for i in sorted(alignment.alignments2.keys())
-            if not filters.is_boring(alignment.lookup[i])
+            if not alignment.is_boring(i)
         ]
 
         # 3. Find positive examples of added sentences (in a group of MIN_LENGTH)
@@ -6,6 +6,8 @@ import csv
 from typing import Set, Tuple, List, Union
 from collections import namedtuple
 
+import numpy as np
+from sklearn.linear_model import LogisticRegression
 from tqdm import tqdm
 
 from arxivedits.alignment.sentence import SentenceID
@@ -14,10 +16,10 @@ from arxivedits.alignment.align import Alignment
 from arxivedits.chunks import features
 from arxivedits.chunks.model import train_model
 from arxivedits.chunks.data import ADDED, REMOVED, BOTH, get_chunks
-from arxivedits.chunks.lookup import load_lookup
+from arxivedits.chunks.lookup import SimilarityLookup, load_lookup
 from arxivedits.chunks.visualize import visualize_predictions
 
-from arxivedits import data, util, structures, filters
+from arxivedits import data, util, structures
 
 
 Metrics = namedtuple(
@@ -61,35 +63,35 @@ def get_metrics(
     unaligned_sents_in_v1 = set()
 
     for sent_id in gold_alignment.alignments1:
-        if not filters.is_boring(
-            gold_alignment.lookup[sent_id]
-        ) and not diff_alignment.is_aligned(sent_id):
+        if not gold_alignment.is_boring(sent_id) and not diff_alignment.is_aligned(
+            sent_id
+        ):
             unaligned_sents_in_v1.add(sent_id)
 
         if (
-            not filters.is_boring(gold_alignment.lookup[sent_id])
+            not gold_alignment.is_boring(sent_id)
             and gold_alignment.is_aligned(sent_id)
             and not diff_alignment.is_aligned(sent_id)
         ):
             for matched_id in gold_alignment.alignments1[sent_id]:
-                if not filters.is_boring(gold_alignment.lookup[matched_id]):
+                if not gold_alignment.is_boring(matched_id):
                     non_identical_aligned_pairs.add((sent_id, matched_id))
 
     unaligned_sents_in_v2 = set()
 
     for sent_id in gold_alignment.alignments2:
-        if not filters.is_boring(
-            gold_alignment.lookup[sent_id]
-        ) and not diff_alignment.is_aligned(sent_id):
+        if not gold_alignment.is_boring(sent_id) and not diff_alignment.is_aligned(
+            sent_id
+        ):
             unaligned_sents_in_v2.add(sent_id)
 
         if (
-            not filters.is_boring(gold_alignment.lookup[sent_id])
+            not gold_alignment.is_boring(sent_id)
             and gold_alignment.is_aligned(sent_id)
             and not diff_alignment.is_aligned(sent_id)
         ):
             for matched_id in gold_alignment.alignments2[sent_id]:
-                if not filters.is_boring(gold_alignment.lookup[matched_id]):
+                if not gold_alignment.is_boring(matched_id):
                     non_identical_aligned_pairs.add((matched_id, sent_id))
 
     total_comps = len(unaligned_sents_in_v1) * len(unaligned_sents_in_v2)
@@ -117,6 +119,38 @@ def get_metrics(
     )
 
 
+def predict_chunks(
+    model: LogisticRegression,
+    alignment: Alignment,
+    sent_ids: List[SentenceID],
+    similarity_lookup: SimilarityLookup,
+    window_size: int,
+) -> List[Tuple[SentenceID, int]]:
+    """
+    Predicts whether each sentence is part of a chunk. Features are computed once per sentence, the windows are stacked from the feature matrix, and every unaligned sentence is predicted in one batch. Aligned sentences are never part of a chunk.
+    """
+    if not sent_ids:
+        return []
+
+    sentences = [alignment.lookup[_id] for _id in sent_ids]
+
+    feature_matrix = features.make_feature_matrix(
+        sentences,
+        similarity_lookup.get_similarity_array(sentences),
+    )
+
+    windows = util.stack_windows(feature_matrix, size=window_size)
+
+    unaligned = np.array([not alignment.is_aligned(_id) for _id in sent_ids])
+
+    predictions = np.zeros(len(sent_ids), dtype=int)
+
+    if unaligned.any():
+        predictions[unaligned] = model.predict(windows[unaligned])
+
+    return list(zip(sent_ids, predictions.tolist()))
+
+
 def evaluate_model(
     min_length: int, window_size: int, silent: bool = True
 ) -> List[float]:
@@ -150,81 +184,27 @@ def evaluate_model(
         v1_sent_ids = [
             _id
             for _id in sorted(new_alignment.alignments1.keys())
-            if not filters.is_boring(new_alignment.lookup[_id])
+            if not new_alignment.is_boring(_id)
         ]
 
         v2_sent_ids = [
             _id
             for _id in sorted(new_alignment.alignments2.keys())
-            if not filters.is_boring(new_alignment.lookup[_id])
+            if not new_alignment.is_boring(_id)
         ]
 
-        predicted_removed_lines = []
-        predicted_added_lines = []
-
-        for ids in util.sliding_window(
-            v1_sent_ids, size=window_size, default_value=None
-        ):
-            _id = ids[len(ids) // 2]
-
-            if new_alignment.is_aligned(_id):
-                prediction = 0
-            else:
-                feature_vector = []
-
-                for sent_id in ids:
-                    if not sent_id:
-                        feature_vector.extend(
-                            features.FeatureVector.default().to_list()
-                        )
-                    else:
-                        feature_vector.extend(
-                            features.make_feature_vector(
-                                new_alignment.lookup[sent_id],
-                                similarity_lookup.get_sentence_vector(
-                                    new_alignment.lookup[sent_id]
-                                ),
-                            ).to_list()
-                        )
-
-                prediction = removed_model.predict([feature_vector]).item()
-
-            predicted_removed_lines.append((_id, prediction))
-
-        for ids in util.sliding_window(
-            v2_sent_ids, size=window_size, default_value=None
-        ):
-            prediction_id = ids[len(ids) // 2]
-
-            if new_alignment.is_aligned(prediction_id):
-                prediction = 0
-            else:
-                feature_vector = []
-
-                for sent_id in ids:
-                    if not sent_id:
-                        feature_vector.extend(
-                            features.FeatureVector.default().to_list()
-                        )
-                    else:
-                        feature_vector.extend(
-                            features.make_feature_vector(
-                                new_alignment.lookup[sent_id],
-                                similarity_lookup.get_sentence_vector(
-                                    new_alignment.lookup[sent_id]
-                                ),
-                            ).to_list()
-                        )
-
-                prediction = added_model.predict([feature_vector]).item()
-
-            predicted_added_lines.append((prediction_id, prediction))
+        predicted_removed_lines = predict_chunks(
+            removed_model, new_alignment, v1_sent_ids, similarity_lookup, window_size
+        )
+        predicted_added_lines = predict_chunks(
+            added_model, new_alignment, v2_sent_ids, similarity_lookup, window_size
+        )
 
         predicted_removed_lines.extend(
             [
                 (sent_id, -1)
                 for sent_id in new_alignment.alignments1
-                if filters.is_boring(new_alignment.lookup[sent_id])
+                if new_alignment.is_boring(sent_id)
             ]
         )
 
@@ -232,7 +212,7 @@ def evaluate_model(
             [
                 (sent_id, -1)
                 for sent_id in new_alignment.alignments2
-                if filters.is_boring(new_alignment.lookup[sent_id])
+                if new_alignment.is_boring(sent_id)
             ]
         )
 
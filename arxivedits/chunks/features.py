@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 
-from typing import List, cast
+from typing import List, Tuple, cast
+
+import numpy as np
 
 from arxivedits.similarity import Similarity
-from arxivedits import alignment
+from arxivedits import preprocess
 from arxivedits.detex.constants import (
     CITE_TAG,
     BLOCK_MATH_TAG,
@@ -52,6 +54,25 @@ class FeatureVector:
         return FeatureVector(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
 
+# the order of make_feature_matrix()'s columns, which is also the order of FeatureVector.to_list()
+FEATURE_NAMES = [
+    "max_diff_sim",
+    "avg_diff_sim",
+    "max_diff_2_gram_sim",
+    "avg_diff_2_gram_sim",
+    "max_jaccard_sim",
+    "avg_jaccard_sim",
+    "max_jaccard_2_gram_sim",
+    "avg_jaccard_2_gram_sim",
+    "n_tokens",
+    "n_special_tokens",
+    "percent_special_tokens",
+]
+
+# the order of the last axis of a similarity array (the order of Similarity's fields)
+SIMILARITY_FIELDS = ["jaccard_sim", "diff_sim", "jaccard_2_gram_sim", "diff_2_gram_sim"]
+
+
 def get_max_field(similarity_vector: List[Similarity], field: str) -> float:
     return (
         cast(
@@ -71,18 +92,12 @@ def get_avg_field(similarity_vector: List[Similarity], field: str) -> float:
     )
 
 
-def make_feature_vector(
-    sentence: str, similarity_vector: List[Similarity]
-) -> FeatureVector:
+def count_tokens(sentence: str) -> Tuple[int, int]:
     """
-    Given a sentence and its neighbours, creates the feature vector for the linear model.
+    Returns the number of tokens and the number of special (math, citation, ref) tokens in a sentence.
     """
+    tokens = [tok for tok in preprocess.preprocess_sent(sentence).split(" ") if tok]
 
-    tokens = [
-        tok for tok in alignment.util.preprocess_single_sent(sentence).split(" ") if tok
-    ]
-
-    n_tokens = len(tokens)
     n_special_tokens = len(
         [
             tok
@@ -94,6 +109,75 @@ def make_feature_vector(
         ]
     )
 
+    return len(tokens), n_special_tokens
+
+
+def similarity_array(similarity_vectors: List[List[Similarity]]) -> np.ndarray:
+    """
+    Converts each sentence's list of similarities into one (n_sentences x n_neighbours x 4) array, like `SimilarityLookup.get_similarity_array()`. Sentences with fewer neighbours are padded with NaN.
+    """
+    n_neighbours = max((len(vector) for vector in similarity_vectors), default=0)
+
+    similarities = np.full(
+        (len(similarity_vectors), n_neighbours, len(SIMILARITY_FIELDS)), np.nan
+    )
+
+    for i, vector in enumerate(similarity_vectors):
+        for j, sim in enumerate(vector):
+            similarities[i, j] = [getattr(sim, field) for field in SIMILARITY_FIELDS]
+
+    return similarities
+
+
+def make_feature_matrix(sentences: List[str], similarities: np.ndarray) -> np.ndarray:
+    """
+    Creates the feature vectors for every sentence in a document at once. `similarities` is a (n_sentences x n_neighbours x 4) array like the one from `similarity_array()`, where NaN marks a missing neighbour. Returns a (n_sentences x 11) array with columns in `FEATURE_NAMES` order.
+    """
+    assert len(sentences) == similarities.shape[0]
+
+    present = ~np.isnan(similarities)
+    counts = present.sum(axis=1)
+
+    maxes = np.where(present, similarities, -np.inf).max(axis=1, initial=-np.inf)
+    maxes[counts == 0] = 0
+
+    avgs = np.where(present, similarities, 0).sum(axis=1) / np.maximum(counts, 1)
+
+    tokens = np.array([count_tokens(sentence) for sentence in sentences], dtype=float)
+    tokens = tokens.reshape(len(sentences), 2)
+
+    n_tokens = tokens[:, 0]
+    n_special_tokens = tokens[:, 1]
+    percent_special_tokens = np.divide(
+        n_special_tokens,
+        n_tokens,
+        out=np.zeros_like(n_special_tokens),
+        where=n_tokens > 0,
+    )
+
+    columns = {
+        f"{stat}_{field}": values[:, i]
+        for stat, values in [("max", maxes), ("avg", avgs)]
+        for i, field in enumerate(SIMILARITY_FIELDS)
+    }
+    columns["n_tokens"] = n_tokens
+    columns["n_special_tokens"] = n_special_tokens
+    columns["percent_special_tokens"] = percent_special_tokens
+
+    return np.column_stack([columns[name] for name in FEATURE_NAMES]).reshape(
+        len(sentences), len(FEATURE_NAMES)
+    )
+
+
+def make_feature_vector(
+    sentence: str, similarity_vector: List[Similarity]
+) -> FeatureVector:
+    """
+    Given a sentence and its neighbours, creates the feature vector for the linear model.
+    """
+
+    n_tokens, n_special_tokens = count_tokens(sentence)
+
     return FeatureVector(
         max_diff_sim=get_max_field(similarity_vector, "diff_sim"),
         avg_diff_sim=get_avg_field(similarity_vector, "diff_sim"),
@@ -1,16 +1,36 @@
 """
 Defines SimilarityLookup, a lookup structure for sentence similarities.
+
+A document pair's similarities are stored in alignments/similarity as two arrays:
+
+* `<arxivid>-<v1>-<v2>-hashes.npy`: a 64-bit hash of every distinct non-boring sentence in v1, followed by every one in v2.
+* `<arxivid>-<v1>-<v2>-similarity.npy`: a (v1 sentences x v2 sentences x 4) matrix with the fields of `Similarity` on the last axis.
+
+Both are memory-mapped, so keeping many lookups open costs little memory.
 """
 
 import os
 import pickle
+import hashlib
 import functools
 
 from typing import Dict, Tuple, List, cast
 
+import numpy as np
 from tqdm import tqdm
 
-from arxivedits import data, diff, util, similarity
+from arxivedits import data, filters, util, similarity
+
+
+def sentence_hash(sentence: str) -> int:
+    digest = hashlib.blake2b(
+        sentence.encode("utf-8", errors="surrogatepass"), digest_size=8
+    )
+    return int.from_bytes(digest.digest(), "little")
+
+
+def hash_sentences(sentences: List[str]) -> np.ndarray:
+    return np.array([sentence_hash(sent) for sent in sentences], dtype=np.uint64)
 
 
 class SimilarityLookup:
@@ -23,101 +43,136 @@ class SimilarityLookup:
         self.version1 = v1
         self.version2 = v2
 
-        self.table_name = os.path.join(
-            data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-table.pckl",
+        self.hashes_name = os.path.join(
+            data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-hashes.npy"
         )
 
-        self.vector_name = os.path.join(
-            data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-vectors.pckl",
+        self.matrix_name = os.path.join(
+            data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-similarity.npy"
         )
 
-        self.table: Dict[
-            Tuple[str, str], similarity.Similarity
-        ] = self._get_similarity_table()
+        # the old format: pickled dicts keyed by sentence text
+        self.table_name = os.path.join(
+            data.ALIGNMENT_DIR, "similarity", f"{arxivid}-{v1}-{v2}-table.pckl"
+        )
 
-        self.vectors: Dict[
-            str, List[similarity.Similarity]
-        ] = self._get_similarity_vectors()
+        self.matrix: np.ndarray = self._get_similarity_matrix()
 
-    def _get_similarity_table(self) -> Dict[Tuple[str, str], similarity.Similarity]:
-        if os.path.isfile(self.table_name):
-            with open(self.table_name, "rb") as file:
-                return cast(
-                    Dict[Tuple[str, str], similarity.Similarity], pickle.load(file)
-                )
+        hashes = np.load(self.hashes_name, mmap_mode="r")
+        n_rows = self.matrix.shape[0]
 
-        print(f"{self.table_name} does not exist. Creating table from scratch.")
+        # sentence hash -> row (v1) or column (v2) of the matrix
+        self.rows: Dict[int, int] = {int(h): i for i, h in enumerate(hashes[:n_rows])}
+        self.columns: Dict[int, int] = {
+            int(h): j for j, h in enumerate(hashes[n_rows:])
+        }
 
-        table = {}
+    def _get_lines(self, version: int) -> List[str]:
+        pgs = data.get_paragraphs(self.arxivid, version)
 
-        pgs1 = data.get_paragraphs(self.arxivid, self.version1)
+        if isinstance(pgs, Exception):
+            raise pgs
 
-        if isinstance(pgs1, Exception):
-            raise pgs1
+        flags = filters.get_sentence_flags(self.arxivid, version)
 
-        lines1 = [
-            line for line in util.paragraphs_to_lines(pgs1) if not diff.is_boring(line)
+        if isinstance(flags, Exception):
+            raise flags
+
+        lines = [
+            line
+            for line, flag in zip(util.paragraphs_to_lines(pgs), flags["flags"])
+            if not flag & filters.BORING
         ]
 
-        pgs2 = data.get_paragraphs(self.arxivid, self.version2)
+        return list(dict.fromkeys(lines))  # distinct, in order
 
-        if isinstance(pgs2, Exception):
-            raise pgs2
+    def _save(self, lines1: List[str], lines2: List[str], matrix: np.ndarray) -> None:
+        for filename, array in [
+            (self.hashes_name, hash_sentences(lines1 + lines2)),
+            (self.matrix_name, matrix),
+        ]:
+            tmpname = f"{filename}.{os.getpid()}.tmp.npy"
+            np.save(tmpname, array)
+            os.replace(tmpname, filename)
 
-        lines2 = [
-            line for line in util.paragraphs_to_lines(pgs2) if not diff.is_boring(line)
-        ]
+    def _get_similarity_matrix(self) -> np.ndarray:
+        if os.path.isfile(self.matrix_name) and os.path.isfile(self.hashes_name):
+            return cast(np.ndarray, np.load(self.matrix_name, mmap_mode="r"))
 
-        print(f"Iterating through {len(lines1) * len(lines2)} lines.")
+        if os.path.isfile(self.table_name):
+            print(f"Converting {self.table_name} to {self.matrix_name}.")
 
-        for sent1 in lines1:
-            for sent2 in lines2:
-                if sent1 == sent2:
-                    table[(sent1, sent2)] = similarity.Similarity.identical()
-                    continue
+            with open(self.table_name, "rb") as file:
+                table: Dict[Tuple[str, str], similarity.Similarity] = pickle.load(file)
+
+            lines1 = list(dict.fromkeys(sent1 for sent1, _ in table))
+            lines2 = list(dict.fromkeys(sent2 for _, sent2 in table))
+
+            rows = {sent: i for i, sent in enumerate(lines1)}
+            columns = {sent: j for j, sent in enumerate(lines2)}
+
+            matrix = np.zeros((len(lines1), len(lines2), 4))
+
+            for (sent1, sent2), sim in table.items():
+                matrix[rows[sent1], columns[sent2]] = [
+                    sim.jaccard_sim,
+                    sim.diff_sim,
+                    sim.jaccard_2_gram_sim,
+                    sim.diff_2_gram_sim,
+                ]
+        else:
+            print(f"{self.matrix_name} does not exist. Creating matrix from scratch.")
+
+            lines1 = self._get_lines(self.version1)
+            lines2 = self._get_lines(self.version2)
 
-                table[(sent1, sent2)] = similarity.get_similarity(sent1, sent2)
+            print(f"Iterating through {len(lines1) * len(lines2)} lines.")
 
-        with open(self.table_name, "wb") as file:
-            pickle.dump(table, file)
+            matrix = similarity.similarity_matrix(lines1, lines2)
 
-        return table
+        self._save(lines1, lines2, matrix)
 
-    def _get_similarity_vectors(self) -> Dict[str, List[similarity.Similarity]]:
+        return cast(np.ndarray, np.load(self.matrix_name, mmap_mode="r"))
 
-        if os.path.isfile(self.vector_name):
-            with open(self.vector_name, "rb") as file:
-                return cast(Dict[str, List[similarity.Similarity]], pickle.load(file))
+    def get_sentence_array(self, sentence: str) -> np.ndarray:
+        """
+        Gets the similarities between a sentence and every sentence in the other version (both others, if the sentence is in both versions) as a (n x 4) array.
+        """
+        h = sentence_hash(sentence)
 
-        print(f"{self.vector_name} does not exist. Creating vector list from scratch.")
+        parts = [np.zeros((0, 4))]
 
-        vectors: Dict[str, List[similarity.Similarity]] = {}
+        if h in self.rows:
+            parts.append(self.matrix[self.rows[h]])
 
-        for sent1, sent2 in self.table:
-            assert not diff.is_boring(sent1) and not diff.is_boring(sent2)
+        if h in self.columns:
+            parts.append(self.matrix[:, self.columns[h]])
 
-            if sent1 not in vectors:
-                vectors[sent1] = []
+        return np.concatenate(parts)
 
-            if sent2 not in vectors:
-                vectors[sent2] = []
+    def get_similarity_array(self, sentences: List[str]) -> np.ndarray:
+        """
+        Gets every sentence's similarities as one (n_sentences x n_neighbours x 4) array, padded with NaN, for `features.make_feature_matrix()`.
+        """
+        arrays = [self.get_sentence_array(sent) for sent in sentences]
 
-            vectors[sent1].append(self.table[(sent1, sent2)])
-            vectors[sent2].append(self.table[(sent1, sent2)])
+        n_neighbours = max((len(array) for array in arrays), default=0)
 
-        with open(self.vector_name, "wb") as file:
-            pickle.dump(vectors, file)
+        result = np.full((len(sentences), n_neighbours, 4), np.nan)
 
-        return vectors
+        for i, array in enumerate(arrays):
+            result[i, : len(array)] = array
+
+        return result
 
     def get_sentence_vector(self, sentence: str) -> List[similarity.Similarity]:
         """
         Gets a list of Similarity pairs for a given sentence.
         """
-        if sentence in self.vectors:
-            return self.vectors[sentence]
-        else:
-            return []
+        return [
+            similarity.Similarity(*row)
+            for row in self.get_sentence_array(sentence).tolist()
+        ]
 
     def write_heatmap(self) -> None:
         """
@@ -126,7 +181,7 @@ class SimilarityLookup:
         raise NotImplementedError()
 
 
-@functools.lru_cache(maxsize=32)
+@functools.lru_cache(maxsize=256)
 def load_lookup(arxivid: str, v1: int, v2: int) -> SimilarityLookup:
     return SimilarityLookup(arxivid, v1, v2)
 
@@ -1,6 +1,9 @@
 import os
 import csv
-from typing import Tuple, List
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Tuple, List, Dict, Any, Iterable, cast
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import cross_val_score
@@ -10,11 +13,47 @@ import numpy as np
 from tqdm import tqdm
 
 from arxivedits import data
-from arxivedits.chunks.data import group_asserts
+from arxivedits.chunks.data import (
+    group_asserts,
+    examples_path,
+    feature_columns,
+    save_examples,
+    ADDED,
+    REMOVED,
+    BOTH,
+)
 
 
-def parse_row(row: List[str]) -> List[float]:
-    return [float(i) for i in row]
+WORKERS = os.cpu_count() or 1
+
+
+def load_examples(group: str, min_length: int, window_size: int) -> np.ndarray:
+    """
+    Memory-maps the examples (features, then the label in the last column) written by chunks/data.py for either 'added' or 'removed'. Examples still in the old .csv format are converted once.
+    """
+    group_asserts(group)
+
+    npypath = examples_path(group, min_length, window_size, ".npy")
+    csvpath = examples_path(group, min_length, window_size, ".csv")
+
+    if not os.path.isfile(npypath) and os.path.isfile(csvpath):
+        save_examples(
+            np.loadtxt(csvpath, delimiter=",", ndmin=2), group, min_length, window_size
+        )
+
+    with open(examples_path(group, min_length, window_size, ".json")) as file:
+        schema = json.load(file)
+
+    examples = np.load(npypath, mmap_mode="r")
+
+    assert schema["columns"] == feature_columns(
+        window_size
+    ), f"{npypath} has different features than the current feature vector."
+    assert (
+        list(examples.shape) == schema["shape"]
+    ), f"{npypath} doesn't match its schema."
+
+    return cast(np.ndarray, examples)
 
 
 def get_data(
@@ -26,44 +65,21 @@ def get_data(
 
     group_asserts(group, both=True)
 
-    added_filename = os.path.join(
-        data.ALIGNMENT_DIR,
-        "chunks",
-        "data",
-        f"added-examples-{window_size}-{min_length}.csv",
-    )
-
-    removed_filename = os.path.join(
-        data.ALIGNMENT_DIR,
-        "chunks",
-        "data",
-        f"removed-examples-{window_size}-{min_length}.csv",
-    )
-
-    with open(removed_filename, "r") as file:
-        csvreader = csv.reader(file, dialect="excel")
-        added_rows = list(csvreader)
-
-    with open(added_filename, "r") as file:
-        csvreader = csv.reader(file, dialect="excel")
-        removed_rows = list(csvreader)
-
-    if group == "removed":
-        rows = removed_rows
-    elif group == "added":
-        rows = added_rows
+    if group == BOTH:
+        examples = np.concatenate(
+            [
+                load_examples(ADDED, min_length, window_size),
+                load_examples(REMOVED, min_length, window_size),
+            ]
+        )
     else:
-        rows = added_rows + removed_rows
+        examples = load_examples(group, min_length, window_size)
 
-    X = np.zeros((len(rows), len(rows[0]) - 1))
-    Y = np.zeros((len(rows),))
+    return examples[:, :-1], examples[:, -1]
 
-    for i, row in enumerate(rows):
-        *features, target = parse_row(row)
-        X[i] = features
-        Y[i] = target
 
-    return X, Y
+def make_model() -> LogisticRegression:
+    return LogisticRegression(random_state=0, solver="liblinear")
 
 
 def train_model(
@@ -73,7 +89,7 @@ def train_model(
 
     X, Y = get_data(group, min_length, window_size)
 
-    model = LogisticRegression(random_state=0, solver="liblinear")
+    model = make_model()
     scores = cross_val_score(model, X, Y, cv=10)
 
     if not silent:
@@ -84,23 +100,89 @@ def train_model(
     return model, np.mean(scores)
 
 
-def grid_search(group: str) -> None:
-    group_asserts(group, both=True)
+def cross_validate(group: str, min_length: int, window_size: int) -> Dict[str, Any]:
+    """
+    Scores one set of hyperparameters with 10-fold cross validation.
+    """
+    start = time.time()
+
+    X, Y = get_data(group, min_length, window_size)
+
+    model = make_model()
+    scores = cross_val_score(model, X, Y, cv=10)
+
+    return {
+        "group": group,
+        "min_length": min_length,
+        "window_size": window_size,
+        "examples": len(Y),
+        "accuracy": float(np.mean(scores)),
+        "std": float(np.std(scores)),
+        "seconds": time.time() - start,
+    }
+
+
+def grid_search(
+    groups: Iterable[str] = (ADDED, REMOVED, BOTH),
+    workers: int = WORKERS,
+    min_lengths: Iterable[int] = range(5, 13),
+    window_sizes: Iterable[int] = range(1, 4),
+) -> List[Dict[str, Any]]:
+    """
+    Cross validates every (min_length, window_size) pair for each group in a process pool, writes the results to chunks/results/grid-search.csv, and prints the best parameters for each group.
+    """
+    groups = list(groups)
+
+    for group in groups:
+        group_asserts(group, both=True)
+
+    params = [(length, window) for length in min_lengths for window in window_sizes]
+
+    # the example files the requested groups read; BOTH reads ADDED and REMOVED
+    datasets = sorted(
+        {
+            dataset
+            for group in groups
+            for dataset in ([ADDED, REMOVED] if group == BOTH else [group])
+        }
+    )
+
+    # converts any .csv examples once, before the workers read them
+    for length, window in params:
+        for dataset in datasets:
+            load_examples(dataset, length, window)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(cross_validate, group, length, window)
+            for group in groups
+            for length, window in params
+        ]
+
+        results = [
+            future.result()
+            for future in tqdm(as_completed(futures), total=len(futures))
+        ]
+
+    results.sort(key=lambda result: (result["group"], -result["accuracy"]))
+
+    filename = os.path.join(data.ALIGNMENT_DIR, "chunks", "results", "grid-search.csv")
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    max_score = 0.0
-    best_params = (-1, -1)
+    with open(filename, "w") as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
 
-    for length in tqdm(range(5, 13)):
-        for window in range(1, 4):
-            _, score = train_model(group, min_length=length, window_size=window)
-            if score > max_score:
-                max_score = score
-                best_params = (length, window)
+    for group in groups:
+        best = max(
+            (result for result in results if result["group"] == group),
+            key=lambda result: result["accuracy"],
+        )
+        print(group, best["accuracy"], (best["min_length"], best["window_size"]))
 
-    print(group, max_score, best_params)
+    return results
 
 
 if __name__ == "__main__":
-    grid_search("added")
-    grid_search("removed")
-    grid_search("both")
+    grid_search()
@@ -7,7 +7,7 @@ import os
 import pathlib
 import csv
 
-from typing import Tuple, List, Union, Iterator
+from typing import Tuple, List, Union, Iterator, Dict
 from arxivedits.structures import Result, ArxivID, ArxivIDPath
 
 # TYPES
@@ -25,19 +25,26 @@ MACHINE_DIR = ALIGNMENT_DIR / "machine-annotations"
 ANNOTATION_DIR = ALIGNMENT_DIR / "need-annotation"
 FINISHED_DIR = ALIGNMENT_DIR / "finished-annotations"
 VISUAL_DIR = DATA_DIR / "visualizations"
+CACHE_DIR = DATA_DIR / "cache"
 SCHEMA_PATH = pwd / "schema.sql"
+EXTRACTION_LOG_PATH = DATA_DIR / "extraction-log.csv"
+METRICS_PATH = DATA_DIR / "metrics.json"
+PROMETHEUS_PATH = DATA_DIR / "metrics.prom"
 DB_FILE_NAME = os.path.join(DATA_DIR, "arxivedits.sqlite3")
 
 DOWNLOAD_DIR = pwd / "arxiv-downloads"
+BLOB_DIR = DATA_DIR / "blobs"
 
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+os.makedirs(BLOB_DIR, exist_ok=True)
 os.makedirs(ALIGNMENT_DIR, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
 os.makedirs(CSV_DIR, exist_ok=True)
 os.makedirs(ANNOTATION_DIR, exist_ok=True)
 os.makedirs(FINISHED_DIR, exist_ok=True)
 os.makedirs(VISUAL_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 
 
 # TYPE FUNCTIONS
@@ -109,6 +116,45 @@ def source_path(arxivid: UnsafeArxivID, version: int) -> str:
     )
 
 
+def manifest_path(arxivid: UnsafeArxivID, version: int) -> str:
+    """
+    Returns the path for the source manifest (the source file's hash and size) for a given arxivid and version
+    """
+
+    arxividpath = id_to_path(arxivid)
+
+    return os.path.join(
+        DOWNLOAD_DIR,
+        arxividpath,
+        f"v{version}",
+        "extra",
+        f"{arxividpath}-v{version}-manifest.json",
+    )
+
+
+def extraction_stamp_path(arxivid: UnsafeArxivID, version: int) -> str:
+    """
+    Returns the path for the record of when (source hash and extractor version) the .tex file was last extracted, for a given arxivid and version
+    """
+
+    arxividpath = id_to_path(arxivid)
+
+    return os.path.join(
+        DOWNLOAD_DIR,
+        arxividpath,
+        f"v{version}",
+        "extra",
+        f"{arxividpath}-v{version}-extraction.json",
+    )
+
+
+def blob_path(digest: str) -> str:
+    """
+    Returns the path for a source file in the content-addressed store, sharded by the first two characters of its hash.
+    """
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
 def text_path(arxivid: UnsafeArxivID, version: int) -> str:
     """
     Returns the path for the detexed file for a given arxivid and version
@@ -125,6 +171,22 @@ def text_path(arxivid: UnsafeArxivID, version: int) -> str:
     )
 
 
+def markdown_path(arxivid: UnsafeArxivID, version: int) -> str:
+    """
+    Returns the path for the pandoc (markdown) output for a given arxivid and version
+    """
+
+    arxividpath = id_to_path(arxivid)
+
+    return os.path.join(
+        DOWNLOAD_DIR,
+        arxividpath,
+        f"v{version}",
+        "extra",
+        f"{arxividpath}-v{version}.md",
+    )
+
+
 def sentence_path(arxivid: UnsafeArxivID, version: int) -> str:
     """
     Returns the path for the sentence-split file for a given arxivid
@@ -140,6 +202,22 @@ def sentence_path(arxivid: UnsafeArxivID, version: int) -> str:
     )
 
 
+def sentence_flags_path(arxivid: UnsafeArxivID, version: int) -> str:
+    """
+    Returns the path for the flags (see `filters.get_sentence_flags()`) of every line in the sentence-split file for a given arxivid
+    """
+
+    arxividpath = id_to_path(arxivid)
+
+    return os.path.join(
+        DOWNLOAD_DIR,
+        arxividpath,
+        f"v{version}",
+        "extra",
+        f"{arxividpath}-v{version}-flags.npy",
+    )
+
+
 def latex_path(arxivid: UnsafeArxivID, version: int) -> str:
     """
     Returns the path for the constructed .tex file for a given arxivid and version 
@@ -233,7 +311,44 @@ def alignment_finished_path(
     )
 
 
-def get_local_files(maximum_only: bool = False) -> List[Tuple[ArxivIDPath, int]]:
+def cache_path(namespace: str, key: str) -> str:
+    """
+    Returns the path for a cached value, sharded by the first two characters of its key.
+    """
+    return os.path.join(CACHE_DIR, namespace, key[:2], f"{key}.txt")
+
+
+def get_local_files(
+    maximum_only: bool = False, rescan: bool = False
+) -> List[Tuple[ArxivIDPath, int]]:
+    """
+    Gets every downloaded (arxivid, version) from the corpus_state table.
+
+    The table only knows about files written by the pipeline (and the ones on disk when it was created). Pass `rescan=True` (or run `python -m arxivedits.state`) to rebuild it from DOWNLOAD_DIR after files were added or removed some other way.
+    """
+    from arxivedits import state  # state imports data
+
+    if rescan:
+        state.rescan()
+
+    idlist = [
+        (ArxivIDPath(arxivid), version)
+        for arxivid, version in state.get_versions(state.DOWNLOADED)
+    ]
+
+    if maximum_only:
+        maximums: Dict[ArxivIDPath, int] = {}
+        for arxivid, version in idlist:
+            maximums[arxivid] = max(version, maximums.get(arxivid, version))
+        idlist = sorted(maximums.items())
+
+    return idlist
+
+
+def walk_local_files(maximum_only: bool = False) -> List[Tuple[ArxivIDPath, int]]:
+    """
+    Gets every (arxivid, version) folder in DOWNLOAD_DIR by listing the directories.
+    """
     idlist: List[Tuple[ArxivIDPath, int]] = []
 
     for arxivid in os.listdir(DOWNLOAD_DIR):
@@ -460,7 +575,9 @@ def is_x(
 
 
 def is_detexed(arxivid: UnsafeArxivID, version: int) -> bool:
-    return os.path.isfile(text_path(arxivid, version))
+    from arxivedits import state  # state imports data
+
+    return state.is_done(arxivid, version, state.DETEXED, text_path(arxivid, version))
 
 
 SAMPLE_IDS = [
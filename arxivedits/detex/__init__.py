@@ -4,3 +4,4 @@ Exports 3 methods of extracting text from a file: `opendetex` + preprocessing, `
 
 from arxivedits.detex.opendetex import detex_file as detex_file
 from arxivedits.detex.pandoc import pandoc_file as pandoc_file
+from arxivedits.detex.pandoc import pandoc_files as pandoc_files
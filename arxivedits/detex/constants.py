@@ -13,6 +13,50 @@ BLOCK_MATH_TAG = "[EQUATION]"
 CITE_TAG = "[CITATION]"
 REF_TAG = "[REF]"
 
+SPECIAL_TOKENS = [INLINE_MATH_TAG, BLOCK_MATH_TAG, CITE_TAG, REF_TAG]
+
+# Compiled patterns for the per-document hot paths (detex, sentence splitting, filters)
+
+# any of the tags above
+SPECIAL_TOKEN_PATTERN = re.compile("|".join(re.escape(tag) for tag in SPECIAL_TOKENS))
+
+# [MATH] [MATH]  [MATH] -> [MATH]
+CONSECUTIVE_MATH_PATTERN = re.compile(
+    r"(?:" + re.escape(INLINE_MATH_TAG) + r"\s*)+" + re.escape(INLINE_MATH_TAG)
+)
+
+# [EQUATION] [EQUATION] -> [EQUATION]
+CONSECUTIVE_EQUATION_PATTERN = re.compile(
+    r"(?:" + re.escape(BLOCK_MATH_TAG) + r"\s*)+" + re.escape(BLOCK_MATH_TAG)
+)
+
+# [MATH] = 2 ( [MATH] ) -> [MATH], on opendetex's output
+DETEXED_CONSECUTIVE_MATH_PATTERN = re.compile(
+    r"(?:"
+    + re.escape(INLINE_MATH_TAG)
+    + r"(?:\s|\d|=|\(|\))+)+"
+    + re.escape(INLINE_MATH_TAG)
+)
+
+# any % not preceded by a \ until the end of the line
+COMMENT_PATTERN = re.compile(r"(?<!\\)%.*$", re.MULTILINE)
+
+BLANK_LINES_BEFORE_EQUATION_PATTERN = re.compile(r"\n\n+" + re.escape(BLOCK_MATH_TAG))
+BLANK_LINES_AFTER_EQUATION_PATTERN = re.compile(
+    re.escape(BLOCK_MATH_TAG) + r"( ?\n)( ?\n)+"
+)
+
+BLANK_LINES_PATTERN = re.compile(r"\n(\s*\n)+")
+TABS_PATTERN = re.compile(r"\t+", re.MULTILINE)
+MULTIPLE_SPACES_PATTERN = re.compile(r" +", re.MULTILINE)
+
+# $$...$$ and $...$ left over in detexed text
+DOLLAR_BLOCK_MATH_PATTERN = re.compile(r"\$\$(.*)\$\$")
+DOLLAR_INLINE_MATH_PATTERN = re.compile(r"\$(.*?)\$")
+
+# # Introduction, ## Related Work
+HEADING_PATTERN = re.compile(r"^#+ .")
+
 BAD_TAGS = [
     r"\input",
     # authors
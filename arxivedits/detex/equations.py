@@ -3,26 +3,54 @@ Handles math in .tex documents.
 """
 
 import re
-from typing import Pattern
+from typing import Match, cast
 
 from arxivedits.detex.constants import (
     BLOCK_MATH_TAG,
     INLINE_MATH_TAG,
+    CONSECUTIVE_MATH_PATTERN,
+    CONSECUTIVE_EQUATION_PATTERN,
 )
 
 
-# $$...$$
-BLOCK_MATH_PATTERN = re.compile(r"(?<!\\)\$\$.*?[^\\]\$\$", re.MULTILINE | re.DOTALL)
+# $$...$$ or \[...\]
+_BLOCK_MATH = (
+    r"(?<!\\)\$\$(?P<block>.*?[^\\])\$\$"
+    r"|(?<!\\)\\\[(?P<modern_block>.*?)(?<!\\)\\\]"
+)
+
+# $...$ or \(...\)
+_INLINE_MATH = (
+    r"(?<!\\)\$(?P<inline>.*?[^\\])\$"
+    r"|(?<!\\)\\\((?P<modern_inline>.*?)(?<!\\)\\\)"
+)
+
+BLOCK_MATH_PATTERN = re.compile(_BLOCK_MATH, re.MULTILINE | re.DOTALL)
 
+INLINE_MATH_PATTERN = re.compile(_INLINE_MATH, re.MULTILINE | re.DOTALL)
 
-# $...$
-INLINE_MATH_PATTERN = re.compile(r"(?<!\\)\$.*?[^\\]\$", re.MULTILINE | re.DOTALL)
+# block math is tried first at every position so $$...$$ isn't read as $[MATH]$
+MATH_PATTERN = re.compile(_BLOCK_MATH + "|" + _INLINE_MATH, re.MULTILINE | re.DOTALL)
+
+# an equation that ends in a period
+PUNCTUATION_PATTERN = re.compile(r"[^.]\.\s*\$")
+
+# the next sentence starts with a capital
+CAPITAL_PATTERN = re.compile(r"\s+[A-Z]")
+MODERN_CAPITAL_PATTERN = re.compile(r"\s*[A-Z]")
+
+MATH_TAGS = {
+    "block": BLOCK_MATH_TAG,
+    "modern_block": BLOCK_MATH_TAG,
+    "inline": INLINE_MATH_TAG,
+    "modern_inline": INLINE_MATH_TAG,
+}
 
 
 def _remove_bad_math(content: str) -> str:
     r"""
-    Changes modern LaTeX sequences such as `\( \)` and `\[ \]` to `$ $`. 
-    
+    Changes modern LaTeX sequences such as `\( \)` and `\[ \]` to `$ $`. `remove_math()` handles these sequences itself; this is still used by `chenhao.py`.
+
     Written by Chenhao Tan, modified by Sam Stevens.
     """
     # result is a list of lines
@@ -75,51 +103,48 @@ def _remove_bad_math(content: str) -> str:
     return "".join(result)
 
 
-def _remove_math(text: str, pattern: Pattern[str], replace_tag: str) -> str:
-    text = _remove_bad_math(text)
-
-    pos = 0
-    string_builder = []
-
-    while pos < len(text):
-        math_match = pattern.search(text, pos=pos)
-
-        if math_match:
-            start, end = math_match.span()
-            equation = math_match.group(0)
-            replace_tag = replace_tag
-        else:
-            break
+def _replace_math(match: Match[str]) -> str:
+    r"""
+    Replaces a single equation with its tag. If the equation ends in a period and the next sentence starts with a capital, the period is kept.
 
-        string_builder.append(text[pos:start])
-        string_builder.append(replace_tag)
+    `\(...\)` and `\[...\]` are padded with spaces, the same way `_remove_bad_math()` rewrites them to `$ ... $`.
+    """
+    kind = cast(str, match.lastgroup)
+    tag = MATH_TAGS[kind]
 
-        punc_match = re.search(r"[^.]\.\s*\$", equation)
-        capital_match = re.search(r"^\s+[A-Z]", text[end:])
+    if kind.startswith("modern"):
+        equation = f"$ {match.group(kind)} $"
+        capital_match = MODERN_CAPITAL_PATTERN.match(match.string, match.end())
+        padding = " "
+    else:
+        equation = match.group(0)
+        capital_match = CAPITAL_PATTERN.match(match.string, match.end())
+        padding = ""
 
-        if punc_match and capital_match:
-            string_builder.append(".")
+    if capital_match and PUNCTUATION_PATTERN.search(equation):
+        tag += "."
 
-        pos = end
+    return padding + tag + padding
 
-    string_builder.append(text[pos:])
 
-    return "".join(string_builder)
+def remove_math(text: str) -> str:
+    """
+    Replaces block math with [EQUATION] and inline math with [MATH] in a single pass.
+    """
+    return MATH_PATTERN.sub(_replace_math, text)
 
 
 def remove_inline_math(text: str) -> str:
-    return _remove_math(text, INLINE_MATH_PATTERN, INLINE_MATH_TAG)
+    return INLINE_MATH_PATTERN.sub(_replace_math, text)
 
 
 def remove_block_math(text: str) -> str:
-    return _remove_math(text, BLOCK_MATH_PATTERN, BLOCK_MATH_TAG)
+    return BLOCK_MATH_PATTERN.sub(_replace_math, text)
 
 
 def consecutive_math(text: str) -> str:
-    regexp = r"(?:" + re.escape(INLINE_MATH_TAG) + r"\s*)+" + re.escape(INLINE_MATH_TAG)
-    return re.sub(regexp, INLINE_MATH_TAG, text)
+    return CONSECUTIVE_MATH_PATTERN.sub(INLINE_MATH_TAG, text)
 
 
 def consecutive_equations(text: str) -> str:
-    regexp = r"(?:" + re.escape(BLOCK_MATH_TAG) + r"\s*)+" + re.escape(BLOCK_MATH_TAG)
-    return re.sub(regexp, BLOCK_MATH_TAG, text)
+    return CONSECUTIVE_EQUATION_PATTERN.sub(BLOCK_MATH_TAG, text)
@@ -3,7 +3,6 @@ General preprocessing for detexing a .tex file.
 """
 
 import string
-import re
 from typing import List, Tuple, Optional
 import logging
 
@@ -20,6 +19,11 @@ from arxivedits.detex.constants import (
     # references
     REF_TAGS,
     REF_TAG,
+    # compiled patterns
+    COMMENT_PATTERN,
+    BLANK_LINES_BEFORE_EQUATION_PATTERN,
+    BLANK_LINES_AFTER_EQUATION_PATTERN,
+    MULTIPLE_SPACES_PATTERN,
 )
 
 
@@ -116,10 +120,8 @@ def clean(initial_tex: str) -> str:
     for tag in REF_TAGS:
         text = remove_tag(tag, text, replace=REF_TAG)
 
-    # change $$...$$ to [EQUATION]
-    # needs to go first so that $$...$$ isn't turned to $[MATH]$
-    text = equations.remove_block_math(text)
-    text = equations.remove_inline_math(text)
+    # change $$...$$ and \[...\] to [EQUATION], $...$ and \(...\) to [MATH]
+    text = equations.remove_math(text)
 
     # change [MATH] [MATH]  [MATH] to [MATH]
     # (\[MATH\] *)+\[MATH\]
@@ -129,12 +131,10 @@ def clean(initial_tex: str) -> str:
     text = equations.consecutive_equations(text)
 
     # removes blank lines before [EQUATION]
-    regexp = r"\n\n+\[EQUATION\]"
-    text = re.sub(regexp, f"\n{BLOCK_MATH_TAG}", text)
+    text = BLANK_LINES_BEFORE_EQUATION_PATTERN.sub(f"\n{BLOCK_MATH_TAG}", text)
 
     # removes blank lines after [EQUATION]
-    regexp = r"\[EQUATION\]( ?\n)( ?\n)+"
-    text = re.sub(regexp, f"{BLOCK_MATH_TAG}\n", text)
+    text = BLANK_LINES_AFTER_EQUATION_PATTERN.sub(f"{BLOCK_MATH_TAG}\n", text)
 
     # changes \section{something} to \section{# something}
     for i, pattern in enumerate(SECTION_PATTERNS):
@@ -142,7 +142,7 @@ def clean(initial_tex: str) -> str:
         text = pattern.sub(replacement_heading, text)
 
     # removes multiple spaces
-    text = re.sub(r" +", " ", text, flags=re.MULTILINE)
+    text = MULTIPLE_SPACES_PATTERN.sub(" ", text)
 
     return text
 
@@ -151,7 +151,7 @@ def remove_comments(text: str) -> str:
     """
     Removes comments (any % not preceded by a \\ until the end of the line).
     """
-    return re.sub(r"(?<!\\)%.*$", "", text, flags=re.MULTILINE)
+    return COMMENT_PATTERN.sub("", text)
 
 
 def remove_tag(
@@ -3,17 +3,46 @@ Exports detex_file(), which extracts text using `opendetex` and extensive prepro
 """
 
 import subprocess
-import re
+import os
+import glob
 import logging
+import functools
+import hashlib
+from typing import Tuple, List
 
+from arxivedits import cache
 from arxivedits.detex import latex
-from arxivedits.detex.constants import INLINE_MATH_TAG, ACKNOWLEDGEMENT_PATTERN
+from arxivedits.detex.constants import (
+    INLINE_MATH_TAG,
+    ACKNOWLEDGEMENT_PATTERN,
+    SECTION_PATTERNS,
+    DETEXED_CONSECUTIVE_MATH_PATTERN,
+    BLANK_LINES_PATTERN,
+    TABS_PATTERN,
+    MULTIPLE_SPACES_PATTERN,
+)
 from arxivedits.structures import Result
 
 
 TMP_NOUN_TAG = "[TMPNOUN]"
 TMP_VERB_TAG = "[TMPVERB]"
 
+DETEX_COMMAND = ["detex", "-r"]
+
+
+@functools.lru_cache(maxsize=1)
+def config() -> str:
+    """
+    Identifies the current detex configuration: the `detex` command plus a hash of every preprocessing module, so editing the preprocessing invalidates cached output.
+    """
+    digest = hashlib.sha256(" ".join(DETEX_COMMAND).encode("utf-8"))
+
+    for filepath in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))):
+        with open(filepath, "rb") as file:
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
 
 def preprocess(text: str) -> str:
     """
@@ -29,27 +58,10 @@ def preprocess(text: str) -> str:
     return text
 
 
-def postprocess(text: str) -> str:
+def chop(text: str) -> str:
     """
-    Does some minor post processing on `opendetex`'s output.
+    Chops off everything before the abstract and after the acknowledgements.
     """
-    # replaces any occurence of noun, verb with [MATH]. The only occurences of noun and verb will be from opendetex.
-    text = text.replace("noun", INLINE_MATH_TAG)
-    text = text.replace("verbs", INLINE_MATH_TAG)
-
-    # now we can put noun and verb back into the text.
-    text = text.replace(TMP_NOUN_TAG, "noun")
-    text = text.replace(TMP_VERB_TAG, "verbs")
-
-    # (?:\[MATH\](?:\s|\d|\.|=|\(|\))+)+\[MATH\]
-    regexp = (
-        r"(?:"
-        + re.escape(INLINE_MATH_TAG)
-        + r"(?:\s|\d|=|\(|\))+)+"
-        + re.escape(INLINE_MATH_TAG)
-    )
-    text = re.sub(regexp, INLINE_MATH_TAG, text)
-
     # chops off everything before the abstract
     start_abstract = text.find("Abstract")
     if start_abstract >= 0:
@@ -60,19 +72,44 @@ def postprocess(text: str) -> str:
     if acknowledgement_matches:
         text = text[: acknowledgement_matches[-1].start()]
 
+    return text
+
+
+def normalize_whitespace(text: str) -> str:
     # turns multiple blank lines into one
-    text = re.sub(r"\n(\s*\n)+", "\n\n", text)
+    text = BLANK_LINES_PATTERN.sub("\n\n", text)
 
     # removes tabs
-    text = re.sub(r"\t+", " ", text, flags=re.MULTILINE)
+    text = TABS_PATTERN.sub(" ", text)
 
     # removes multiple spaces
-    text = re.sub(r" +", " ", text, flags=re.MULTILINE)
+    text = MULTIPLE_SPACES_PATTERN.sub(" ", text)
 
     return text
 
 
-def detex(text: str) -> Result[str]:
+def postprocess(text: str, chop_document: bool = True) -> str:
+    """
+    Does some minor post processing on `opendetex`'s output. If `chop_document` is false, the text before the abstract and after the acknowledgements is kept (used when detexing a single section).
+    """
+    # replaces any occurence of noun, verb with [MATH]. The only occurences of noun and verb will be from opendetex.
+    text = text.replace("noun", INLINE_MATH_TAG)
+    text = text.replace("verbs", INLINE_MATH_TAG)
+
+    # now we can put noun and verb back into the text.
+    text = text.replace(TMP_NOUN_TAG, "noun")
+    text = text.replace(TMP_VERB_TAG, "verbs")
+
+    # (?:\[MATH\](?:\s|\d|=|\(|\))+)+\[MATH\]
+    text = DETEXED_CONSECUTIVE_MATH_PATTERN.sub(INLINE_MATH_TAG, text)
+
+    if chop_document:
+        text = chop(text)
+
+    return normalize_whitespace(text)
+
+
+def detex(text: str, chop_document: bool = True) -> Result[str]:
     """
     opendetex (https://github.com/pkubowicz/opendetex), installed via homebrew (brew install detex)
     """
@@ -81,10 +118,10 @@ def detex(text: str) -> Result[str]:
         text = preprocess(text)
 
         text = subprocess.run(
-            ["detex", "-r"], text=True, input=text, capture_output=True
+            DETEX_COMMAND, text=True, input=text, capture_output=True
         ).stdout
 
-        text = postprocess(text)
+        text = postprocess(text, chop_document)
 
         return text
     except AttributeError:
@@ -93,20 +130,87 @@ def detex(text: str) -> Result[str]:
         )
 
 
-def detex_file(inputfile: str, outputfile: str) -> None:
+def split_sections(text: str) -> Tuple[str, List[str]]:
+    r"""
+    Splits a .tex document into its preamble (everything up to and including `\begin{document}`) and its body, cut right before every `\section`.
+    """
+    text = latex.remove_comments(text)
+
+    start_doc = text.find(r"\begin{document}")
+    if start_doc >= 0:
+        start_body = start_doc + len(r"\begin{document}")
+        preamble, body = text[:start_body], text[start_body:]
+    else:
+        preamble, body = "", text
+
+    bounds = [0, *[m.start() for m in SECTION_PATTERNS[0].finditer(body)], len(body)]
+
+    sections = [
+        body[start:end] for start, end in zip(bounds, bounds[1:]) if end > start
+    ]
+
+    return preamble, sections
+
+
+def detex_sections(text: str, use_cache: bool = True) -> Result[str]:
+    """
+    Detexes a document one `\\section` at a time. Each section is detexed along with the preamble (so macros still expand) and cached on the preamble and the section's source, so sections that are unchanged from an earlier version of the paper are never detexed again.
+
+    Macros defined inside one section and used in another are not expanded, and math that runs across a section boundary isn't merged, so the output can differ slightly from `detex()`.
+    """
+    preamble, sections = split_sections(text)
+
+    detexed_sections = []
+
+    for section in sections:
+        cache_key = cache.key(preamble, section, config())
+
+        detexed = cache.load("detex-section", cache_key) if use_cache else None
+
+        if detexed is None:
+            detexed = detex(preamble + section, chop_document=False)
+
+            if isinstance(detexed, Exception):
+                return detexed
+
+            cache.store("detex-section", cache_key, detexed)
+
+        detexed_sections.append(detexed)
+
+    return normalize_whitespace(chop("\n\n".join(detexed_sections)))
+
+
+def detex_file(
+    inputfile: str, outputfile: str, use_cache: bool = True, incremental: bool = False
+) -> None:
     """
     Takes a .tex file (inputfile) and extracts text, writes it to outputfile.
+
+    If `use_cache` is true, output for LaTeX that has been detexed before (with the same configuration) is read from the cache instead. If `incremental` is true, the document is detexed section by section with `detex_sections()`.
     """
     with open(inputfile, "r") as fin:
         with open(outputfile, "w") as fout:
             content = fin.read()
 
-            detexed = detex(content)
+            cache_key = cache.key(content, config())
+
+            cached = cache.load("detex", cache_key) if use_cache else None
+
+            if cached is not None and not incremental:
+                fout.write(cached)
+                return
+
+            if incremental:
+                detexed = detex_sections(content, use_cache)
+            else:
+                detexed = detex(content)
 
             if isinstance(detexed, Exception):
                 logging.warning(f"Can't detex {outputfile}: {detexed}")
             else:
                 fout.write(detexed)
+                if not incremental:
+                    cache.store("detex", cache_key, detexed)
 
 
 if __name__ == "__main__":
@@ -1,23 +1,31 @@
 """
 Exports `pandoc_file()`, which uses `pandoc` and post processing (TODO) to extract text.
+
+`pandoc_files()` converts many documents at once, either by running several `pandoc` processes side by side or by sending every document to a long-running `pandoc server` (see `PandocServer`).
+
+Needs pandoc 2.11.2 or newer (for `--markdown-headings`). `pandoc server` needs pandoc 3.0; `start_server()` returns None on older versions so callers can fall back to one process per document.
 """
 
 import subprocess
 import logging
-from typing import Optional
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, Iterable, Any
+
+import requests
 
 from arxivedits.detex import latex
+from arxivedits.structures import Result
 
+TIMEOUT = 5  # seconds per document
+WORKERS = 4  # documents converted at the same time
 
-def pandoc_file(
-    inputfile: str, outputfile: str, to: str = "markdown", clean: bool = True
-) -> Optional[Exception]:
-    with open(inputfile, "r") as file:
-        content = file.read()
-
-    if clean:
-        content = latex.clean(content)
 
+def pandoc(content: str, to: str = "markdown", timeout: float = TIMEOUT) -> Result[str]:
+    """
+    Converts a LaTeX string with a fresh `pandoc` process.
+    """
     try:
         result = subprocess.run(
             [
@@ -27,19 +35,206 @@ def pandoc_file(
                 "--to",
                 to,
                 "--standalone",
-                "--atx-headers",
-                "--output",
-                outputfile,
+                "--markdown-headings=atx",
             ],
             input=content,
             text=True,
-            timeout=5,
+            timeout=timeout,
             capture_output=True,
         )
     except subprocess.TimeoutExpired:
-        return Exception(f"Timed out on {inputfile}")
+        return TimeoutError(f"pandoc took longer than {timeout} seconds")
+
+    if result.returncode != 0:
+        logging.error(result.stderr)
+        return RuntimeError(f"pandoc exited with code {result.returncode}")
+
+    return result.stdout
+
+
+def pandoc_server(
+    content: str,
+    url: str,
+    to: str = "markdown",
+    timeout: float = TIMEOUT,
+    session: Optional[requests.Session] = None,
+) -> Result[str]:
+    """
+    Converts a LaTeX string by POSTing it to a running `pandoc server` at `url`.
+    """
+    # the same options as the command line in pandoc()
+    body = {
+        "text": content,
+        "from": "latex",
+        "to": to,
+        "standalone": True,
+        "markdown-headings": "atx",
+    }
+    post = session.post if session else requests.post
+
+    try:
+        response = post(
+            url, json=body, headers={"Accept": "application/json"}, timeout=timeout
+        )
+        response.raise_for_status()
+    except requests.exceptions.Timeout:
+        return TimeoutError(f"pandoc server took longer than {timeout} seconds")
+    except requests.exceptions.RequestException as err:
+        return err
+
+    result = response.json()
+
+    if "output" not in result:
+        return RuntimeError(f"pandoc server error: {result}")
+
+    return str(result["output"])
+
+
+def _convert_file(
+    inputfile: str,
+    outputfile: str,
+    to: str,
+    clean: bool,
+    timeout: float,
+    url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> Optional[Exception]:
+    with open(inputfile, "r") as file:
+        content = file.read()
+
+    if clean:
+        content = latex.clean(content)
+
+    if url:
+        output = pandoc_server(content, url, to, timeout, session)
     else:
-        if result and result.returncode != 0:
-            logging.error(result.stderr)
-            return Exception(f"Error with {inputfile}")
+        output = pandoc(content, to, timeout)
+
+    if isinstance(output, TimeoutError):
+        return Exception(f"Timed out on {inputfile}")
+
+    if isinstance(output, Exception):
+        return Exception(f"Error with {inputfile}: {output}")
+
+    with open(outputfile, "w") as file:
+        file.write(output)
+
+    return None
+
+
+def pandoc_file(
+    inputfile: str,
+    outputfile: str,
+    to: str = "markdown",
+    clean: bool = True,
+    timeout: float = TIMEOUT,
+) -> Optional[Exception]:
+    return _convert_file(inputfile, outputfile, to, clean, timeout)
+
+
+def pandoc_files(
+    files: Iterable[Tuple[str, str]],
+    to: str = "markdown",
+    clean: bool = True,
+    timeout: float = TIMEOUT,
+    workers: int = WORKERS,
+    url: Optional[str] = None,
+) -> Dict[str, Optional[Exception]]:
+    """
+    Converts many (inputfile, outputfile) pairs, at most `workers` at a time. If `url` points to a `pandoc server`, documents are sent there instead of starting a process for each one.
+
+    Returns the error (or None) for each inputfile.
+    """
+    files = list(files)
+    session = requests.Session() if url else None
+
+    def convert(pair: Tuple[str, str]) -> Optional[Exception]:
+        inputfile, outputfile = pair
+        return _convert_file(inputfile, outputfile, to, clean, timeout, url, session)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        errors = list(executor.map(convert, files))
+
+    if session:
+        session.close()
+
+    return {inputfile: err for (inputfile, _), err in zip(files, errors)}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return int(sock.getsockname()[1])
+
+
+class PandocServer:
+    """
+    Runs `pandoc server` (pandoc >= 3.0) for the lifetime of a `with` block so documents don't pay pandoc's startup cost.
+
+    ```
+    with PandocServer() as server:
+        pandoc_files(files, url=server.url)
+    ```
+    """
+
+    def __init__(self, port: int = 0, timeout: float = TIMEOUT) -> None:
+        self.port = port or _free_port()
+        self.timeout = timeout
+        self.url = f"http://localhost:{self.port}"
+        self.process: Optional[subprocess.Popen] = None  # type: ignore
+
+    def start(self) -> None:
+        self.process = subprocess.Popen(
+            [
+                "pandoc",
+                "server",
+                "--port",
+                str(self.port),
+                "--timeout",
+                str(int(self.timeout)),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        # waits until the server accepts connections
+        for _ in range(50):
+            if self.process.poll() is not None:
+                break  # exited, usually because this pandoc has no server command
+
+            try:
+                with socket.create_connection(("localhost", self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.1)
+
+        self.shutdown()
+        raise RuntimeError(f"pandoc server did not start on port {self.port}")
+
+    def shutdown(self) -> None:
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self) -> "PandocServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+
+
+def start_server(timeout: float = TIMEOUT) -> Optional[PandocServer]:
+    """
+    Starts a `PandocServer`, or returns None if there is no pandoc with a `server` command (pandoc < 3.0).
+    """
+    server = PandocServer(timeout=timeout)
+
+    try:
+        server.start()
+    except (RuntimeError, OSError) as err:
+        logging.info(f"Not using pandoc server: {err}")
         return None
+
+    return server
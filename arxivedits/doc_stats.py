@@ -0,0 +1,167 @@
+"""
+Keeps per-version document statistics in the `document_stats` table, so the document filters don't read and tokenize every version again for each version pair:
+
+* whether the LaTeX uses harvmac, for `filters.doc_filter()`
+* the number of lines, and of lines with 3+ [MATH] tags, in the sentence file, for `filters.doc_pair_filter()`
+
+The two groups come from different files, so they're computed separately: the first time they're asked for, and again only when their file changes.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from tqdm import tqdm
+
+from arxivedits import data, util, state
+from arxivedits.detex.constants import INLINE_MATH_TAG
+from arxivedits.structures import Result
+
+HARVMAC_PATTERN = re.compile(r"^[^%]*\\input harvmac")
+
+
+@dataclass
+class LineCounts:
+    lines: int
+    math_lines: int
+
+
+def get_mtime(filepath: str) -> Result[float]:
+    try:
+        return os.path.getmtime(filepath)
+    except OSError as err:
+        return err
+
+
+def uses_harvmac(latexpath: str) -> bool:
+    with open(latexpath) as file:
+        return any(HARVMAC_PATTERN.match(line) for line in file)
+
+
+def count_lines(arxivid: str, version: int) -> Result[LineCounts]:
+    """
+    Counts the lines and the lines with 3+ [MATH] tags in a sentence file.
+    """
+    # imported here because tokenizing starts CoreNLP
+    from arxivedits import preprocess
+
+    pgs = data.get_paragraphs(arxivid, version)
+
+    if isinstance(pgs, Exception):
+        return pgs
+
+    lines = util.paragraphs_to_lines(pgs)
+
+    math_lines = 0
+
+    for line in lines:
+        words = util.sent_to_words(preprocess.preprocess_sent(line))
+        if len([word for word in words if word in (INLINE_MATH_TAG)]) >= 3:
+            math_lines += 1
+
+    return LineCounts(len(lines), math_lines)
+
+
+def load_uses_harvmac(arxivid: str, version: int, mtime: float) -> Optional[bool]:
+    """
+    Returns the stored harvmac verdict, if it came from a LaTeX file with this mtime.
+    """
+    row = (
+        state.connection()
+        .execute(
+            "SELECT uses_harvmac FROM document_stats WHERE arxiv_id = ? AND version = ? AND latex_mtime = ?",
+            (data.id_to_path(arxivid), version, mtime),
+        )
+        .fetchone()
+    )
+
+    return bool(row[0]) if row else None
+
+
+def store_uses_harvmac(arxivid: str, version: int, harvmac: bool, mtime: float) -> None:
+    state.connection().execute(
+        "INSERT INTO document_stats (arxiv_id, version, uses_harvmac, latex_mtime) VALUES (?, ?, ?, ?) ON CONFLICT (arxiv_id, version) DO UPDATE SET uses_harvmac = excluded.uses_harvmac, latex_mtime = excluded.latex_mtime",
+        (data.id_to_path(arxivid), version, harvmac, mtime),
+    )
+
+
+def load_line_counts(arxivid: str, version: int, mtime: float) -> Optional[LineCounts]:
+    """
+    Returns the stored line counts, if they came from a sentence file with this mtime.
+    """
+    row = (
+        state.connection()
+        .execute(
+            "SELECT lines, math_lines FROM document_stats WHERE arxiv_id = ? AND version = ? AND sentences_mtime = ?",
+            (data.id_to_path(arxivid), version, mtime),
+        )
+        .fetchone()
+    )
+
+    return LineCounts(*row) if row else None
+
+
+def store_line_counts(
+    arxivid: str, version: int, counts: LineCounts, mtime: float
+) -> None:
+    state.connection().execute(
+        "INSERT INTO document_stats (arxiv_id, version, lines, math_lines, sentences_mtime) VALUES (?, ?, ?, ?, ?) ON CONFLICT (arxiv_id, version) DO UPDATE SET lines = excluded.lines, math_lines = excluded.math_lines, sentences_mtime = excluded.sentences_mtime",
+        (data.id_to_path(arxivid), version, counts.lines, counts.math_lines, mtime),
+    )
+
+
+def get_uses_harvmac(arxivid: str, version: int) -> Result[bool]:
+    """
+    Checks whether a version's LaTeX uses harvmac. Only needs the LaTeX file.
+    """
+    latexpath = data.latex_path(arxivid, version)
+    mtime = get_mtime(latexpath)
+
+    if isinstance(mtime, Exception):
+        return mtime
+
+    harvmac = load_uses_harvmac(arxivid, version, mtime)
+
+    if harvmac is None:
+        harvmac = uses_harvmac(latexpath)
+        store_uses_harvmac(arxivid, version, harvmac, mtime)
+
+    return harvmac
+
+
+def get_line_counts(arxivid: str, version: int) -> Result[LineCounts]:
+    """
+    Returns a version's line counts, computing and storing them if they're missing or out of date.
+    """
+    mtime = get_mtime(data.sentence_path(arxivid, version))
+
+    if isinstance(mtime, Exception):
+        return mtime
+
+    counts = load_line_counts(arxivid, version, mtime)
+
+    if counts:
+        return counts
+
+    new_counts = count_lines(arxivid, version)
+
+    if isinstance(new_counts, Exception):
+        return new_counts
+
+    store_line_counts(arxivid, version, new_counts, mtime)
+
+    return new_counts
+
+
+def main() -> None:
+    """
+    Computes the stats of every sentence-split version.
+    """
+    for arxivid, version in tqdm(state.get_versions(state.SENTENCED)):
+        get_uses_harvmac(arxivid, version)
+        get_line_counts(arxivid, version)
+
+
+if __name__ == "__main__":
+    main()
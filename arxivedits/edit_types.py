@@ -4,7 +4,7 @@ from collections import Counter
 
 from tqdm import tqdm
 
-from arxivedits import diff, util, preprocess, filters
+from arxivedits import diff, util, preprocess
 from arxivedits.alignment.align import Alignment
 from arxivedits.alignment.sentence import SentenceID
 
@@ -237,7 +237,7 @@ def get_all_edits(
                     remaining_v2_ids.remove(sent_id2)
             continue  # identical
 
-        if filters.is_boring(model.lookup[sent_id1]):
+        if model.is_boring(sent_id1):
             # remove sentences aligned to boring sentences
             for sent_id2 in model.alignments1[sent_id1]:
                 if sent_id2 in remaining_v2_ids:
@@ -258,9 +258,8 @@ def get_all_edits(
                 remaining_v2_ids.remove(sent_id2)
 
     for sent_id2 in sorted(remaining_v2_ids):  # should only be inserted ids
-        sentence = model.lookup[sent_id2]
         not_aligned = not model.is_aligned(sent_id2)
-        is_boring = filters.is_boring(sentence)
+        is_boring = model.is_boring(sent_id2)
 
         assert not_aligned or is_boring
 
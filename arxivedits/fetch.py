@@ -0,0 +1,207 @@
+"""
+Downloads files (arXiv e-prints and PDFs) concurrently over one pooled HTTP session, with a rate limit shared by every request.
+
+```
+results = fetch_all([(url, filepath), ...])
+```
+
+Files that already exist are skipped without any request. When a file is downloaded, the server's ETag is kept next to it (`<filepath>.etag`), and with `revalidate=True` an existing file with an ETag is downloaded again if a HEAD request shows that the ETag changed. Revalidating costs a rate-limited request per file, so it's off by default.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Iterable, Tuple, Dict, List, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from arxivedits.structures import Result
+
+INTERVAL = 5  # seconds between requests, to respect the server
+WORKERS = 4  # requests in flight at the same time
+CHUNK_SIZE = 8192
+REQUEST_TIMEOUT = 60  # seconds
+
+# called with (url, result) as soon as each file is fetched
+Callback = Callable[[str, Result[Optional[str]]], None]
+
+
+class RateLimiter:
+    """
+    Lets at most one caller through every `interval` seconds. Remembers the last request across event loops, so consecutive `fetch_all()` calls are limited too.
+    """
+
+    def __init__(self, interval: float = INTERVAL) -> None:
+        self.interval = interval
+        self.last = -float("inf")
+        self.lock: Optional[asyncio.Lock] = None
+
+    async def wait(self) -> None:
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            delay = self.last + self.interval - time.monotonic()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self.last = time.monotonic()
+
+
+def etag_path(filepath: str) -> str:
+    return f"{filepath}.etag"
+
+
+def load_etag(filepath: str) -> Optional[str]:
+    try:
+        with open(etag_path(filepath)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def make_session(workers: int = WORKERS) -> requests.Session:
+    """
+    Creates a session that keeps up to `workers` connections per host open.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download(session: requests.Session, url: str, filepath: str) -> str:
+    """
+    Streams url to filepath (through a temporary file, so an interrupted download never looks finished) and saves the ETag, if any.
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    tmppath = f"{filepath}.tmp"
+
+    try:
+        with session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as req:
+            req.raise_for_status()
+
+            with open(tmppath, "wb") as file:
+                for chunk in req.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:  # filter out keep-alive new chunks
+                        file.write(chunk)
+
+            etag = req.headers.get("ETag")
+
+        os.replace(tmppath, filepath)
+    finally:
+        if os.path.isfile(tmppath):
+            os.remove(tmppath)
+
+    if etag:
+        with open(etag_path(filepath), "w") as file:
+            file.write(etag)
+
+    return filepath
+
+
+def is_current(session: requests.Session, url: str, filepath: str) -> bool:
+    """
+    Checks with a HEAD request whether the file at url still has the ETag it had when it was downloaded.
+    """
+    etag = load_etag(filepath)
+
+    response = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+
+    return response.headers.get("ETag") == etag
+
+
+class Fetcher:
+    """
+    Fetches files concurrently. Blocking `requests` calls run in a thread pool, share one connection pool and wait on one rate limiter. With `revalidate`, existing files are checked against their ETag.
+    """
+
+    def __init__(
+        self,
+        interval: float = INTERVAL,
+        workers: int = WORKERS,
+        session: Optional[requests.Session] = None,
+        revalidate: bool = False,
+    ) -> None:
+        self.session = session or make_session(workers)
+        self.workers = workers
+        self.limiter = RateLimiter(interval)
+        self.revalidate = revalidate
+
+    async def fetch(self, url: str, filepath: str) -> Result[Optional[str]]:
+        """
+        Downloads url to filepath unless it's already there (and, with `revalidate`, unchanged). Returns filepath if it was downloaded, None if it was skipped, or the error if the request or writing the file failed.
+        """
+        loop = asyncio.get_running_loop()
+
+        try:
+            if os.path.isfile(filepath):
+                if not self.revalidate or load_etag(filepath) is None:
+                    return None
+
+                await self.limiter.wait()
+                if await loop.run_in_executor(
+                    None, is_current, self.session, url, filepath
+                ):
+                    return None
+
+                logging.info(f"{url} changed since it was downloaded.")
+
+            await self.limiter.wait()
+            await loop.run_in_executor(None, download, self.session, url, filepath)
+        except (requests.exceptions.RequestException, OSError) as err:
+            return err
+
+        logging.info(f"downloaded {filepath}")
+
+        return filepath
+
+    async def fetch_all(
+        self, jobs: Iterable[Tuple[str, str]], on_result: Optional[Callback] = None
+    ) -> List[Result[Optional[str]]]:
+        self.limiter.lock = None  # locks belong to a single event loop
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def bounded(url: str, filepath: str) -> Result[Optional[str]]:
+            async with semaphore:
+                result = await self.fetch(url, filepath)
+
+            if on_result:
+                on_result(url, result)
+
+            return result
+
+        return await asyncio.gather(*[bounded(url, filepath) for url, filepath in jobs])
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def fetch_all(
+    jobs: Iterable[Tuple[str, str]],
+    interval: float = INTERVAL,
+    workers: int = WORKERS,
+    fetcher: Optional[Fetcher] = None,
+    on_result: Optional[Callback] = None,
+    revalidate: bool = False,
+) -> Dict[str, Result[Optional[str]]]:
+    """
+    Downloads every (url, filepath) pair. Returns, for each url, the filepath if it was downloaded, None if it was skipped, or the error. `revalidate` is ignored when a fetcher is given.
+    """
+    jobs = list(jobs)
+    owned = fetcher is None
+    fetcher = fetcher or Fetcher(interval, workers, revalidate=revalidate)
+
+    try:
+        results = asyncio.run(fetcher.fetch_all(jobs, on_result))
+    finally:
+        if owned:
+            fetcher.close()
+
+    return {url: result for (url, _), result in zip(jobs, results)}
@@ -2,21 +2,27 @@
 Quality filters for documents, document pairs and sentences
 """
 
-import functools, re, string
+import functools, string, os
+from typing import List, Optional, Tuple, cast, TYPE_CHECKING
+
+import numpy as np
 
 from arxivedits.detex.constants import (
-    INLINE_MATH_TAG,
-    BLOCK_MATH_TAG,
-    CITE_TAG,
-    REF_TAG,
+    SPECIAL_TOKENS,
+    SPECIAL_TOKEN_PATTERN,
+    HEADING_PATTERN,
 )
 
-from arxivedits import util, data, preprocess
+from arxivedits import util, data, doc_stats
+from arxivedits.structures import Result
+
+if TYPE_CHECKING:
+    from arxivedits.alignment.sentence import SentenceID
 
 
 @functools.lru_cache(maxsize=128)
 def is_title(line: str) -> bool:
-    return re.match("^#+ .", line) is not None
+    return HEADING_PATTERN.match(line) is not None
 
 
 def is_title_or_newline(line: str) -> bool:
@@ -39,97 +45,183 @@ def sent_filter(sent: str) -> bool:
     Returns `True` is a sentence is a good sentence, `False` if a sentence shouldn't be considered.
     """
 
-    if re.match("^#+ .", sent) is not None:
+    if HEADING_PATTERN.match(sent) is not None:
         return True
 
-    len_no_punctuation = len(
-        [tok for tok in sent.split() if tok not in string.punctuation]
-    )
-    len_no_punctuation_no_special_tokens_no_number = len(
-        [
-            tok
-            for tok in sent.split()
-            if tok not in string.punctuation
-            and tok not in [INLINE_MATH_TAG, BLOCK_MATH_TAG, CITE_TAG, REF_TAG]
-            and not tok.isnumeric()
-        ]
-    )
+    len_no_punctuation = 0
+    len_no_punctuation_no_special_tokens_no_number = 0
 
-    count_special_tokens = (
-        sent.count(INLINE_MATH_TAG)
-        + sent.count(BLOCK_MATH_TAG)
-        + sent.count(REF_TAG)
-        + sent.count(CITE_TAG)
-    )
+    for tok in sent.split():
+        if tok in string.punctuation:
+            continue
+
+        len_no_punctuation += 1
+
+        if tok not in SPECIAL_TOKENS and not tok.isnumeric():
+            len_no_punctuation_no_special_tokens_no_number += 1
 
     if len_no_punctuation_no_special_tokens_no_number <= 3:
         return False
 
+    sent, count_special_tokens = SPECIAL_TOKEN_PATTERN.subn(" ", sent)
+
     if count_special_tokens >= 0.5 * len_no_punctuation:
         return False
 
-    sent = (
-        sent.replace(INLINE_MATH_TAG, " ")
-        .replace(BLOCK_MATH_TAG, " ")
-        .replace(REF_TAG, " ")
-        .replace(CITE_TAG, " ")
-    )
+    len_no_spaces = len(sent) - sent.count(" ")
 
-    if [ch for ch in sent if ch != " "]:
-        score = (len([ch for ch in sent if ch.isalpha()]) + count_special_tokens) / (
-            len([ch for ch in sent if ch != " "]) + count_special_tokens
-        )
-        if score <= 0.7:
-            return False
-    else:
+    if not len_no_spaces:
         return False
 
-    return True
+    len_alpha = sum(map(str.isalpha, sent))
+
+    score = (len_alpha + count_special_tokens) / (len_no_spaces + count_special_tokens)
+
+    return score > 0.7
+
+
+def sent_filter_all(sentences: List[str]) -> np.ndarray:
+    """
+    Runs sent_filter() on every sentence in a document.
+    """
+    return np.fromiter(
+        (sent_filter(sent) for sent in sentences), dtype=bool, count=len(sentences)
+    )
+
+
+# bits of a sentence's flags
+PASSES_FILTER = 1  # sent_filter()
+TITLE = 2  # is_title()
+NEWLINE = 4  # blank line between paragraphs
+BORING = 8  # is_boring()
+
+# length is kept so a flag can be checked against the sentence it was computed for
+FLAGS_DTYPE = np.dtype([("flags", np.uint8), ("length", np.uint32)])
+
+
+def sentence_flags(lines: List[str]) -> np.ndarray:
+    """
+    Computes the flags (PASSES_FILTER, TITLE, NEWLINE, BORING) of every line as a FLAGS_DTYPE array.
+    """
+    result = np.zeros(len(lines), dtype=FLAGS_DTYPE)
+
+    passes = sent_filter_all(lines)
+    titles = np.array([is_title(line) for line in lines], dtype=bool)
+    newlines = np.array([line == "" for line in lines], dtype=bool)
+
+    result["flags"] = (
+        passes * PASSES_FILTER
+        + titles * TITLE
+        + newlines * NEWLINE
+        + (newlines | titles | ~passes) * BORING
+    )
+    result["length"] = [len(line) for line in lines]
+
+    return result
+
+
+def flags_match(flags: np.ndarray, lines: List[str]) -> bool:
+    """
+    Checks (by their lengths) that flags were computed for these lines.
+    """
+    return len(flags) == len(lines) and bool(
+        np.array_equal(flags["length"], [len(line) for line in lines])
+    )
+
+
+def get_sentence_flags(
+    arxivid: str, version: int, lines: Optional[List[str]] = None
+) -> Result[np.ndarray]:
+    """
+    Returns the flags of every line of `util.paragraphs_to_lines()` of a document. The flags are stored next to the sentences and only computed again when the sentences change, or, if `lines` is given, when they weren't computed for `lines`.
+    """
+    filepath = data.sentence_flags_path(arxivid, version)
+    sentencepath = data.sentence_path(arxivid, version)
+
+    if os.path.isfile(filepath) and os.path.getmtime(filepath) >= os.path.getmtime(
+        sentencepath
+    ):
+        flags = cast(np.ndarray, np.load(filepath))
+
+        if lines is None or flags_match(flags, lines):
+            return flags
+
+    if lines is None:
+        pgs = data.get_paragraphs(arxivid, version)
+
+        if isinstance(pgs, Exception):
+            return pgs
+
+        lines = util.paragraphs_to_lines(pgs)
+
+    flags = sentence_flags(lines)
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmppath = f"{filepath}.{os.getpid()}.tmp.npy"
+    np.save(tmppath, flags)
+    os.replace(tmppath, filepath)
+
+    return flags
+
+
+@functools.lru_cache(maxsize=256)
+def load_sentence_flags(
+    arxivid: str, version: int
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns a document's flags and the index of the first line of every paragraph, or None if the document can't be read.
+    """
+    flags = get_sentence_flags(arxivid, version)
+
+    if isinstance(flags, Exception):
+        return None
+
+    newlines = np.flatnonzero(flags["flags"] & NEWLINE)
+    starts = np.concatenate(([0], newlines + 1))
+
+    return flags, starts
+
+
+def is_boring_id(sent_id: "SentenceID", sent: str) -> bool:
+    """
+    Same as is_boring(sent), but reads the stored flag of the sentence at sent_id. Falls back to is_boring() if the flags can't be loaded or were computed for a different sentence.
+    """
+    loaded = load_sentence_flags(sent_id.arxivid, sent_id.version)
+
+    if loaded is not None:
+        flags, starts = loaded
+
+        if sent_id.paragraph_index < len(starts):
+            index = starts[sent_id.paragraph_index] + sent_id.sentence_index
+
+            if index < len(flags) and flags["length"][index] == len(sent):
+                return bool(flags["flags"][index] & BORING)
+
+    return is_boring(sent)
 
 
 def doc_filter(arxivid: str, version: int) -> bool:
     """
     Checks if the document uses the harvmac package.
     """
+    harvmac = doc_stats.get_uses_harvmac(arxivid, version)
 
-    input_harvmac_pattern = re.compile(r"^[^%]*\\input harvmac")
-
-    with open(data.latex_path(arxivid, version)) as file:
-        for line in file:
-            if input_harvmac_pattern.match(line):
-                return False
+    if isinstance(harvmac, Exception):
+        raise harvmac
 
-    return True
+    return not harvmac
 
 
 def doc_pair_filter(arxivid: str, v1: int, v2: int) -> bool:
     """
     Checks if there are more than 5000 pairs where both sentences have 3+ [MATH] tags.
     """
-    with_3_plus_v1 = 0
-    with_3_plus_v2 = 0
-
-    pgs1 = data.get_paragraphs(arxivid, v1)
-    if isinstance(pgs1, Exception):
+    counts1 = doc_stats.get_line_counts(arxivid, v1)
+    if isinstance(counts1, Exception):
         return False
 
-    pgs2 = data.get_paragraphs(arxivid, v2)
-    if isinstance(pgs2, Exception):
+    counts2 = doc_stats.get_line_counts(arxivid, v2)
+    if isinstance(counts2, Exception):
         return False
 
-    lines1 = util.paragraphs_to_lines(pgs1)
-    lines2 = util.paragraphs_to_lines(pgs2)
-
-    for line in lines1:
-        sent = preprocess.preprocess_sent(line)
-        words = util.sent_to_words(sent)
-        if len([word for word in words if word in (INLINE_MATH_TAG)]) >= 3:
-            with_3_plus_v1 += 1
-
-    for line in lines2:
-        sent = preprocess.preprocess_sent(line)
-        words = util.sent_to_words(sent)
-        if len([word for word in words if word in (INLINE_MATH_TAG)]) >= 3:
-            with_3_plus_v2 += 1
-
-    return with_3_plus_v1 * with_3_plus_v2 > 5000
+    return counts1.math_lines * counts2.math_lines > 5000
@@ -9,7 +9,9 @@ import pathlib
 import os
 import ctypes
 
-from typing import List, TypeVar, Dict, Tuple, cast
+from typing import List, TypeVar, Dict, Tuple, Iterable, Optional, cast
+
+import numpy as np
 
 
 T = TypeVar("T")  # pylint: disable=invalid-name
@@ -32,6 +34,14 @@ class SEQUENCE(ctypes.Structure):
 
 lcsmodule = ctypes.cdll.LoadLibrary(os.path.join(pwd, "lcsmodule", "lcs.so"))
 lcsmodule.lcs.restype = ctypes.POINTER(SEQUENCE)
+lcsmodule.similarityBatch.restype = ctypes.c_int
+lcsmodule.similarityBatch.argtypes = [
+    np.ctypeslib.ndpointer(np.intc, flags="C_CONTIGUOUS"),
+    np.ctypeslib.ndpointer(np.longlong, flags="C_CONTIGUOUS"),
+    np.ctypeslib.ndpointer(np.longlong, flags="C_CONTIGUOUS"),
+    ctypes.c_long,
+    np.ctypeslib.ndpointer(np.double, flags="C_CONTIGUOUS"),
+]
 
 
 def slow_lcs(seq1: List[T], seq2: List[T]) -> List[T]:
@@ -98,6 +108,46 @@ def lcs(s1: List[str], s2: List[str]) -> List[str]:
     return ret
 
 
+def intern(
+    sequences: Iterable[List[str]], vocabulary: Optional[Dict[str, int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts sequences of tokens to one array of token ids, plus offsets so that sequence i is `ids[offsets[i] : offsets[i + 1]]`.
+    """
+    if vocabulary is None:
+        vocabulary = {}
+
+    ids: List[int] = []
+    offsets = [0]
+
+    for sequence in sequences:
+        ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in sequence)
+        offsets.append(len(ids))
+
+    return np.array(ids, dtype=np.intc), np.array(offsets, dtype=np.longlong)
+
+
+def similarity_batch(
+    ids: np.ndarray, offsets: np.ndarray, pairs: np.ndarray
+) -> np.ndarray:
+    """
+    Scores each (i, j) row of `pairs`, comparing sequences i and j from `intern()`. Returns a (len(pairs) x 4) array of jaccard, diff, 2-gram jaccard and 2-gram diff similarity.
+    """
+    pairs = np.ascontiguousarray(pairs, dtype=np.longlong).reshape(-1, 2)
+    scores = np.zeros((len(pairs), 4), dtype=np.double)
+
+    if len(pairs) and lcsmodule.similarityBatch(
+        np.ascontiguousarray(ids, dtype=np.intc),
+        np.ascontiguousarray(offsets, dtype=np.longlong),
+        pairs,
+        len(pairs),
+        scores,
+    ):
+        raise MemoryError("out of memory scoring sentence pairs")
+
+    return scores
+
+
 if __name__ == "__main__":
     # print(lcs([""], ["\x00"]))
     pass
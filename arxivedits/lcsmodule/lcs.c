@@ -127,6 +127,211 @@ void freeSequence(struct Sequence *seq)
     free(seq);
 }
 
+/*
+Similarity kernel. Sentences are arrays of interned token ids; items are either
+single tokens (width 1) or bigrams (width 2).
+*/
+
+static int itemsEqual(const int *a, const int *b, int width)
+{
+    for (int k = 0; k < width; k++)
+    {
+        if (a[k] != b[k])
+        {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+/*
+Length of the longest common subsequence of items. diff_match_patch (which
+similarity.get_diff_sim used) sees the last line of each text without its
+trailing newline, so the last item only ever matches the other last item.
+Returns -1 if memory runs out.
+*/
+static long lcsLength(const int *a, long n, const int *b, long m, int width)
+{
+    long *prev = calloc(m + 1, sizeof(long));
+    long *cur = calloc(m + 1, sizeof(long));
+
+    if (!prev || !cur)
+    {
+        free(prev);
+        free(cur);
+        return -1;
+    }
+
+    for (long i = 0; i < n; i++)
+    {
+        for (long j = 0; j < m; j++)
+        {
+            if (itemsEqual(&a[i], &b[j], width) && (i == n - 1) == (j == m - 1))
+            {
+                cur[j + 1] = prev[j] + 1;
+            }
+            else
+            {
+                cur[j + 1] = prev[j + 1] > cur[j] ? prev[j + 1] : cur[j];
+            }
+        }
+
+        long *tmp = prev;
+        prev = cur;
+        cur = tmp;
+    }
+
+    long length = prev[m];
+
+    free(prev);
+    free(cur);
+
+    return length;
+}
+
+static int compareKeys(const void *a, const void *b)
+{
+    long long x = *(const long long *)a;
+    long long y = *(const long long *)b;
+    return (x > y) - (x < y);
+}
+
+/* Sorts and deduplicates the items of a sentence, returning how many are unique. */
+static long uniqueKeys(const int *tokens, long n, int width, long long *keys)
+{
+    for (long i = 0; i < n; i++)
+    {
+        keys[i] = width == 1
+                      ? tokens[i]
+                      : ((long long)tokens[i] << 32) | (unsigned int)tokens[i + 1];
+    }
+
+    qsort(keys, n, sizeof(long long), compareKeys);
+
+    long unique = 0;
+
+    for (long i = 0; i < n; i++)
+    {
+        if (!unique || keys[i] != keys[unique - 1])
+        {
+            keys[unique++] = keys[i];
+        }
+    }
+
+    return unique;
+}
+
+/* Returns -1 if memory runs out. */
+static double jaccard(const int *a, long n, const int *b, long m, int width)
+{
+    if (n <= 0 || m <= 0)
+    {
+        return 0;
+    }
+
+    long long *keys1 = malloc(sizeof(long long) * n);
+    long long *keys2 = malloc(sizeof(long long) * m);
+
+    if (!keys1 || !keys2)
+    {
+        free(keys1);
+        free(keys2);
+        return -1;
+    }
+
+    long unique1 = uniqueKeys(a, n, width, keys1);
+    long unique2 = uniqueKeys(b, m, width, keys2);
+
+    long common = 0;
+
+    for (long i = 0, j = 0; i < unique1 && j < unique2;)
+    {
+        if (keys1[i] == keys2[j])
+        {
+            common++;
+            i++;
+            j++;
+        }
+        else if (keys1[i] < keys2[j])
+        {
+            i++;
+        }
+        else
+        {
+            j++;
+        }
+    }
+
+    free(keys1);
+    free(keys2);
+
+    return (double)common / (unique1 + unique2 - common);
+}
+
+/* Returns -1 if memory runs out. */
+static double diffSimilarity(const int *a, long n, const int *b, long m, int width)
+{
+    if (n <= 0 || m <= 0)
+    {
+        return 0;
+    }
+
+    long common = lcsLength(a, n, b, m, width);
+
+    if (common < 0)
+    {
+        return -1;
+    }
+
+    return ((double)common / n + (double)common / m) / 2;
+}
+
+/*
+Fills scores with the jaccard, diff, 2-gram jaccard and 2-gram diff similarity
+of two sentences. Returns 0, or -1 if memory runs out.
+*/
+int similarity(const int *a, long n, const int *b, long m, double *scores)
+{
+    scores[0] = jaccard(a, n, b, m, 1);
+    scores[1] = diffSimilarity(a, n, b, m, 1);
+    scores[2] = jaccard(a, n - 1, b, m - 1, 2);
+    scores[3] = diffSimilarity(a, n - 1, b, m - 1, 2);
+
+    for (int s = 0; s < 4; s++)
+    {
+        if (scores[s] < 0)
+        {
+            return -1;
+        }
+    }
+
+    return 0;
+}
+
+/*
+Scores many pairs at once. Sentence i is tokens[offsets[i]:offsets[i + 1]], and
+pair k compares sentences pairs[2k] and pairs[2k + 1], writing 4 scores to
+scores[4k:4k + 4]. Returns 0, or -1 if memory runs out.
+*/
+int similarityBatch(const int *tokens, const long long *offsets, const long long *pairs, long npairs, double *scores)
+{
+    for (long k = 0; k < npairs; k++)
+    {
+        long long i = pairs[2 * k];
+        long long j = pairs[2 * k + 1];
+
+        if (similarity(
+                &tokens[offsets[i]], (long)(offsets[i + 1] - offsets[i]),
+                &tokens[offsets[j]], (long)(offsets[j + 1] - offsets[j]),
+                &scores[4 * k]) != 0)
+        {
+            return -1;
+        }
+    }
+
+    return 0;
+}
+
 /*
 Must be called like so:
 ./lcs <length 1> <length 2> <sequence> <of> <words1> <sequence2> 
@@ -0,0 +1,151 @@
+"""
+Progress and throughput counters for each pipeline stage (download, extract, detex, sentences). Stages update the counters as they process documents, and the counters are written to data/metrics.json and data/metrics.prom (Prometheus text format) so progress can be watched without scanning the corpus.
+"""
+
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any
+
+from arxivedits import data
+
+WRITE_INTERVAL = 10  # seconds between writes while a stage is running
+
+
+@dataclass
+class StageMetrics:
+    stage: str
+    queued: int = 0
+    documents: int = 0
+    failures: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.time)
+    finished: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.queued - self.documents - self.failures, 0)
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["seconds"] = self.seconds
+        result["queue_depth"] = self.queue_depth
+        result["documents_per_second"] = self.documents_per_second
+        result["bytes_per_second"] = self.bytes_per_second
+        return result
+
+
+STAGES: Dict[str, StageMetrics] = {}
+
+_last_write = 0.0
+
+
+def start(stage: str, queued: int = 0) -> StageMetrics:
+    """
+    Resets the counters for a stage that's about to process `queued` documents.
+    """
+    STAGES[stage] = StageMetrics(stage, queued=queued)
+    write()
+    return STAGES[stage]
+
+
+def record(stage: str, nbytes: int = 0, failed: bool = False) -> None:
+    """
+    Counts one processed (or failed) document of `nbytes` bytes.
+    """
+    metrics = STAGES.setdefault(stage, StageMetrics(stage))
+
+    if failed:
+        metrics.failures += 1
+    else:
+        metrics.documents += 1
+        metrics.bytes += nbytes
+
+    if time.time() - _last_write > WRITE_INTERVAL:
+        write()
+
+
+def finish(stage: str) -> None:
+    """
+    Stops a stage's clock, logs a summary and writes the metrics files.
+    """
+    metrics = STAGES.setdefault(stage, StageMetrics(stage))
+    metrics.finished = time.time()
+
+    logging.info(
+        f"{stage}: {metrics.documents} documents ({metrics.failures} failed) in {metrics.seconds:.1f}s, {metrics.documents_per_second:.2f} documents/s, {metrics.bytes_per_second / 1e6:.2f} MB/s."
+    )
+
+    write()
+
+
+def to_prometheus() -> str:
+    """
+    Formats every stage's counters in the Prometheus text exposition format.
+    """
+    # the *_total counts only go up while a stage runs; the rest go up and down
+    series = [
+        ("documents_total", "counter", "Documents processed.", lambda m: m.documents),
+        ("failures_total", "counter", "Documents that failed.", lambda m: m.failures),
+        ("bytes_total", "counter", "Bytes processed.", lambda m: m.bytes),
+        (
+            "queue_depth",
+            "gauge",
+            "Documents waiting to be processed.",
+            lambda m: m.queue_depth,
+        ),
+        (
+            "documents_per_second",
+            "gauge",
+            "Throughput.",
+            lambda m: m.documents_per_second,
+        ),
+        ("bytes_per_second", "gauge", "Throughput.", lambda m: m.bytes_per_second),
+        ("seconds", "gauge", "Time spent in the stage.", lambda m: m.seconds),
+    ]
+
+    lines: List[str] = []
+
+    for name, kind, description, value in series:
+        lines.append(f"# HELP arxivedits_{name} {description}")
+        lines.append(f"# TYPE arxivedits_{name} {kind}")
+        for stage, metrics in sorted(STAGES.items()):
+            lines.append(f'arxivedits_{name}{{stage="{stage}"}} {value(metrics)}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _write_file(filepath: str, content: str) -> None:
+    # replaces the file in one step so readers never see a partial file
+    tmppath = f"{filepath}.tmp"
+    with open(tmppath, "w") as file:
+        file.write(content)
+    os.replace(tmppath, filepath)
+
+
+def write() -> None:
+    global _last_write
+
+    _write_file(
+        str(data.METRICS_PATH),
+        json.dumps(
+            {stage: metrics.to_dict() for stage, metrics in STAGES.items()}, indent=2
+        ),
+    )
+    _write_file(str(data.PROMETHEUS_PATH), to_prometheus())
+
+    _last_write = time.time()
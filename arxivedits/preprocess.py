@@ -1,18 +1,28 @@
 import os, pickle, functools
+from typing import Dict
 
 from arxivedits import tokenizer, data
 
-tok = tokenizer.CoreNLPTokenizer()
-
 preprocess_filename = os.path.join(data.ALIGNMENT_DIR, "preprocess_sent_dict.pkl")
 
-with open(preprocess_filename, "rb",) as global_file:
-    preprocess_sent_dict = pickle.load(global_file)
+
+@functools.lru_cache(maxsize=1)
+def get_tokenizer() -> tokenizer.CoreNLPTokenizer:
+    """
+    Starts CoreNLP the first time a sentence is tokenized instead of on import, so modules that import this one can be imported (and tested) without it.
+    """
+    return tokenizer.CoreNLPTokenizer()
+
+
+@functools.lru_cache(maxsize=1)
+def get_preprocess_sent_dict() -> Dict[str, str]:
+    with open(preprocess_filename, "rb",) as global_file:
+        return dict(pickle.load(global_file))
 
 
 def save_preprocess_sent_dict() -> None:
     with open(preprocess_filename, "wb") as file:
-        pickle.dump(preprocess_sent_dict, file)
+        pickle.dump(get_preprocess_sent_dict(), file)
 
 
 @functools.lru_cache(maxsize=512)
@@ -23,10 +33,12 @@ def preprocess_sent(sent: str) -> str:
     if sent.isspace():
         return ""
 
+    preprocess_sent_dict = get_preprocess_sent_dict()
+
     if sent in preprocess_sent_dict:
         return sent
 
-    processed = " ".join(tok.tokenize(sent).words())
+    processed = " ".join(get_tokenizer().tokenize(sent).words())
 
     processed = (
         processed.replace("[ MATH ]", " [MATH] ")
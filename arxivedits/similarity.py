@@ -1,10 +1,12 @@
 import functools
 
-from typing import Set, Any, Iterable
+from typing import Set, Any, Iterable, List
 
 from dataclasses import dataclass
 
-from arxivedits import alignment, diff, util
+import numpy as np
+
+from arxivedits import diff, util, preprocess, lcs
 
 
 @dataclass
@@ -44,48 +46,47 @@ def get_diff_sim(a: Iterable[Any], b: Iterable[Any]) -> float:
     return 1 - (length_removed / length_original + length_added / length_new) / 2
 
 
-@functools.lru_cache(maxsize=512)
-def get_similarity(sent1: str, sent2: str) -> Similarity:
-    if not sent1 or sent1.isspace() or not sent2 or sent2.isspace():
-        return Similarity.default()
+def is_empty(sent: str) -> bool:
+    return not sent or sent.isspace()
 
-    if sent1 == sent2:
-        return Similarity.identical()
 
-    try:
-        sent1 = alignment.util.preprocess_single_sent(sent1)
-        sent2 = alignment.util.preprocess_single_sent(sent2)
-    except Exception as err:
-        print(sent1, len(sent1))
-        print(sent2, len(sent2))
-        raise err
+def similarity_matrix(sents1: List[str], sents2: List[str]) -> np.ndarray:
+    """
+    Scores every sentence in `sents1` against every sentence in `sents2` with the compiled kernel in lcsmodule. Returns a (len(sents1) x len(sents2) x 4) array with the fields of `Similarity` in order (jaccard, diff, 2-gram jaccard, 2-gram diff).
+    """
+    processed = [
+        "" if is_empty(sent) else preprocess.preprocess_sent(sent)
+        for sent in sents1 + sents2
+    ]
 
-    if not sent1 or sent1.isspace() or not sent2 or sent2.isspace():
-        return Similarity.default()
+    ids, offsets = lcs.intern(util.sent_to_words(sent) for sent in processed)
 
-    if sent1 == sent2:
-        return Similarity.identical()
+    n1, n2 = len(sents1), len(sents2)
 
-    jaccard_sim = get_jaccard_sim(
-        set(util.sent_to_words(sent1)), set(util.sent_to_words(sent2)),
+    pairs = np.stack(
+        np.meshgrid(np.arange(n1), np.arange(n1, n1 + n2), indexing="ij"), axis=2
     )
 
-    diff_sim = get_diff_sim(util.sent_to_words(sent1), util.sent_to_words(sent2))
+    matrix = lcs.similarity_batch(ids, offsets, pairs).reshape(n1, n2, 4)
 
-    jaccard_2_gram_sim = get_jaccard_sim(
-        set(util.sent_to_n_grams(sent1, 2)), set(util.sent_to_n_grams(sent2, 2))
-    )
+    # the same special cases as comparing sentences one at a time
+    raw_ids, _ = lcs.intern([[sent] for sent in sents1 + sents2])
+    processed_ids, _ = lcs.intern([[sent] for sent in processed])
 
-    diff_2_gram_sim = get_diff_sim(
-        util.sent_to_n_grams(sent1, 2), util.sent_to_n_grams(sent2, 2)
-    )
+    raw_empty = np.array([is_empty(sent) for sent in sents1 + sents2], dtype=bool)
+    processed_empty = np.array([is_empty(sent) for sent in processed], dtype=bool)
 
-    return Similarity(
-        jaccard_sim=jaccard_sim,
-        jaccard_2_gram_sim=jaccard_2_gram_sim,
-        diff_sim=diff_sim,
-        diff_2_gram_sim=diff_2_gram_sim,
-    )
+    matrix[np.equal.outer(processed_ids[:n1], processed_ids[n1:])] = 1
+    matrix[np.logical_or.outer(processed_empty[:n1], processed_empty[n1:])] = 0
+    matrix[np.equal.outer(raw_ids[:n1], raw_ids[n1:])] = 1
+    matrix[np.logical_or.outer(raw_empty[:n1], raw_empty[n1:])] = 0
+
+    return matrix
+
+
+@functools.lru_cache(maxsize=512)
+def get_similarity(sent1: str, sent2: str) -> Similarity:
+    return Similarity(*similarity_matrix([sent1], [sent2])[0, 0].tolist())
 
 
 def main() -> None:
@@ -2,25 +2,46 @@
 Downloads source files from arxiv.org and extracts the largest .tex file.
 """
 # Builtin
-from typing import List, Tuple, Optional, Dict, cast, BinaryIO
+from typing import (
+    List,
+    Tuple,
+    Optional,
+    Dict,
+    Set,
+    Iterator,
+    Iterable,
+    Container,
+    Union,
+    Any,
+    cast,
+    BinaryIO,
+)
 import tarfile
 import gzip
+import codecs
 import os
-import shutil
+import posixpath
 import time
 import re
 import random
 import logging
 import pathlib
 import enum
+import json
+import csv
+import datetime
+import collections
+import itertools
+import multiprocessing
+import multiprocessing.connection
+from dataclasses import dataclass
 
 # External
-import requests
 import magic
 
 # internal
 from arxivedits.structures import ArxivID, Result
-from arxivedits import util, data
+from arxivedits import util, data, store, cache, fetch, metrics, state
 
 
 class FileType(enum.Enum):
@@ -38,6 +59,32 @@ class FileType(enum.Enum):
 
 TIMEOUT = 5
 
+EPRINT_URL = "https://arxiv.org/e-print/"
+PDF_URL = "https://arxiv.org/pdf/"
+
+
+class ExtractionError(Exception):
+    """
+    A source file that couldn't be extracted, along with its (outermost unsupported) filetype.
+    """
+
+    def __init__(self, message: str, filetype: FileType = FileType.UNKNOWN) -> None:
+        super().__init__(message)
+        self.filetype = filetype
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str, FileType]]:
+        return (ExtractionError, (str(self), self.filetype))
+
+
+# bump whenever a change to extraction changes its output, so every source is extracted again
+EXTRACTOR_VERSION = 1
+
+WORKERS = 1  # archives extracted at the same time
+EXTRACT_TIMEOUT = 120  # seconds per archive when extracting in parallel
+
+CHUNK_SIZE = 64 * 1024  # bytes read (and decompressed) at a time
+MAX_BYTES = 128 * 1024 * 1024  # most .tex bytes read from one source file
+
 
 INCLUDEPATTERN = re.compile(
     r"^[^%]*\\(?:include|includeonly|input|@input|bibliography).*?[{ ](.*?)(?:\}| |\n|$)"
@@ -47,26 +94,25 @@ DOCUMENTPATTERN = re.compile(
     r"^\s*\\(?:documentclass(?:\[.*?\])?\{.+?\}|begin\{document\})"
 )
 
-TMP_DIR = "tmp"
-
-
-def download_file(url: str, local_filename: str) -> str:
-    """
-    Downloads a file by streaming it. Taken from # https://stackoverflow.com/questions/16694907/download-large-file-in-python-with-requests
-    """
-
-    dirpath = os.path.dirname(local_filename)
-    os.makedirs(dirpath, exist_ok=True)
+# a line starting a LaTeX document, in the first bytes of a file
+TEXMARKERPATTERN = re.compile(
+    rb"^[ \t]*\\(?:documentclass|documentstyle|begin\{document\})", re.MULTILINE
+)
 
-    # NOTE the stream=True parameter below
-    with requests.get(url, stream=True) as req:
-        req.raise_for_status()
-        with open(local_filename, "wb") as file:
-            for chunk in req.iter_content(chunk_size=8192):
-                if chunk:  # filter out keep-alive new chunks
-                    file.write(chunk)
+# (offset, signature, filetype)
+SIGNATURES = [
+    (0, b"\x1f\x8b", FileType.GZIP),
+    (0, b"%PDF-", FileType.PDF),
+    (0, b"%!PS", FileType.POSTSCRIPT),
+    (0, b"\xc5\xd0\xd3\xc6", FileType.IMAGE),  # DOS EPS binary
+    (0, b"\x89PNG\r\n\x1a\n", FileType.IMAGE),
+    (0, b"\xff\xd8\xff", FileType.IMAGE),  # JPEG
+    (0, b"GIF87a", FileType.IMAGE),
+    (0, b"GIF89a", FileType.IMAGE),
+    (257, b"ustar", FileType.TAR),
+]
 
-    return local_filename
+HEADER_SIZE = 4096
 
 
 def parse_filetype(mime: str, raw: str) -> FileType:
@@ -97,14 +143,33 @@ def parse_filetype(mime: str, raw: str) -> FileType:
     return FileType.UNKNOWN
 
 
+def sniff_filetype(buffer: bytes) -> Optional[FileType]:
+    """
+    Recognizes a file from the signature in its first bytes. Returns None if the header isn't conclusive.
+    """
+    for offset, signature, filetype in SIGNATURES:
+        if buffer.startswith(signature, offset):
+            return filetype
+
+    if b"\x00" not in buffer and TEXMARKERPATTERN.search(buffer):
+        return FileType.TEX
+
+    return None
+
+
 def get_filetype(file: BinaryIO, ext: str) -> FileType:
     """
-    returns the filetype of a file using magic (file utility on unix). Resets the file pointer to the start of the file.
+    returns the filetype of a file using its signature, or magic (file utility on unix) if the signature isn't conclusive. Resets the file pointer to the start of the file.
     """
     try:
-        file.seek(0)  # ensures that we read the first 1024 bytes
-        buffer = file.read(4096)
+        file.seek(0)  # ensures that we read the first 4096 bytes
+        buffer = file.read(HEADER_SIZE)
         file.seek(0)  # resets the position to the start.
+
+        sniffed = sniff_filetype(buffer)
+        if sniffed:
+            return sniffed
+
         result = parse_filetype(
             magic.from_buffer(buffer, mime=True), magic.from_buffer(buffer, mime=False),
         )
@@ -122,91 +187,241 @@ def is_downloaded(arxivid: str, version: int) -> bool:
     Check if a document is downloaded.
     """
 
-    return os.path.isfile(data.source_path(arxivid, version))
+    return state.is_done(
+        arxivid, version, state.DOWNLOADED, data.source_path(arxivid, version)
+    )
 
 
-def is_extracted(arxivid: str, version: int) -> bool:
+def is_extracted(arxivid: str, version: int, verify: bool = False) -> bool:
     """
-    Checks if a document was extracted.
+    Checks if a document was extracted. With `verify`, also checks that its .tex file wasn't removed or changed since.
     """
-    return os.path.isfile(data.latex_path(arxivid, version))
+    return state.is_done(
+        arxivid, version, state.EXTRACTED, data.latex_path(arxivid, version), verify
+    )
 
 
-def add_folder_to_dict(dirpath: str, dictionary: Dict[str, List[str]]) -> None:
+def read_text(file: BinaryIO, max_bytes: int = MAX_BYTES) -> Iterator[str]:
     """
-    Opens a folder and recursively adds all .tex to the dictionary.
+    Decodes a (possibly gzipped) file as UTF-8 in CHUNK_SIZE pieces, ignoring invalid bytes. Raises a ValueError after more than max_bytes.
     """
-    for filename in os.listdir(dirpath):
-        filepath = os.path.join(dirpath, filename).lower()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    total = 0
 
-        if os.path.isfile(filepath):
-            # check if filemagic can determine type
-            with open(filepath, "rb") as file:
-                _, ext = os.path.splitext(filename)
-                filetype = get_filetype(file, ext)
+    while True:
+        chunk = file.read(CHUNK_SIZE)
 
-                if filetype != FileType.TEX:
-                    continue
+        if not chunk:
+            break
 
-                contents = file.read()
+        total += len(chunk)
 
-            lines = contents.decode("utf-8", errors="ignore").split("\n")
+        if total > max_bytes:
+            raise ValueError(f"more than {max_bytes} bytes of text")
 
-            lines = [line for line in lines if not line.lstrip().startswith("%")]
+        yield decoder.decode(chunk)
 
-            dictionary[filepath] = lines
-        else:
-            add_folder_to_dict(filepath, dictionary)
+    yield decoder.decode(b"", final=True)
 
 
-def get_lines(
-    filename: str, openfiles: Dict[str, List[str]], closedfiles: Dict[str, List[str]]
-) -> None:
+def normalize_path(path: str) -> str:
+    """
+    Normalizes paths like ./sub/Something.TEX to sub/something.tex so includes can be matched against archive members.
+    """
+    return posixpath.normpath(path.replace("\\", "/")).lower()
 
-    finallines = []
 
-    if filename in openfiles:
-        lines = openfiles[filename]
-        del openfiles[filename]
-    elif filename in closedfiles:
-        lines = closedfiles[filename]
-        del closedfiles[filename]
-    else:
-        logging.debug(openfiles.keys(), closedfiles.keys())
-        logging.debug(f"{filename} not in openfiles or closedfiles.")
-        closedfiles[filename] = []
-        return
+@dataclass
+class Segment:
+    """
+    Lines [start, end) of a .tex file, with how many characters they hold and whether one of them is a \\documentclass or \\begin{document}.
+    """
+
+    filename: str
+    start: int
+    end: int
+    length: int
+    documentclass: bool
+
+
+@dataclass
+class Include:
+    """
+    A line that includes `path` (normalized, maybe without its extension). `line` is the include line itself, which is kept if it includes a .pdf.
+    """
+
+    line: Segment
+    path: str
+
+
+def read_tex_members(
+    tar: tarfile.TarFile, max_bytes: int = MAX_BYTES, names: Optional[Set[str]] = None
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yields the normalized name and the lines (without comments) of every .tex file in a tar archive, one file at a time and without writing anything to disk. If names is given, only those files are read. Raises a ValueError if the .tex files add up to more than max_bytes.
+    """
+    budget = max_bytes
+
+    for member in tar:
+        if not member.isfile():
+            continue
+
+        if names is not None and normalize_path(member.name) not in names:
+            continue
+
+        file = tar.extractfile(member)
+
+        if file is None:
+            continue
+
+        with file:
+            _, ext = os.path.splitext(member.name)
+            filetype = get_filetype(cast(BinaryIO, file), ext)
+
+            if filetype != FileType.TEX:
+                continue
 
-    for line in lines:
+            if member.size > budget:
+                raise ValueError(
+                    f"{member.name} goes over {max_bytes} bytes of .tex files"
+                )
+
+            budget -= member.size
+
+            contents = "".join(read_text(cast(BinaryIO, file), max_bytes))
+
+        lines = contents.split("\n")
+
+        lines = [line for line in lines if not line.lstrip().startswith("%")]
+
+        yield normalize_path(member.name), lines
+
+
+def split_includes(filename: str, lines: List[str]) -> List[Union[Segment, Include]]:
+    """
+    Splits a file into runs of ordinary lines and include lines. Only line numbers and lengths are kept, so the lines themselves can be dropped and read again later.
+    """
+    parts: List[Union[Segment, Include]] = []
+
+    start, length, documentclass = 0, 0, False
+
+    for i, line in enumerate(lines):
         m = INCLUDEPATTERN.match(line)
-        if m:
-            includepath = os.path.join(TMP_DIR, m.group(1))
+        isdocument = bool(DOCUMENTPATTERN.match(line))
+
+        if not m:
+            length += len(line)
+            documentclass = documentclass or isdocument
+            continue
+
+        if i > start:
+            parts.append(Segment(filename, start, i, length, documentclass))
 
-            # normalizes paths like ./sub/something.txt
-            includepath = str(pathlib.Path(includepath)).lower()
-            _, ext = os.path.splitext(includepath)
+        line_segment = Segment(filename, i, i + 1, len(line), isdocument)
+        parts.append(Include(line_segment, normalize_path(m.group(1))))
 
-            if not ext:
-                if (
-                    os.path.isfile(includepath + ".tex")
-                    and filename != includepath + ".tex"
-                ):
-                    includepath = includepath + ".tex"
+        start, length, documentclass = i + 1, 0, False
 
-                # elif os.path.isfile(includepath + ".cls"):
-                #     includepath = includepath + ".cls"
+    if len(lines) > start:
+        parts.append(Segment(filename, start, len(lines), length, documentclass))
 
-            _, ext = os.path.splitext(includepath)
+    return parts
+
+
+def get_include(
+    filename: str, includepath: str, files: Container[str]
+) -> Optional[str]:
+    """
+    Returns the file that an include of (normalized) includepath in filename refers to, or None if the include line should be kept as is (an include of a .pdf).
+    """
+    _, ext = os.path.splitext(includepath)
+
+    if not ext:
+        if includepath + ".tex" in files and filename != includepath + ".tex":
+            includepath = includepath + ".tex"
+
+    _, ext = os.path.splitext(includepath)
+
+    if ext in [".pdf"]:
+        return None
+
+    return includepath
+
+
+def resolve_segments(
+    files: Dict[str, List[Union[Segment, Include]]],
+) -> Dict[str, List[Segment]]:
+    """
+    Replaces every include in every file with the (recursively resolved) segments of the included file.
+
+    The include graph is built once. Files are resolved depth first in sorted order and each file is resolved only once. Includes of missing files are dropped, and includes that would form a cycle resolve to nothing.
+    """
+    # for every part, its segment or the file it includes
+    graph: Dict[str, List[Union[Segment, str]]] = {}
 
-            if ext not in [".pdf"]:
-                get_lines(includepath, openfiles, closedfiles)
-                finallines.extend(closedfiles[includepath])
+    for filename, parts in files.items():
+        graph[filename] = []
+
+        for part in parts:
+            if isinstance(part, Include):
+                include = get_include(filename, part.path, files)
+                graph[filename].append(part.line if include is None else include)
             else:
-                finallines.append(line)
-        else:
-            finallines.append(line)
+                graph[filename].append(part)
+
+    resolved: Dict[str, List[Segment]] = {}
+
+    def resolve(filename: str, stack: Set[str]) -> List[Segment]:
+        if filename in resolved:
+            return resolved[filename]
+
+        if filename not in files:
+            logging.debug(f"{filename} is not in the archive.")
+            return []
+
+        if filename in stack:
+            logging.debug(f"{filename} includes itself through {sorted(stack)}.")
+            return []
+
+        stack.add(filename)
+
+        segments: List[Segment] = []
+
+        for part in graph[filename]:
+            if isinstance(part, Segment):
+                segments.append(part)
+            else:
+                segments.extend(resolve(part, stack))
+
+        stack.remove(filename)
+
+        resolved[filename] = segments
+
+        return segments
+
+    for filename in sorted(files):
+        resolve(filename, set())
 
-    closedfiles[filename] = finallines
+    return {filename: resolved[filename] for filename in sorted(resolved)}
+
+
+def join_segments(segments: List[Segment], files: Dict[str, List[str]]) -> List[str]:
+    return [
+        line
+        for segment in segments
+        for line in files[segment.filename][segment.start : segment.end]
+    ]
+
+
+def resolve_includes(files: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Replaces every include in every file with the (recursively resolved) lines of the included file. See resolve_segments.
+    """
+    segments = resolve_segments(
+        {filename: split_includes(filename, lines) for filename, lines in files.items()}
+    )
+
+    return {filename: join_segments(segments[filename], files) for filename in segments}
 
 
 def filter_filename(filename: str) -> bool:
@@ -217,28 +432,41 @@ def filter_filename(filename: str) -> bool:
     return ext not in ["dtx", "sty", "bbl"]
 
 
-def tex_from_tar(tar: tarfile.TarFile) -> Optional[str]:
+def tex_from_tar(tar: tarfile.TarFile, max_bytes: int = MAX_BYTES) -> Optional[str]:
     """
     Constructs a .tex file from tarfile contents.
 
-    Removes all comments.
+    Removes all comments. Members are read straight from the archive, so several archives can be processed at once. The archive is read twice: once to choose the file, keeping only where each file's includes are, and once more for just the files the chosen one includes, so only those are ever in memory together.
     """
 
-    shutil.rmtree(TMP_DIR, ignore_errors=True)
-    os.makedirs(TMP_DIR, exist_ok=True)
+    openfiles = {
+        filename: split_includes(filename, lines)
+        for filename, lines in read_tex_members(tar, max_bytes)
+    }
+
+    # do the imports.
+    closedfiles = resolve_segments(openfiles)
 
-    tar.extractall(TMP_DIR)
+    bestfilename = choose_file(closedfiles, tar.name)
 
-    openfiles: Dict[str, List[str]] = {}
-    closedfiles: Dict[str, List[str]] = {}
+    if bestfilename is None:
+        return None
 
-    add_folder_to_dict(TMP_DIR, openfiles)
+    segments = closedfiles[bestfilename]
 
-    # do the imports.
-    while openfiles:
-        filepath = random.choice(list(openfiles))
-        get_lines(filepath, openfiles, closedfiles)
+    files = dict(
+        read_tex_members(tar, max_bytes, {segment.filename for segment in segments})
+    )
+
+    return "\n".join(join_segments(segments, files))
 
+
+def choose_file(
+    closedfiles: Dict[str, List[Segment]], tarname: Optional[str]
+) -> Optional[str]:
+    """
+    Chooses the main .tex file out of the resolved files in an archive: the longest non-empty file with a \\documentclass that isn't a .bbl, .sty or .dtx file.
+    """
     if not closedfiles:
         return None
 
@@ -246,42 +474,40 @@ def tex_from_tar(tar: tarfile.TarFile) -> Optional[str]:
     old_keys = closedfiles.keys()
 
     closedfiles = {
-        filename: lines
-        for filename, lines in closedfiles.items()
-        if sum([len(line) for line in lines]) > 0
+        filename: segments
+        for filename, segments in closedfiles.items()
+        if sum([segment.length for segment in segments]) > 0
     }
 
     if not closedfiles:
         begin = r"\begin{document}"
         documentclass = r"\documentclass{...}"
         logging.warning(
-            f"Didn't parse {tar.name} because there was no content in any of the following files: {list(old_keys)}"
+            f"Didn't parse {tarname} because there was no content in any of the following files: {list(old_keys)}"
         )
 
         return None
 
     if len(closedfiles) == 1:
-        bestfilename = util.get(closedfiles.keys())
-        return "\n".join(closedfiles[bestfilename])
+        return util.get(closedfiles.keys())
 
     # filter out files without a \documentclass
     old_keys = closedfiles.keys()
 
     closedfiles = {
-        filename: lines
-        for filename, lines in closedfiles.items()
-        if any([DOCUMENTPATTERN.match(line) for line in lines])
+        filename: segments
+        for filename, segments in closedfiles.items()
+        if any([segment.documentclass for segment in segments])
     }
 
     if len(closedfiles) == 1:
-        bestfilename = util.get(closedfiles.keys())
-        return "\n".join(closedfiles[bestfilename])
+        return util.get(closedfiles.keys())
 
     if not closedfiles:
         begin = r"\begin{document}"
         documentclass = r"\documentclass{...}"
         logging.warning(
-            f"Didn't parse {tar.name} because there was no {documentclass} or {begin} in any of the following files: {list(old_keys)}"
+            f"Didn't parse {tarname} because there was no {documentclass} or {begin} in any of the following files: {list(old_keys)}"
         )
 
         return None
@@ -290,36 +516,34 @@ def tex_from_tar(tar: tarfile.TarFile) -> Optional[str]:
     old_keys = closedfiles.keys()
 
     closedfiles = {
-        filename: lines
-        for filename, lines in closedfiles.items()
+        filename: segments
+        for filename, segments in closedfiles.items()
         if filter_filename(filename)
     }
 
     if len(closedfiles) == 1:
-        bestfilename = util.get(closedfiles.keys())
-        return "\n".join(closedfiles[bestfilename])
+        return util.get(closedfiles.keys())
 
     if not closedfiles:
         logging.warning(
-            f"Didn't parse {tar.name} because there was no file that wasn't a .bbl, .sty or .dtx"
+            f"Didn't parse {tarname} because there was no file that wasn't a .bbl, .sty or .dtx"
         )
 
         return None
 
     # now take the longest one in closedfiles
     filelengths = {
-        filename: sum([len(line) for line in closedfiles[filename]])
+        filename: sum([segment.length for segment in closedfiles[filename]])
         for filename in closedfiles
     }
 
-    bestfilename = max(filelengths, key=lambda f: filelengths[f])
-
-    return "\n".join(closedfiles[bestfilename])
+    # ties go to the first filename in sorted order
+    return max(sorted(filelengths), key=lambda f: filelengths[f])
 
 
-def extract(filepath: str) -> Optional[str]:
+def extract(filepath: str, max_bytes: int = MAX_BYTES) -> Iterator[str]:
     """
-    Takes a directory and creates a .tex file and returns the contents.
+    Takes a source file and yields the contents of its .tex file in chunks. Yields nothing if there is no .tex file. Raises an ExtractionError if the filetype isn't supported or the .tex file is more than max_bytes.
     """
 
     if os.path.isdir(filepath):
@@ -338,62 +562,118 @@ def extract(filepath: str) -> Optional[str]:
 
             elif filetype == FileType.PDF:
                 logging.info("Cannot parse PDF files.")
-                return None
+                return
 
             elif filetype == FileType.POSTSCRIPT:
                 logging.info("Cannot parse POSTSCRIPT files.")
-                return None
+                return
 
             elif filetype == FileType.TAR:
                 with tarfile.open(fileobj=file, mode="r") as tar:
                     try:
-                        return tex_from_tar(tar)
+                        content = tex_from_tar(tar, max_bytes)
                     except EOFError:
                         logging.warning(f"{filepath} was not downloaded correctly.")
-                        return None
+                        return
+                    except ValueError as err:
+                        raise ExtractionError(f"{filepath}: {err}", filetype)
+
+                if content:
+                    yield content
+                return
 
             elif filetype == FileType.TEX or filetype == FileType.TEXT:
                 # print(f"Reading directly from {filepath}")
-                return file.read().decode("utf-8", errors="ignore")
+                try:
+                    yield from read_text(file, max_bytes)
+                except ValueError as err:
+                    raise ExtractionError(f"{filepath}: {err}", filetype)
+                return
             else:
-                raise TypeError(f"{filetype} ({filepath}) not implemented yet.")
+                raise ExtractionError(
+                    f"{filetype} ({filepath}) not implemented yet.", filetype
+                )
 
 
-def download_source_files(
+def source_jobs(
     arxivid: str, version_count: int, download_pdf: bool = False
-) -> None:
+) -> List[Tuple[str, str]]:
     """
-    Makes {version_count} network requests, one for each source file, and writes them to disk. If download_pdf is true, also downloads the .pdf file.
+    Returns the (url, filepath) pairs to download for each of {version_count} versions: the source file and, if download_pdf is true, the .pdf file. Source files that are missing but still in the store are restored instead.
     """
 
     # arxivid = arxivid.replace("-", "/")  # make sure there are no dashes
 
+    jobs = []
+
     for version in range(1, version_count + 1):
-        url = f"https://arxiv.org/e-print/{arxivid}v{version}"
         filepath = data.source_path(arxivid, version)
 
-        if not os.path.isfile(filepath):
-            try:
-                download_file(url, filepath)
-                logging.info(f"downloaded {filepath}")
-            except requests.exceptions.HTTPError as err:
-                logging.warning(err)
-                logging.warning(f"Cannot download source for {arxivid}v{version}")
+        if not os.path.isfile(filepath) and store.restore(arxivid, version):
+            logging.info(f"restored {filepath} from the source store")
+            state.record(arxivid, version, state.DOWNLOADED, filepath)
 
-            time.sleep(TIMEOUT)  # respect the server
+        jobs.append((f"{EPRINT_URL}{arxivid}v{version}", filepath))
 
         if download_pdf:
-            url = f"https://arxiv.org/pdf/{arxivid}v{version}"
-            filepath = data.pdf_path(arxivid, version)
+            jobs.append(
+                (
+                    f"{PDF_URL}{arxivid}v{version}",
+                    data.pdf_path(arxivid, version),
+                )
+            )
 
-            if not os.path.isfile(filepath):
-                try:
-                    download_file(url, filepath)
-                except requests.exceptions.HTTPError as err:
-                    print(err)
-                    print(f"Cannot download source for {arxivid}v{version}")
-                print(f"downloaded pdf for {filepath}")
-                time.sleep(TIMEOUT)  # respect the server
+    return jobs
+
+
+def download_jobs(
+    jobs: List[Tuple[str, str]], fetcher: Optional[fetch.Fetcher] = None
+) -> None:
+    """
+    Downloads (url, filepath) pairs through `fetch`, so requests share a connection pool and a rate limit, and adds new source files to the store.
+    """
+    metrics.start("download", queued=len(jobs))
+
+    def on_result(url: str, result: Result[Optional[str]]) -> None:
+        if isinstance(result, Exception):
+            metrics.record("download", failed=True)
+        else:
+            metrics.record("download", os.path.getsize(result) if result else 0)
+
+    results = fetch.fetch_all(
+        jobs, interval=TIMEOUT, fetcher=fetcher, on_result=on_result
+    )
+
+    for url, result in results.items():
+        if isinstance(result, Exception):
+            logging.warning(result)
+            logging.warning(f"Cannot download {url}")
+            continue
+
+        if result and url.startswith(EPRINT_URL):
+            arxivid, version = url[len(EPRINT_URL) :].rsplit("v", 1)
+            sha256 = store.add(arxivid, int(version))
+            state.record(
+                arxivid,
+                int(version),
+                state.DOWNLOADED,
+                result,
+                None if isinstance(sha256, Exception) else sha256,
+            )
+
+    metrics.finish("download")
+
+
+def download_source_files(
+    arxivid: str,
+    version_count: int,
+    download_pdf: bool = False,
+    fetcher: Optional[fetch.Fetcher] = None,
+) -> None:
+    """
+    Downloads the source file for each of {version_count} versions and writes them to disk. If download_pdf is true, also downloads the .pdf file.
+    """
+    download_jobs(source_jobs(arxivid, version_count, download_pdf), fetcher)
 
 
 def get_ids(
@@ -426,63 +706,308 @@ def download_all() -> None:
     Downloads all source files for all versions for all papers with 2+ versions.
     """
 
-    done = util.log_how_many(is_downloaded, "downloaded")
+    done = util.log_how_many(state.DOWNLOADED, "downloaded")
 
     if done:
         return
 
+    jobs = []
+
     for arxivid, version_count in data.get_all_files(
         maximum_only=True
-    ):  # download_source_files wants the total number of versions for each id
-        download_source_files(arxivid, version_count)
+    ):  # source_jobs wants the total number of versions for each id
+        jobs.extend(source_jobs(arxivid, version_count))
+
+    download_jobs(jobs)
 
-    util.log_how_many(is_downloaded, "downloaded")
 
+def tmp_path(outfilepath: str) -> str:
+    """
+    Where extract_file writes outfilepath until it is complete.
+    """
+    return outfilepath + ".tmp"
 
-def extract_file(sourcefilepath: str, outfilepath: str) -> Result[None]:
-    content: Optional[str] = None
+
+def extract_file(
+    sourcefilepath: str, outfilepath: str, max_bytes: int = MAX_BYTES
+) -> Result[None]:
+    """
+    Streams the .tex file in sourcefilepath to outfilepath, holding at most a chunk (or, for tar archives, the .tex files the chosen file includes) in memory.
+    """
+    tmpfilepath = tmp_path(outfilepath)
+    written = 0
 
     try:
-        content = extract(sourcefilepath)
-    except TypeError as err:
+        with open(tmpfilepath, "w", encoding="utf-8") as file:
+            for chunk in extract(sourcefilepath, max_bytes):
+                written += file.write(chunk)
+
+        if written:
+            os.replace(tmpfilepath, outfilepath)
+    except (ExtractionError, ValueError) as err:
         return err
+    finally:
+        if os.path.isfile(tmpfilepath):
+            os.remove(tmpfilepath)
+
+    return None
+
+
+def load_extraction_stamp(arxivid: str, version: int) -> Optional[Dict[str, Any]]:
+    try:
+        with open(data.extraction_stamp_path(arxivid, version)) as file:
+            stamp: Dict[str, Any] = json.load(file)
+            return stamp
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
 
-    if content:
-        # removes not utf characters
-        contentbytes = content.encode(encoding="utf-8", errors="ignore")
-        with open(outfilepath, "wb") as file:
-            file.write(contentbytes)
+
+def extraction_reason(
+    arxivid: str, version: int, sha256: Optional[str]
+) -> Optional[str]:
+    """
+    Returns why a version needs to be extracted again, or None if its .tex file is up to date with its source file and the extractor.
+    """
+    stamp = load_extraction_stamp(arxivid, version)
+
+    if stamp is None:
+        return "never extracted"
+    if sha256 is None:
+        return "source file is not in the store"
+    if stamp["sha256"] != sha256:
+        return "source file changed"
+    if stamp["extractor"] != EXTRACTOR_VERSION:
+        return f"extractor changed (v{stamp['extractor']} to v{EXTRACTOR_VERSION})"
+    if stamp["tex"] and not is_extracted(arxivid, version, verify=True):
+        return ".tex file is missing or changed"
 
     return None
 
 
-def extract_all(again: bool = False) -> None:
+def record_extraction(
+    arxivid: str, version: int, sha256: Optional[str], reason: str, err: Result[None]
+) -> None:
+    """
+    Records the extraction in corpus_state, writes the extraction stamp for a version and appends the reason it was extracted to the extraction log. Only the parent process calls this, so workers never write to the database.
+    """
+    latexpath = data.latex_path(arxivid, version)
+
+    if os.path.isfile(latexpath):
+        state.record(arxivid, version, state.EXTRACTED, latexpath, sha256)
+    else:
+        state.forget(arxivid, version, state.EXTRACTED)
+
+    stamp = {
+        "sha256": sha256,
+        "extractor": EXTRACTOR_VERSION,
+        "tex": is_extracted(arxivid, version),
+        "reason": reason,
+        "error": str(err) if err else None,
+    }
+
+    with open(data.extraction_stamp_path(arxivid, version), "w") as file:
+        json.dump(stamp, file, indent=2)
+
+    with open(data.EXTRACTION_LOG_PATH, "a") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            [datetime.datetime.now().isoformat(), arxivid, version, sha256, reason]
+        )
+
+
+def extract_cached(arxivid: str, version: int, sha256: Optional[str]) -> Result[None]:
+    """
+    Extracts a version's .tex file, reusing the .tex file from any source file with the same hash that was extracted by the same extractor version. Only touches files; record_extraction updates corpus_state afterwards.
+    """
+    latexpath = data.latex_path(arxivid, version)
+
+    if os.path.isfile(latexpath):
+        os.remove(latexpath)  # so a failed extraction doesn't leave a stale file
+
+    cachepath = None
+    if sha256:
+        cachepath = data.cache_path(
+            "extract", cache.key(sha256, str(EXTRACTOR_VERSION))
+        )
+
+        if os.path.isfile(cachepath):
+            store.link(cachepath, latexpath)
+            return None
+
+    err = extract_file(data.source_path(arxivid, version), latexpath)
+
+    if not err and cachepath and os.path.isfile(latexpath):
+        store.link(latexpath, cachepath)
+
+    return err
+
+
+def _extract_process(
+    arxivid: str,
+    version: int,
+    sha256: Optional[str],
+    conn: multiprocessing.connection.Connection,
+) -> None:
+    conn.send(extract_cached(arxivid, version, sha256))
+    conn.close()
+
+
+def extract_parallel(
+    jobs: Iterable[Tuple[str, int, Optional[str]]],
+    workers: int = WORKERS,
+    timeout: float = EXTRACT_TIMEOUT,
+) -> Dict[Tuple[str, int], Result[None]]:
+    """
+    Extracts every (arxivid, version, sha256) job in its own process, at most `workers` at a time, taking jobs from the iterable only as workers free up. Archives that take longer than `timeout` seconds (huge or malicious tarballs) are killed, their partial output is removed, and they are reported as an ExtractionError.
+
+    Workers only send their result back over a pipe; the caller writes corpus_state.
+    """
+    pending = iter(jobs)
+    running: Dict[Any, Tuple[multiprocessing.Process, Tuple[str, int], float]] = {}
+    results: Dict[Tuple[str, int], Result[None]] = {}
+
+    while True:
+        for arxivid, version, sha256 in itertools.islice(
+            pending, workers - len(running)
+        ):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_extract_process, args=(arxivid, version, sha256, sender)
+            )
+            process.start()
+            sender.close()
+            running[receiver] = (process, (arxivid, version), time.monotonic())
+
+        if not running:
+            break
+
+        ready = multiprocessing.connection.wait(list(running), timeout=0.1)
+
+        for receiver, (process, job, started) in list(running.items()):
+            if receiver in ready:
+                try:
+                    results[job] = receiver.recv()
+                except EOFError:  # the process died without sending anything
+                    results[job] = ExtractionError(
+                        f"extraction exited with code {process.exitcode}"
+                    )
+            elif time.monotonic() - started > timeout:
+                process.kill()
+                process.join()
+
+                tmpfilepath = tmp_path(data.latex_path(*job))
+                if os.path.isfile(tmpfilepath):
+                    os.remove(tmpfilepath)
+
+                results[job] = ExtractionError(f"took longer than {timeout} seconds")
+            else:
+                continue
+
+            record_metrics(*job, results[job])
+
+            process.join()
+            receiver.close()
+            del running[receiver]
+
+    return results
+
+
+def record_metrics(arxivid: str, version: int, err: Result[None]) -> None:
+    latexpath = data.latex_path(arxivid, version)
+
+    nbytes = os.path.getsize(latexpath) if os.path.isfile(latexpath) else 0
+
+    metrics.record("extract", nbytes, failed=err is not None)
+
+
+def log_failures(failures: Dict[Tuple[str, int], Exception]) -> None:
+    """
+    Logs how many extractions failed for each filetype.
+    """
+    by_filetype: Dict[FileType, List[Tuple[str, int]]] = collections.defaultdict(list)
+
+    for (arxivid, version), err in failures.items():
+        filetype = getattr(err, "filetype", FileType.UNKNOWN)
+
+        if filetype == FileType.UNKNOWN and is_downloaded(arxivid, version):
+            with open(data.source_path(arxivid, version), "rb") as file:
+                filetype = get_filetype(file, "")
+
+        by_filetype[filetype].append((arxivid, version))
+
+    for filetype, documents in sorted(by_filetype.items(), key=lambda f: f[0].value):
+        logging.warning(
+            f"{len(documents)} {filetype.name} source files failed to extract: {documents[:5]}"
+        )
+
+
+def extract_all(
+    again: bool = False,
+    force: bool = False,
+    workers: int = WORKERS,
+    timeout: float = EXTRACT_TIMEOUT,
+) -> None:
     """
     Extracts the .tex file from every .gz file to its directory.
+
+    With `again`, versions are only extracted again if their source file or EXTRACTOR_VERSION changed since they were last extracted. With `force`, every version is extracted again. With more than one worker, each archive is extracted in its own process and killed after `timeout` seconds.
     """
 
-    done = util.log_how_many(is_extracted, "extracted")
+    done = util.log_how_many(state.EXTRACTED, "extracted")
 
-    if done and not again:
+    if done and not again and not force:
         return
 
     logging.info("Extracting files.")
 
-    for arxivid, version in data.get_all_files():
-        if not is_downloaded(arxivid, version):
-            continue
+    jobs: List[Tuple[str, int, Optional[str]]] = []
+    reasons: Dict[Tuple[str, int], str] = {}
 
-        sourcefilepath = data.source_path(arxivid, version)
-        latexpath = data.latex_path(arxivid, version)
-
-        if is_extracted(arxivid, version) and not again:
+    for arxivid, version in data.get_local_files():
+        if is_extracted(arxivid, version) and not again and not force:
             continue  # skip if already extracted
 
-        err = extract_file(sourcefilepath, latexpath)
+        sha256 = store.digest(arxivid, version)
+        if sha256 is None:
+            result = store.add(arxivid, version)
+            sha256 = None if isinstance(result, Exception) else result
+
+        reason = "forced" if force else extraction_reason(arxivid, version, sha256)
+
+        if reason is None:
+            continue  # up to date
+
+        logging.debug(f"Extracting {arxivid}-v{version}: {reason}")
+
+        jobs.append((arxivid, version, sha256))
+        reasons[(arxivid, version)] = reason
+
+    metrics.start("extract", queued=len(jobs))
+
+    if workers > 1:
+        results = extract_parallel(jobs, workers, timeout)
+    else:
+        results = {}
+        for arxivid, version, sha256 in jobs:
+            results[(arxivid, version)] = extract_cached(arxivid, version, sha256)
+            record_metrics(arxivid, version, results[(arxivid, version)])
+
+    failures = {}
+
+    for arxivid, version, sha256 in jobs:
+        err = results[(arxivid, version)]
+
         if err:
-            logging.warning(f"Error extracting {sourcefilepath}: {err}")
+            logging.debug(
+                f"Error extracting {data.source_path(arxivid, version)}: {err}"
+            )
+            failures[(arxivid, version)] = err
+
+        record_extraction(arxivid, version, sha256, reasons[(arxivid, version)], err)
+
+    log_failures(failures)
 
-    util.log_how_many(is_extracted, "extracted")
+    metrics.finish("extract")
 
 
 def main() -> None:
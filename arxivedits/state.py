@@ -0,0 +1,168 @@
+"""
+Keeps track of which stages (downloaded, extracted, detexed, sentenced) each (arxivid, version) has finished in the `corpus_state` table, so inventory questions are answered by indexed queries instead of directory scans and a `stat` per file.
+
+Stages call `record()` when they write a file and `forget()` when they remove one, and `is_done()` trusts the table without touching the disk. Each row also keeps the size and mtime its file had, so `is_done(..., verify=True)` can check that a file wasn't removed or rewritten since.
+
+The table is filled from DOWNLOAD_DIR once, when it is created. Files added or removed by anything that doesn't call `record()` or `forget()` (copied by hand, or downloaded by another tool) aren't reflected until it's rebuilt with `rescan()`, or from the command line:
+
+```
+python -m arxivedits.state
+```
+"""
+
+import os
+import sqlite3
+import logging
+import datetime
+from typing import Optional, Dict, Tuple, List
+
+from arxivedits import data
+
+DOWNLOADED = "downloaded"
+EXTRACTED = "extracted"
+DETEXED = "detexed"
+SENTENCED = "sentenced"
+
+_connections: Dict[Tuple[int, str], sqlite3.Connection] = {}
+
+
+def connection() -> sqlite3.Connection:
+    """
+    Returns a connection (one per process and database) with the schema applied.
+    """
+    key = (os.getpid(), str(data.DB_FILE_NAME))
+
+    if key not in _connections:
+        con = data.connection()
+        con.isolation_level = None  # autocommit
+
+        created = not con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'corpus_state'"
+        ).fetchone()
+
+        with open(data.SCHEMA_PATH) as file:
+            con.executescript(file.read())
+
+        columns = [row[1] for row in con.execute("PRAGMA table_info(corpus_state)")]
+        if "mtime" not in columns:  # tables made before mtime was recorded
+            con.execute("ALTER TABLE corpus_state ADD COLUMN mtime REAL")
+
+        _connections[key] = con
+
+        if created and os.path.isdir(data.DOWNLOAD_DIR):
+            logging.info(f"Filling corpus_state from {data.DOWNLOAD_DIR}.")
+            rescan()
+
+    return _connections[key]
+
+
+def record(
+    arxivid: str, version: int, stage: str, filepath: str, sha256: Optional[str] = None
+) -> None:
+    """
+    Records that a version finished a stage, producing filepath.
+    """
+    arxivid = data.id_to_path(arxivid)
+
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+
+    if os.path.isfile(filepath):
+        stat = os.stat(filepath)
+        size, mtime = stat.st_size, stat.st_mtime
+
+    connection().execute(
+        "INSERT OR REPLACE INTO corpus_state (arxiv_id, version, stage, size, sha256, mtime, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (arxivid, version, stage, size, sha256, mtime, datetime.datetime.now()),
+    )
+
+
+def forget(arxivid: str, version: int, stage: str) -> None:
+    """
+    Records that a version's output for a stage was removed.
+    """
+    arxivid = data.id_to_path(arxivid)
+
+    connection().execute(
+        "DELETE FROM corpus_state WHERE arxiv_id = ? AND version = ? AND stage = ?",
+        (arxivid, version, stage),
+    )
+
+
+def matches(filepath: str, size: Optional[int], mtime: Optional[float]) -> bool:
+    """
+    Checks whether filepath still has the size and mtime it was recorded with.
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+
+    return (stat.st_size, stat.st_mtime) == (size, mtime)
+
+
+def is_done(
+    arxivid: str, version: int, stage: str, filepath: str, verify: bool = False
+) -> bool:
+    """
+    Checks whether a version finished a stage, with one indexed query. With `verify`, also checks that filepath still has the size and mtime it was recorded with.
+    """
+    arxivid = data.id_to_path(arxivid)
+
+    row = (
+        connection()
+        .execute(
+            "SELECT size, mtime FROM corpus_state WHERE arxiv_id = ? AND version = ? AND stage = ?",
+            (arxivid, version, stage),
+        )
+        .fetchone()
+    )
+
+    if row is None:
+        return False
+
+    return not verify or matches(filepath, *row)
+
+
+def count(stage: str) -> int:
+    return int(
+        connection()
+        .execute("SELECT COUNT(*) FROM corpus_state WHERE stage = ?", (stage,))
+        .fetchone()[0]
+    )
+
+
+def get_versions(stage: str) -> List[Tuple[str, int]]:
+    """
+    Returns every (arxivid, version) that finished a stage, sorted.
+    """
+    return [
+        (arxivid, int(version))
+        for arxivid, version in connection().execute(
+            "SELECT arxiv_id, version FROM corpus_state WHERE stage = ? ORDER BY arxiv_id, version",
+            (stage,),
+        )
+    ]
+
+
+def rescan() -> None:
+    """
+    Rebuilds the table from disk, for when files were added or removed outside the pipeline.
+    """
+    paths = {
+        DOWNLOADED: data.source_path,
+        EXTRACTED: data.latex_path,
+        DETEXED: data.text_path,
+        SENTENCED: data.sentence_path,
+    }
+
+    connection().execute("DELETE FROM corpus_state")
+
+    for arxivid, version in data.walk_local_files():
+        for stage, path in paths.items():
+            if os.path.isfile(path(arxivid, version)):
+                record(arxivid, version, stage, path(arxivid, version))
+
+
+if __name__ == "__main__":
+    rescan()
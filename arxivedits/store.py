@@ -0,0 +1,175 @@
+"""
+A content-addressed store for downloaded source files. Every source file is stored once as a blob named by its sha256 hash, and each (arxivid, version) gets a small manifest pointing at its blob. Versions that re-upload an identical source bundle share a single blob.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+from arxivedits import data
+from arxivedits.structures import Result
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(filepath: str) -> str:
+    """
+    Hashes a file (sha256) without reading it into memory at once.
+    """
+    digest = hashlib.sha256()
+
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def link(source: str, destination: str) -> None:
+    """
+    Hard links source to destination (replacing destination), copying if the two paths are on different filesystems.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+    tmppath = f"{destination}.{os.getpid()}.tmp"
+
+    try:
+        os.link(source, tmppath)
+    except OSError:
+        shutil.copyfile(source, tmppath)
+
+    os.replace(tmppath, destination)
+
+
+def load_manifest(arxivid: str, version: int) -> Optional[Dict[str, Any]]:
+    try:
+        with open(data.manifest_path(arxivid, version)) as file:
+            manifest: Dict[str, Any] = json.load(file)
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def digest(arxivid: str, version: int) -> Optional[str]:
+    """
+    Returns the hash of a version's source file, or None if it was never added to the store.
+    """
+    manifest = load_manifest(arxivid, version)
+
+    if manifest is None:
+        return None
+
+    return str(manifest["sha256"])
+
+
+def add(arxivid: str, version: int) -> Result[str]:
+    """
+    Adds a downloaded source file to the store and writes its manifest. If an identical file is already stored, the source file is replaced with a link to it. Returns the file's hash.
+    """
+    sourcepath = data.source_path(arxivid, version)
+
+    if not os.path.isfile(sourcepath):
+        return FileNotFoundError(sourcepath)
+
+    sha256 = file_digest(sourcepath)
+    blobpath = data.blob_path(sha256)
+
+    if os.path.isfile(blobpath):
+        if not os.path.samefile(blobpath, sourcepath):
+            logging.debug(f"{arxivid}-v{version} is a duplicate of {sha256}.")
+            link(blobpath, sourcepath)
+    else:
+        link(sourcepath, blobpath)
+
+    manifest = {
+        "arxivid": arxivid,
+        "version": version,
+        "sha256": sha256,
+        "size": os.path.getsize(sourcepath),
+    }
+
+    with open(data.manifest_path(arxivid, version), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    return sha256
+
+
+def restore(arxivid: str, version: int) -> bool:
+    """
+    Restores a missing source file from its blob, so it doesn't need to be downloaded again. Returns whether the source file exists afterwards.
+    """
+    sourcepath = data.source_path(arxivid, version)
+
+    if os.path.isfile(sourcepath):
+        return True
+
+    sha256 = digest(arxivid, version)
+
+    if sha256 is None or not os.path.isfile(data.blob_path(sha256)):
+        return False
+
+    link(data.blob_path(sha256), sourcepath)
+
+    return True
+
+
+def verify(arxivid: str, version: int) -> bool:
+    """
+    Checks that a version's source file still matches the hash in its manifest.
+    """
+    sha256 = digest(arxivid, version)
+    sourcepath = data.source_path(arxivid, version)
+
+    if sha256 is None or not os.path.isfile(sourcepath):
+        return False
+
+    return file_digest(sourcepath) == sha256
+
+
+def verify_all() -> List[Tuple[str, int]]:
+    """
+    Returns every downloaded (arxivid, version) whose source file is missing from the store or doesn't match its manifest.
+    """
+    corrupted = []
+
+    for arxivid, version in data.get_all_files():
+        if not os.path.isfile(data.source_path(arxivid, version)):
+            continue
+
+        if not verify(arxivid, version):
+            logging.warning(f"{arxivid}-v{version} does not match its manifest.")
+            corrupted.append((arxivid, version))
+
+    return corrupted
+
+
+def add_all() -> None:
+    """
+    Adds every downloaded source file that doesn't have a manifest yet.
+    """
+    for arxivid, version in data.get_all_files():
+        if not os.path.isfile(data.source_path(arxivid, version)):
+            continue
+
+        if digest(arxivid, version) is not None:
+            continue
+
+        result = add(arxivid, version)
+
+        if isinstance(result, Exception):
+            logging.warning(f"Could not store {arxivid}-v{version}: {result}")
+
+
+def main() -> None:
+    add_all()
+
+    corrupted = verify_all()
+
+    logging.info(f"{len(corrupted)} source files do not match their manifest.")
+
+
+if __name__ == "__main__":
+    main()
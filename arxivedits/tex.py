@@ -1,36 +1,91 @@
 import os
 import logging
+from typing import Optional
 
 
-from arxivedits import data, detex, source, util
+from arxivedits import data, detex, util, metrics, state
 
 
 def is_detexed(arxivid: str, version: int) -> bool:
-    return os.path.isfile(data.text_path(arxivid, version))
+    return data.is_detexed(arxivid, version)
 
 
-def detex_all(again: bool = False) -> None:
+def detex_all(
+    again: bool = False, use_cache: bool = True, incremental: bool = False
+) -> None:
+    """
+    Detexes every extracted .tex file. With `use_cache`, LaTeX that was already detexed (for instance, an identical earlier version) is served from the cache. With `incremental`, documents are detexed section by section so only sections that changed since an earlier version are detexed again.
+    """
 
-    done = util.log_how_many(is_detexed, "detexed")
+    done = util.log_how_many(state.DETEXED, "detexed")
 
     if done and not again:
         return
 
     logging.info("Detexing files.")
 
-    for arxivid, version in data.get_all_files():
+    jobs = [
+        (arxivid, version)
+        for arxivid, version in state.get_versions(state.EXTRACTED)
+        if again or not is_detexed(arxivid, version)  # skip if already detexed
+    ]
 
-        if not source.is_extracted(arxivid, version):
-            continue
+    metrics.start("detex", queued=len(jobs))
 
-        if is_detexed(arxivid, version) and not again:
-            continue  # already detexed
+    for arxivid, version in jobs:
+        textpath = data.text_path(arxivid, version)
 
         detex.detex_file(
-            data.latex_path(arxivid, version), data.text_path(arxivid, version)
+            data.latex_path(arxivid, version),
+            textpath,
+            use_cache=use_cache,
+            incremental=incremental,
         )
 
-    util.log_how_many(is_detexed, "detexed")
+        state.record(arxivid, version, state.DETEXED, textpath)
+
+        nbytes = os.path.getsize(textpath)
+        metrics.record("detex", nbytes, failed=nbytes == 0)
+
+    metrics.finish("detex")
+
+
+def is_pandoced(arxivid: str, version: int) -> bool:
+    return os.path.isfile(data.markdown_path(arxivid, version))
+
+
+def pandoc_all(
+    again: bool = False, workers: int = detex.pandoc.WORKERS, url: Optional[str] = None
+) -> None:
+    """
+    Converts every extracted .tex file to markdown with pandoc. If `url` is None, a local `pandoc server` is started for the run, or, if pandoc is older than 3.0, a `pandoc` process is run for each file.
+    """
+
+    files = [
+        (data.latex_path(arxivid, version), data.markdown_path(arxivid, version))
+        for arxivid, version in state.get_versions(state.EXTRACTED)
+        if (again or not is_pandoced(arxivid, version))
+    ]
+
+    logging.info(f"Converting {len(files)} files with pandoc.")
+
+    server = None if url else detex.pandoc.start_server()
+
+    if server:
+        url = server.url
+
+    try:
+        errors = detex.pandoc_files(files, workers=workers, url=url)
+    finally:
+        if server:
+            server.shutdown()
+
+    for err in errors.values():
+        if err:
+            logging.warning(err)
+
+    converted = len([err for err in errors.values() if not err])
+    logging.info(f"{converted}/{len(files)} converted.")
 
 
 def main() -> None:
@@ -13,15 +13,20 @@ from typing import List, Set, Any, Optional, Callable, Tuple, Union
 import json
 import copy
 import os
-import re
 import pathlib
 import string
 import logging
+import functools
+import hashlib
 
 import pexpect
 
-from arxivedits.detex.constants import BLOCK_MATH_TAG
-from arxivedits import data, util
+from arxivedits.detex.constants import (
+    BLOCK_MATH_TAG,
+    DOLLAR_BLOCK_MATH_PATTERN,
+    DOLLAR_INLINE_MATH_PATTERN,
+)
+from arxivedits import data, util, cache, metrics, state
 from arxivedits.structures import ArxivID
 
 FALSE_SPLIT_SUFFIXES = set(
@@ -414,15 +419,12 @@ class CoreNLPTokenizer(Tokenizer):
         """
         text = text.replace("\n", " ")
 
-        blockpattern = re.compile(r"\$\$(.*)\$\$")
-        text = blockpattern.sub("", text)
-
-        inlinepattern = re.compile(r"\$(.*?)\$")
+        text = DOLLAR_BLOCK_MATH_PATTERN.sub("", text)
 
         output = ""
         cur = 0
 
-        for match in inlinepattern.finditer(text):
+        for match in DOLLAR_INLINE_MATH_PATTERN.finditer(text):
             for i, group in enumerate(match.groups()):
                 if group in self.latex:
                     start, end = match.span(i)
@@ -500,12 +502,29 @@ class CoreNLPTokenizer(Tokenizer):
 
 
 def is_sentenced(arxividpath: ArxivID, version: int) -> bool:
-    return os.path.isfile(data.sentence_path(arxividpath, version))
+    return state.is_done(
+        arxividpath, version, state.SENTENCED, data.sentence_path(arxividpath, version)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def config() -> str:
+    """
+    Identifies the current sentence splitting configuration (this module), so changing it invalidates cached sentences.
+    """
+    with open(__file__, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
 
 
 def tokenize_file(
-    inputfilepath: str, outputfilepath: str, tok: CoreNLPTokenizer
+    inputfilepath: str,
+    outputfilepath: str,
+    tok: CoreNLPTokenizer,
+    use_cache: bool = False,
 ) -> None:
+    """
+    Splits every paragraph in inputfilepath into sentences. If `use_cache` is true, paragraphs that were split before (usually because they're unchanged from an earlier version) are read from the cache instead of going through CoreNLP.
+    """
     with open(inputfilepath, "r") as textfile:
         paragraphs = textfile.read().split("\n\n")
 
@@ -514,8 +533,17 @@ def tokenize_file(
 
     with open(outputfilepath, "w") as sentencefile:
         for p in paragraphs:
+            cache_key = cache.key(p, config())
+
+            cached = cache.load("sentences", cache_key) if use_cache else None
+
             try:
-                sentences = tok.tokenize(p).ssplit()
+                if cached is not None:
+                    sentences = cached.split("\n") if cached else []
+                else:
+                    sentences = tok.tokenize(p).ssplit()
+                    if use_cache:
+                        cache.store("sentences", cache_key, "\n".join(sentences))
 
                 for s in sentences:
                     sentencefile.write(s + "\n")
@@ -525,34 +553,39 @@ def tokenize_file(
                 print(f"Error on {inputfilepath}: {err}")
 
 
-def split_all(again=False) -> None:
+def split_all(again: bool = False, incremental: bool = False) -> None:
     """
-    Converts information in detexed text to sentences.
+    Converts information in detexed text to sentences. With `incremental`, paragraphs that were already split in another version are served from the cache.
     """
 
-    done = util.log_how_many(is_sentenced, "split into sentences")
+    done = util.log_how_many(state.SENTENCED, "split into sentences")
 
     if done and not again:
         return
 
     tok = CoreNLPTokenizer()
 
-    for arxivid, version in data.get_all_files():
-        textfilepath = data.text_path(arxivid, version)
-        sentencefilepath = data.sentence_path(arxivid, version)
+    jobs = [
+        (arxivid, version)
+        for arxivid, version in state.get_versions(state.DETEXED)
+        if again or not is_sentenced(arxivid, version)
+    ]
 
-        if not os.path.isfile(textfilepath):
-            logging.debug(f"{arxivid}-v{version} was not converted to text.")
-            continue
+    metrics.start("sentences", queued=len(jobs))
 
-        if os.path.isfile(sentencefilepath) and not again:
-            continue
+    for arxivid, version in jobs:
+        textfilepath = data.text_path(arxivid, version)
+        sentencefilepath = data.sentence_path(arxivid, version)
 
         logging.debug(textfilepath)
-        tokenize_file(textfilepath, sentencefilepath, tok)
+        tokenize_file(textfilepath, sentencefilepath, tok, use_cache=incremental)
         logging.debug(sentencefilepath)
 
-    util.log_how_many(is_sentenced, "split into sentences")
+        state.record(arxivid, version, state.SENTENCED, sentencefilepath)
+
+        metrics.record("sentences", os.path.getsize(textfilepath))
+
+    metrics.finish("sentences")
 
 
 def main() -> None:
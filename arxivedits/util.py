@@ -4,7 +4,9 @@ import string
 import logging
 from typing import List, Iterator, Tuple, Callable, Iterable, Any, Dict, Set
 
-from arxivedits import data
+import numpy as np
+
+from arxivedits import data, state
 from arxivedits.structures import T, U
 
 username = os.getenv("USERNAME") or os.getenv("USER")
@@ -83,6 +85,21 @@ def sliding_window(
     return zip(*rows)
 
 
+def stack_windows(
+    matrix: np.ndarray, size: int = 1, default_value: float = 0
+) -> np.ndarray:
+    """
+    The array version of `sliding_window()`: row i of the result is rows i - size through i + size of `matrix` side by side, padded with `default_value`.
+    """
+    n_rows = matrix.shape[0]
+
+    padded = np.pad(
+        matrix, ((size, size), (0, 0)), mode="constant", constant_values=default_value
+    )
+
+    return np.hstack([padded[i : i + n_rows] for i in range(size * 2 + 1)])
+
+
 def consecutive_values(vector: List[T], test: Callable[[T], bool]) -> List[List[T]]:
     """
     Given a list and a test function, returns a list of groups of consecutive values that pass the test function.
@@ -142,17 +159,16 @@ def transpose(a: List[List[T]]) -> List[List[T]]:
     return list(map(list, zip(*a)))
 
 
-def log_how_many(check_func: Callable[[str, int], bool], verb: str) -> bool:
-    total = 0
-    done = 0
-    for a, v in data.get_all_files():
-        total += 1
-        if check_func(a, v):
-            done += 1
+def log_how_many(stage: str, verb: str) -> bool:
+    """
+    Logs how many versions finished a stage, from one indexed query against corpus_state, and returns whether all of them did.
+    """
+    total = sum(1 for _ in data.get_all_files())
+    done = state.count(stage)
 
     logging.info(f"{done/total*100:.2f}% {verb}.")
 
-    return done == total
+    return done >= total
 
 
 if __name__ == "__main__":
@@ -22,4 +22,27 @@ CREATE TABLE IF NOT EXISTS authors (
   last_name TEXT NOT NULL,
   PRIMARY KEY (arxiv_id, first_name, last_name),
   FOREIGN KEY (arxiv_id) REFERENCES papers(arxiv_id)
-);
\ No newline at end of file
+);
+CREATE TABLE IF NOT EXISTS corpus_state (
+  arxiv_id TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  stage TEXT NOT NULL, -- downloaded, extracted, detexed or sentenced
+  size INTEGER, -- of the output file when it was recorded
+  sha256 TEXT, -- of the source file the output came from
+  mtime REAL, -- of the output file when it was recorded
+  updated DATETIME,
+  PRIMARY KEY (arxiv_id, version, stage)
+);
+
+CREATE INDEX IF NOT EXISTS corpus_state_stage ON corpus_state(stage);
+
+CREATE TABLE IF NOT EXISTS document_stats (
+  arxiv_id TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  lines INTEGER, -- of the sentence file, including blank lines between paragraphs
+  math_lines INTEGER, -- lines with 3+ [MATH] tags
+  sentences_mtime REAL, -- of the sentence file lines and math_lines came from
+  uses_harvmac BOOLEAN,
+  latex_mtime REAL, -- of the LaTeX file uses_harvmac came from
+  PRIMARY KEY (arxiv_id, version)
+);
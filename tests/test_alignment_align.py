@@ -0,0 +1,36 @@
+import os
+
+from arxivedits import data, filters
+from arxivedits.alignment.align import get_boring_verdicts
+
+
+def test_stale_flags_are_computed_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    old = ["We show that the bound holds for all inputs.", "[MATH] ."]
+    new = ["[MATH] .", "We show that the bound holds for all inputs."]
+
+    for version in [1, 2]:
+        sentencepath = data.sentence_path("1234.5678", version)
+        os.makedirs(os.path.dirname(sentencepath))
+
+        with open(sentencepath, "w") as file:
+            file.write("\n".join(old))
+
+        filters.get_sentence_flags("1234.5678", version)
+
+    # the flags file is still newer than the sentences, but made for other lines
+    with open(data.sentence_path("1234.5678", 2), "w") as file:
+        file.write("\n".join(new))
+    flagspath = data.sentence_flags_path("1234.5678", 2)
+    os.utime(flagspath, (os.path.getmtime(flagspath) + 10,) * 2)
+
+    lines1, lines2 = old + [""], new + [""]
+    line_diff_with_ids = [(-1, old[0], []), (0, old[1], []), (1, new[1], [])]
+
+    verdicts = get_boring_verdicts(
+        line_diff_with_ids, "1234.5678", 1, 2, lines1, lines2
+    )
+
+    assert verdicts == [False, True, False]
+    assert filters.flags_match(filters.get_sentence_flags("1234.5678", 2), lines2)
@@ -0,0 +1,120 @@
+import re
+
+import numpy as np
+import pytest
+
+from arxivedits import data
+from arxivedits.alignment import visualize
+from arxivedits.alignment.align import Alignment
+from arxivedits.alignment.sentence import SentenceID
+
+
+def make_alignment(tmp_path, monkeypatch, n1, n2, pairs):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    for version in [1, 2]:
+        path = data.sentence_path("1234.5678", version)
+        (tmp_path / "1234.5678" / f"v{version}").mkdir(parents=True)
+        open(path, "w").close()
+
+    alignment = Alignment("1234.5678", 1, 2, auto_init=False)
+
+    for version, n, alignments in [
+        (1, n1, alignment.alignments1),
+        (2, n2, alignment.alignments2),
+    ]:
+        for s in range(n):
+            _id = SentenceID("1234.5678", version, 0, s)
+            alignments[_id] = set()
+            alignment.lookup[_id] = f"sentence {s} of v{version}"
+
+    for s1, s2 in pairs:
+        id1 = SentenceID("1234.5678", 1, 0, s1)
+        id2 = SentenceID("1234.5678", 2, 0, s2)
+        alignment.alignments1[id1].add(id2)
+        alignment.alignments2[id2].add(id1)
+
+    return alignment
+
+
+def reference_table(alignment, shape, similarity_func):
+    # make_table()'s per-cell loop before fill_alignment()
+    table = np.full(shape, visualize.BORING_VALUE)
+
+    for x, _id1 in enumerate(sorted(alignment.alignments1.keys())):
+        for y, _id2 in enumerate(sorted(alignment.alignments2.keys())):
+            if (
+                _id2 in alignment.alignments1[_id1]
+                or _id1 in alignment.alignments2[_id2]
+            ):
+                table[x, y] = visualize.ALIGNED_VALUE
+                continue
+
+            if alignment.is_aligned(_id1) or alignment.is_aligned(_id2):
+                table[x, y] = visualize.BORING_VALUE
+                continue
+
+            table[x, y] = similarity_func(
+                alignment.lookup[_id1], alignment.lookup[_id2]
+            )
+
+    return table
+
+
+def test_fill_alignment_matches_per_cell_loop(tmp_path, monkeypatch):
+    alignment = make_alignment(
+        tmp_path, monkeypatch, 7, 6, [(0, 0), (2, 1), (2, 3), (5, 5)]
+    )
+
+    def similarity_func(sent1, sent2):
+        return (len(sent1) * 7 + int(sent2.split()[1])) % 10 / 10
+
+    table = np.full((8, 7), visualize.BORING_VALUE)
+    visualize.fill_alignment(table, alignment, similarity_func)
+
+    assert np.array_equal(table, reference_table(alignment, (8, 7), similarity_func))
+
+
+def parse_row(html):
+    values = []
+
+    for style in re.findall(r'style="([^"]*)"', html):
+        color = re.search(r"background-color: ([^;]*);", style).group(1)
+        width = re.search(r"width: (\d+)px;", style)
+
+        if color == "#ffffff":
+            value = -1.0
+        elif color == "#ff0000":
+            value = 1.0
+        else:
+            value = int(re.match(r"rgb\((\d+),0,0\)", color).group(1)) / 255
+
+        values.extend([value] * (int(width.group(1)) // 5 if width else 1))
+
+    return values
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        [-1.0, -1.0, 0.5, 0.5, 1.0, 0.2, -1.0],
+        [0.3],
+        [1.0, 1.0, 1.0],
+        np.random.default_rng(0).choice([-1.0, 0.0, 0.25, 1.0], size=40).tolist(),
+    ],
+)
+def test_make_row_runs_join_back_to_the_row(row):
+    row = visualize.quantize(np.array(row))
+
+    html = visualize.make_row(3, row)
+
+    assert parse_row(html) == pytest.approx(row.tolist())
+    assert html.count("<span") == 1 + np.count_nonzero(row[1:] != row[:-1])
+
+
+def test_make_image():
+    table = np.array([[-1.0, 0.0, 0.5, 1.0]])
+
+    assert visualize.make_image(table).tolist() == [
+        [[255, 255, 255], [0, 0, 0], [128, 0, 0], [255, 0, 0]]
+    ]
@@ -0,0 +1,69 @@
+from arxivedits import cache, data
+from arxivedits.detex import opendetex
+
+
+def test_key_separates_parts():
+    assert cache.key("ab", "c") != cache.key("a", "bc")
+    assert cache.key("ab", "c") == cache.key("ab", "c")
+
+
+def test_store_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "CACHE_DIR", tmp_path)
+
+    cache_key = cache.key("content")
+
+    assert cache.load("test", cache_key) is None
+
+    cache.store("test", cache_key, "value")
+
+    assert cache.load("test", cache_key) == "value"
+
+
+def test_detex_file_uses_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "CACHE_DIR", tmp_path)
+
+    inputfile = tmp_path / "paper.tex"
+    outputfile = tmp_path / "paper.txt"
+    inputfile.write_text(r"\begin{document} Hello. \end{document}")
+
+    cache_key = cache.key(inputfile.read_text(), opendetex.config())
+    cache.store("detex", cache_key, "Hello.")
+
+    opendetex.detex_file(str(inputfile), str(outputfile))
+
+    assert outputfile.read_text() == "Hello."
+
+
+def test_split_sections():
+    text = r"\documentclass{article}\begin{document}Intro.\section{A}First.\section{B}Second.\end{document}"
+
+    preamble, sections = opendetex.split_sections(text)
+
+    assert preamble == r"\documentclass{article}\begin{document}"
+    assert sections == [
+        "Intro.",
+        r"\section{A}First.",
+        r"\section{B}Second.\end{document}",
+    ]
+
+
+def test_detex_sections_reuses_unchanged_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "CACHE_DIR", tmp_path)
+
+    detexed = []
+
+    def fake_detex(text, chop_document=True):
+        detexed.append(text)
+        return text
+
+    monkeypatch.setattr(opendetex, "detex", fake_detex)
+
+    v1 = r"\begin{document}Intro.\section{A}First.\section{B}Second."
+    v2 = r"\begin{document}Intro.\section{A}First.\section{B}Changed."
+
+    opendetex.detex_sections(v1)
+    assert len(detexed) == 3
+
+    opendetex.detex_sections(v2)
+    assert len(detexed) == 4
+    assert detexed[-1].endswith("Changed.")
@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+import pytest
+
+from arxivedits import data
+from arxivedits.chunks import model
+from arxivedits.chunks.data import (
+    ADDED,
+    REMOVED,
+    examples_path,
+    feature_columns,
+    save_examples,
+)
+
+
+def make_examples(window_size, n=7):
+    return np.arange(n * len(feature_columns(window_size)), dtype=float).reshape(n, -1)
+
+
+def test_examples_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    examples = make_examples(2)
+    save_examples(examples, ADDED, 6, 2)
+
+    with open(examples_path(ADDED, 6, 2, ".json")) as file:
+        schema = json.load(file)
+
+    assert schema["shape"] == [7, 56]
+    assert schema["columns"][0] == "max_diff_sim[-2]"
+    assert schema["columns"][-1] == "label"
+
+    loaded = model.load_examples(ADDED, 6, 2)
+
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, examples)
+
+    X, Y = model.get_data(ADDED, 6, 2)
+    assert np.array_equal(X, examples[:, :-1])
+    assert np.array_equal(Y, examples[:, -1])
+
+
+def test_csv_examples_are_converted(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    examples = make_examples(1)
+    csvpath = examples_path(REMOVED, 5, 1, ".csv")
+    (tmp_path / "chunks" / "data").mkdir(parents=True)
+    np.savetxt(csvpath, examples, delimiter=",")
+
+    assert np.array_equal(model.load_examples(REMOVED, 5, 1), examples)
+    assert (tmp_path / "chunks" / "data" / "removed-examples-1-5.npy").is_file()
+
+
+def test_stale_schema_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    save_examples(make_examples(1), ADDED, 5, 1)
+
+    schemapath = examples_path(ADDED, 5, 1, ".json")
+    with open(schemapath) as file:
+        schema = json.load(file)
+
+    schema["columns"][0] = "old_feature[-1]"
+
+    with open(schemapath, "w") as file:
+        json.dump(schema, file)
+
+    with pytest.raises(AssertionError):
+        model.load_examples(ADDED, 5, 1)
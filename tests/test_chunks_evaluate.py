@@ -0,0 +1,122 @@
+import pickle
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from arxivedits import data, preprocess, util
+from arxivedits.alignment.align import Alignment
+from arxivedits.alignment.sentence import SentenceID
+from arxivedits.chunks import features
+from arxivedits.chunks.evaluate import predict_chunks
+from arxivedits.chunks.lookup import SimilarityLookup
+
+V1 = [
+    [
+        "We study the bound on [MATH] for every graph .",
+        "The proof uses a new counting argument .",
+        "This argument was first used for trees .",
+    ],
+    ["Our main result holds for all sparse graphs ."],
+]
+
+V2 = [
+    [
+        "We study the bound on [MATH] for every graph .",
+        "The argument relies on a coupling with random walks .",
+    ],
+    ["Our main result holds for all sparse graphs [CITATION] ."],
+]
+
+
+def reference_predict_chunks(model, alignment, sent_ids, similarity_lookup, size):
+    # evaluate_model()'s per-sentence loop before predict_chunks()
+    predictions = []
+
+    for ids in util.sliding_window(sent_ids, size=size, default_value=None):
+        _id = ids[len(ids) // 2]
+
+        if alignment.is_aligned(_id):
+            predictions.append((_id, 0))
+            continue
+
+        feature_vector = []
+
+        for sent_id in ids:
+            if not sent_id:
+                feature_vector.extend(features.FeatureVector.default().to_list())
+            else:
+                sent = alignment.lookup[sent_id]
+                feature_vector.extend(
+                    features.make_feature_vector(
+                        sent, similarity_lookup.get_sentence_vector(sent)
+                    ).to_list()
+                )
+
+        predictions.append((_id, model.predict([feature_vector]).item()))
+
+    return predictions
+
+
+def write_document(version, pgs):
+    path = data.sentence_path("1234.5678", version)
+    (data.DOWNLOAD_DIR / "1234.5678" / f"v{version}").mkdir(parents=True)
+
+    with open(path, "w") as file:
+        file.write("\n\n".join("\n".join(pg) for pg in pgs))
+
+
+def test_predict_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path / "alignments"))
+    (tmp_path / "alignments" / "similarity").mkdir(parents=True)
+
+    # the sentences are already tokenized, so CoreNLP is never needed
+    sentences = [sent for pgs in (V1, V2) for pg in pgs for sent in pg]
+    with open(tmp_path / "preprocess.pkl", "wb") as file:
+        pickle.dump({sent: sent for sent in sentences}, file)
+
+    monkeypatch.setattr(preprocess, "preprocess_filename", tmp_path / "preprocess.pkl")
+    preprocess.get_preprocess_sent_dict.cache_clear()
+    preprocess.preprocess_sent.cache_clear()
+
+    write_document(1, V1)
+    write_document(2, V2)
+
+    alignment = Alignment("1234.5678", 1, 2, auto_init=False)
+
+    for version, pgs, alignments in [
+        (1, V1, alignment.alignments1),
+        (2, V2, alignment.alignments2),
+    ]:
+        for p, pg in enumerate(pgs):
+            for s, sent in enumerate(pg):
+                alignment.lookup[SentenceID("1234.5678", version, p, s)] = sent
+                alignments[SentenceID("1234.5678", version, p, s)] = set()
+
+    first1, first2 = SentenceID("1234.5678", 1, 0, 0), SentenceID("1234.5678", 2, 0, 0)
+    alignment.alignments1[first1].add(first2)
+    alignment.alignments2[first2].add(first1)
+
+    similarity_lookup = SimilarityLookup("1234.5678", 1, 2)
+
+    window_size = 1
+    n_features = len(features.FEATURE_NAMES) * (2 * window_size + 1)
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20, n_features))
+    model = LogisticRegression(solver="liblinear").fit(X, (X[:, 8] > 0).astype(int))
+
+    sent_ids = sorted(alignment.alignments1)
+
+    predictions = predict_chunks(
+        model, alignment, sent_ids, similarity_lookup, window_size
+    )
+
+    assert predictions == reference_predict_chunks(
+        model, alignment, sent_ids, similarity_lookup, window_size
+    )
+    assert predictions[0] == (first1, 0)
+    assert [prediction for _, prediction in predictions[1:]] == [1, 1, 1]
+    assert predict_chunks(model, alignment, [], similarity_lookup, window_size) == []
+
+    preprocess.get_preprocess_sent_dict.cache_clear()
+    preprocess.preprocess_sent.cache_clear()
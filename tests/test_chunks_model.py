@@ -0,0 +1,64 @@
+import csv
+import os
+
+import numpy as np
+
+from arxivedits import data
+from arxivedits.chunks import model
+from arxivedits.chunks.data import ADDED, REMOVED, BOTH, feature_columns, save_examples
+
+
+def write_examples(group, min_length, window_size, n=40):
+    rng = np.random.default_rng(min_length * 10 + window_size)
+
+    X = rng.normal(size=(n, len(feature_columns(window_size)) - 1))
+    Y = (X[:, 0] > 0).astype(float)  # learnable from the first feature
+
+    os.makedirs(os.path.join(data.ALIGNMENT_DIR, "chunks", "data"), exist_ok=True)
+    save_examples(np.column_stack([X, Y]), group, min_length, window_size)
+
+
+def test_cross_validate(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    write_examples(ADDED, 5, 1)
+    write_examples(REMOVED, 5, 1)
+
+    result = model.cross_validate(BOTH, 5, 1)
+
+    assert result["examples"] == 80
+    assert result["accuracy"] > 0.8
+
+
+def test_grid_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    for length in [5, 6]:
+        write_examples(ADDED, length, 1)
+        write_examples(REMOVED, length, 1)
+
+    results = model.grid_search(
+        groups=[ADDED, BOTH], workers=2, min_lengths=[5, 6], window_sizes=[1]
+    )
+
+    assert len(results) == 4
+    assert [result["group"] for result in results] == [ADDED, ADDED, BOTH, BOTH]
+
+    with open(tmp_path / "chunks" / "results" / "grid-search.csv") as file:
+        rows = list(csv.DictReader(file))
+
+    assert [(row["group"], int(row["min_length"])) for row in rows] == [
+        (result["group"], result["min_length"]) for result in results
+    ]
+
+
+def test_grid_search_only_loads_requested_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "ALIGNMENT_DIR", str(tmp_path))
+
+    write_examples(ADDED, 5, 1)  # no REMOVED examples
+
+    results = model.grid_search(
+        groups=[ADDED], workers=1, min_lengths=[5], window_sizes=[1]
+    )
+
+    assert [result["group"] for result in results] == [ADDED]
@@ -103,3 +103,29 @@ def test_consecutive_with_newline():
 
     assert equations.consecutive_math(text) == expected
     assert equations.consecutive_math(expected) == expected
+
+
+def test_remove_math():
+    text = r"Given $math$ in equation: $$equation.$$ We aim to find a solution."
+
+    expected = r"Given [MATH] in equation: [EQUATION]. We aim to find a solution."
+
+    assert equations.remove_math(text) == expected
+    assert equations.remove_math(expected) == expected
+
+
+def test_modern_delimiters():
+    text = r"Given \(x\) in equation: \[y.\] We aim to find a solution."
+
+    expected = r"Given  [MATH]  in equation:  [EQUATION].  We aim to find a solution."
+
+    assert equations.remove_math(text) == expected
+    assert (
+        equations.remove_inline_math(equations.remove_block_math(text)) == expected
+    )
+
+
+def test_escaped_delimiters():
+    text = r"It costs \$5 and \$6, with a line break \\[2pt] here."
+
+    assert equations.remove_math(text) == text
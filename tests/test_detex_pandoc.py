@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from arxivedits.detex import pandoc
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Behaves like `pandoc server`: upper-cases the text, and sleeps if asked to.
+    """
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = json.loads(self.rfile.read(length))
+        self.server.bodies.append(body)
+
+        if "SLOW" in body["text"]:
+            time.sleep(1)
+
+        response = json.dumps({"output": body["text"].upper()}).encode("utf-8")
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+        except BrokenPipeError:  # the client timed out
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Keeps the body of every request it was sent.
+    """
+
+    def __init__(self):
+        super().__init__(("localhost", 0), StandInHandler)
+        self.bodies = []
+
+
+def start_stand_in():
+    server = StandInServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://localhost:{server.server_port}"
+
+
+def test_pandoc_server():
+    server, url = start_stand_in()
+
+    assert pandoc.pandoc_server("hello", url) == "HELLO"
+
+    # matches the --standalone --markdown-headings=atx of the command line
+    assert server.bodies == [
+        {
+            "text": "hello",
+            "from": "latex",
+            "to": "markdown",
+            "standalone": True,
+            "markdown-headings": "atx",
+        }
+    ]
+
+    server.shutdown()
+
+
+def test_pandoc_server_timeout():
+    server, url = start_stand_in()
+
+    assert isinstance(pandoc.pandoc_server("SLOW", url, timeout=0.2), TimeoutError)
+
+    server.shutdown()
+
+
+def test_pandoc_files(tmp_path):
+    server, url = start_stand_in()
+
+    files = []
+    for i, text in enumerate(["first", "second", "SLOW"]):
+        inputfile = tmp_path / f"{i}.tex"
+        inputfile.write_text(text)
+        files.append((str(inputfile), str(tmp_path / f"{i}.md")))
+
+    errors = pandoc.pandoc_files(files, clean=False, timeout=0.5, workers=2, url=url)
+
+    assert errors[files[0][0]] is None
+    assert errors[files[1][0]] is None
+    assert errors[files[2][0]] is not None
+
+    assert (tmp_path / "0.md").read_text() == "FIRST"
+    assert (tmp_path / "1.md").read_text() == "SECOND"
+    assert not (tmp_path / "2.md").exists()
+
+    server.shutdown()
+
+
+def test_start_server_without_pandoc(monkeypatch):
+    monkeypatch.setenv("PATH", "")
+
+    assert pandoc.start_server() is None
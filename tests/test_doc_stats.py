@@ -0,0 +1,64 @@
+import os
+import pickle
+
+from arxivedits import data, doc_stats, filters, preprocess
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_doc_filter_only_needs_latex(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    latexpath = data.latex_path("1234.5678", 1)
+    write_file(latexpath, "\\input harvmac\n")
+
+    assert not os.path.isfile(data.sentence_path("1234.5678", 1))
+    assert not filters.doc_filter("1234.5678", 1)
+
+    mtime = os.path.getmtime(latexpath)
+    assert doc_stats.load_uses_harvmac("1234.5678", 1, mtime) is True
+
+    # a changed file is checked again
+    write_file(latexpath, "% \\input harvmac\n")
+    os.utime(latexpath, (mtime + 10, mtime + 10))
+
+    assert filters.doc_filter("1234.5678", 1)
+
+
+def test_doc_pair_filter_uses_stored_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    math = "[MATH] and [MATH] give [MATH] ."
+    sentences = [math, "We show the bound ."]
+
+    # the sentences are already tokenized, so CoreNLP is never needed
+    with open(tmp_path / "preprocess.pkl", "wb") as file:
+        pickle.dump({sent: sent for sent in sentences}, file)
+
+    monkeypatch.setattr(preprocess, "preprocess_filename", tmp_path / "preprocess.pkl")
+    preprocess.get_preprocess_sent_dict.cache_clear()
+    preprocess.preprocess_sent.cache_clear()
+
+    write_file(data.sentence_path("1234.5678", 1), "\n".join([math] * 80))
+    write_file(data.sentence_path("1234.5678", 2), "\n".join([math] * 70 + sentences))
+
+    assert filters.doc_pair_filter("1234.5678", 1, 2)  # 80 * 71 > 5000
+    assert not filters.doc_pair_filter("1234.5678", 1, 3)
+
+    mtime = os.path.getmtime(data.sentence_path("1234.5678", 2))
+    assert doc_stats.load_line_counts("1234.5678", 2, mtime) == doc_stats.LineCounts(
+        73, 71
+    )
+
+    # stored counts are used without reading the document again
+    os.remove(tmp_path / "preprocess.pkl")
+    preprocess.get_preprocess_sent_dict.cache_clear()
+    preprocess.preprocess_sent.cache_clear()
+
+    assert filters.doc_pair_filter("1234.5678", 1, 2)
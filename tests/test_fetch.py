@@ -0,0 +1,108 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from arxivedits import fetch
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the same bytes for every path with a fixed ETag, and counts requests.
+    """
+
+    body = b"source file"
+    etag = '"v1"'
+    gets = 0
+    requests = 0
+
+    def do_HEAD(self):
+        StandInHandler.requests += 1
+        self.send_response(200)
+        self.send_header("ETag", StandInHandler.etag)
+        self.send_header("Content-Length", str(len(StandInHandler.body)))
+        self.end_headers()
+
+    def do_GET(self):
+        StandInHandler.gets += 1
+        self.do_HEAD()
+        self.wfile.write(StandInHandler.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in():
+    server = HTTPServer(("localhost", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://localhost:{server.server_port}"
+
+
+def test_fetch_all_skips_unchanged_files(tmp_path):
+    server, url = start_stand_in()
+    StandInHandler.gets = 0
+
+    jobs = [(f"{url}/{i}", str(tmp_path / str(i))) for i in range(3)]
+
+    results = fetch.fetch_all(jobs, interval=0)
+    assert all(results[u] == filepath for u, filepath in jobs)
+    assert (tmp_path / "0").read_bytes() == b"source file"
+    assert fetch.load_etag(str(tmp_path / "0")) == '"v1"'
+
+    # existing files: no request at all
+    requests = StandInHandler.requests
+    results = fetch.fetch_all(jobs, interval=0)
+    assert all(results[u] is None for u, _ in jobs)
+    assert StandInHandler.requests == requests
+
+    # revalidated, same ETag: HEAD only
+    results = fetch.fetch_all(jobs, interval=0, revalidate=True)
+    assert all(results[u] is None for u, _ in jobs)
+    assert StandInHandler.gets == 3
+    assert StandInHandler.requests == requests + 3
+
+    # revalidated, new ETag: downloaded again
+    StandInHandler.etag = '"v2"'
+    results = fetch.fetch_all(jobs[:1], interval=0, revalidate=True)
+    assert results[jobs[0][0]] == jobs[0][1]
+    assert StandInHandler.gets == 4
+
+    server.shutdown()
+
+
+def test_rate_limiter_spaces_requests(tmp_path):
+    server, url = start_stand_in()
+
+    jobs = [(f"{url}/{i}", str(tmp_path / str(i))) for i in range(3)]
+
+    fetcher = fetch.Fetcher(interval=0.2)
+    fetch.fetch_all(jobs, fetcher=fetcher)
+    fetcher.close()
+
+    times = sorted((tmp_path / str(i)).stat().st_mtime for i in range(3))
+    assert times[-1] - times[0] >= 0.35
+
+    server.shutdown()
+
+
+def test_fetch_all_reports_errors(tmp_path):
+    results = fetch.fetch_all(
+        [("http://localhost:1/x", str(tmp_path / "x"))], interval=0
+    )
+
+    assert isinstance(results["http://localhost:1/x"], Exception)
+
+
+def test_fetch_all_reports_write_errors(tmp_path):
+    server, url = start_stand_in()
+
+    (tmp_path / "file").write_text("not a directory")
+    jobs = [
+        (f"{url}/0", str(tmp_path / "file" / "0")),
+        (f"{url}/1", str(tmp_path / "1")),
+    ]
+
+    results = fetch.fetch_all(jobs, interval=0)
+
+    assert isinstance(results[f"{url}/0"], OSError)
+    assert results[f"{url}/1"] == str(tmp_path / "1")
+
+    server.shutdown()
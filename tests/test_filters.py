@@ -0,0 +1,133 @@
+import os
+import string
+from types import SimpleNamespace
+
+from hypothesis import given
+import hypothesis.strategies as st
+
+from arxivedits import data, filters
+from arxivedits.detex.constants import (
+    INLINE_MATH_TAG,
+    BLOCK_MATH_TAG,
+    CITE_TAG,
+    REF_TAG,
+    HEADING_PATTERN,
+)
+
+
+def reference_sent_filter(sent):
+    # sent_filter() before it was rewritten to make a single pass
+    if HEADING_PATTERN.match(sent) is not None:
+        return True
+
+    len_no_punctuation = len(
+        [tok for tok in sent.split() if tok not in string.punctuation]
+    )
+    len_no_punctuation_no_special_tokens_no_number = len(
+        [
+            tok
+            for tok in sent.split()
+            if tok not in string.punctuation
+            and tok not in [INLINE_MATH_TAG, BLOCK_MATH_TAG, CITE_TAG, REF_TAG]
+            and not tok.isnumeric()
+        ]
+    )
+
+    count_special_tokens = (
+        sent.count(INLINE_MATH_TAG)
+        + sent.count(BLOCK_MATH_TAG)
+        + sent.count(REF_TAG)
+        + sent.count(CITE_TAG)
+    )
+
+    if len_no_punctuation_no_special_tokens_no_number <= 3:
+        return False
+
+    if count_special_tokens >= 0.5 * len_no_punctuation:
+        return False
+
+    sent = (
+        sent.replace(INLINE_MATH_TAG, " ")
+        .replace(BLOCK_MATH_TAG, " ")
+        .replace(REF_TAG, " ")
+        .replace(CITE_TAG, " ")
+    )
+
+    if [ch for ch in sent if ch != " "]:
+        score = (len([ch for ch in sent if ch.isalpha()]) + count_special_tokens) / (
+            len([ch for ch in sent if ch != " "]) + count_special_tokens
+        )
+        if score <= 0.7:
+            return False
+    else:
+        return False
+
+    return True
+
+
+tokens = st.sampled_from(
+    ["we", "show", "that", "x1", "42", ".", ",", ",-", "#", "##", "\t"]
+    + [INLINE_MATH_TAG, BLOCK_MATH_TAG, CITE_TAG, REF_TAG, "[[MATH]", "é"]
+)
+
+
+@given(st.lists(tokens, max_size=15), st.sampled_from([" ", "", "  "]))
+def test_sent_filter_matches_reference(words, separator):
+    sent = separator.join(words)
+    assert filters.sent_filter(sent) == reference_sent_filter(sent)
+
+
+def test_sentence_flags_are_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    sentencepath = data.sentence_path("1234.5678", 1)
+    os.makedirs(os.path.dirname(sentencepath))
+
+    lines = ["We show that the bound holds for all inputs.", "[MATH] .", "", "# Intro"]
+
+    with open(sentencepath, "w") as file:
+        file.write("\n".join(lines))
+
+    flags = filters.get_sentence_flags("1234.5678", 1)
+    assert os.path.isfile(data.sentence_flags_path("1234.5678", 1))
+
+    assert (flags["flags"] & filters.PASSES_FILTER).astype(bool).tolist() == [
+        filters.sent_filter(line) for line in lines + [""]
+    ]
+    assert (flags["flags"] & filters.BORING).astype(bool).tolist() == [
+        filters.is_boring(line) for line in lines + [""]
+    ]
+    assert filters.get_sentence_flags("1234.5678", 1).tolist() == flags.tolist()
+
+
+def sentence_id(paragraph_index, sentence_index):
+    # alignment.SentenceID can't be imported without CoreNLP
+    return SimpleNamespace(
+        arxivid="1234.5678",
+        version=1,
+        paragraph_index=paragraph_index,
+        sentence_index=sentence_index,
+    )
+
+
+def test_is_boring_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+    filters.load_sentence_flags.cache_clear()
+
+    sentencepath = data.sentence_path("1234.5678", 1)
+    os.makedirs(os.path.dirname(sentencepath))
+
+    with open(sentencepath, "w") as file:
+        file.write("[MATH] .\n\nWe show that the bound holds for all inputs.")
+
+    boring = sentence_id(0, 0)
+    interesting = sentence_id(1, 0)
+
+    assert filters.is_boring_id(boring, "[MATH] .")
+    assert not filters.is_boring_id(
+        interesting, "We show that the bound holds for all inputs."
+    )
+
+    # flags computed for a different sentence are not used
+    assert not filters.is_boring_id(boring, "We show that the bound holds for all.")
+    assert filters.is_boring_id(sentence_id(5, 0), "# Intro")
@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+from diff_match_patch import diff_match_patch
 from hypothesis import given
 import hypothesis.strategies as st
 
@@ -18,3 +21,89 @@ def test_lcs(a, b):
     result = lcs.lcs(a, b)
     assert len(result) <= len(a)
     assert len(result) <= len(b)
+
+
+def reference_diff_sim(a, b):
+    # similarity.get_diff_sim(), through diff.line_diff(), without diff_match_patch's
+    # half-match heuristic (which can miss the longest common subsequence)
+    dmp = diff_match_patch()
+    dmp.Diff_Timeout = 0
+    line_text1, line_text2, line_arr = dmp.diff_linesToChars("\n".join(a), "\n".join(b))
+    diffs = dmp.diff_main(line_text1, line_text2, False)
+    dmp.diff_charsToLines(diffs, line_arr)
+
+    lines = []
+    for code, text in diffs:
+        text = text[:-1] if text[-1] == "\n" else text
+        lines.extend([code for _ in text.split("\n")])
+
+    original = len([code for code in lines if code in (-1, 0)])
+    new = len([code for code in lines if code in (1, 0)])
+
+    if not original or not new:
+        return 0
+
+    removed = lines.count(-1)
+    added = lines.count(1)
+
+    return 1 - (removed / original + added / new) / 2
+
+
+def reference_jaccard_sim(a, b):
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0
+    return len(a & b) / len(a | b)
+
+
+words = st.lists(st.sampled_from(["a", "b", "c", "d", "[MATH]"]), max_size=12)
+
+
+@given(words, words)
+def test_similarity_batch_matches_reference(a, b):
+    ids, offsets = lcs.intern([a, b])
+    scores = lcs.similarity_batch(ids, offsets, np.array([[0, 1]]))[0]
+
+    bigrams1 = [str(gram) for gram in zip(a, a[1:])]
+    bigrams2 = [str(gram) for gram in zip(b, b[1:])]
+
+    expected = [
+        reference_jaccard_sim(a, b),
+        reference_diff_sim(a, b),
+        reference_jaccard_sim(bigrams1, bigrams2),
+        reference_diff_sim(bigrams1, bigrams2),
+    ]
+
+    assert scores == pytest.approx(expected)
+
+
+def test_similarity_batch_many_pairs():
+    ids, offsets = lcs.intern([["a", "b", "c"], ["a", "b", "c"], [], ["c", "b"]])
+    pairs = np.array([[0, 1], [0, 2], [1, 3], [3, 3]])
+
+    scores = lcs.similarity_batch(ids, offsets, pairs)
+
+    assert scores.shape == (4, 4)
+    assert scores[0].tolist() == [1, 1, 1, 1]
+    assert scores[1].tolist() == [0, 0, 0, 0]
+    assert scores[3].tolist() == [1, 1, 1, 1]
+
+
+def test_similarity_batch_out_of_memory(monkeypatch):
+    ids, offsets = lcs.intern([["a"], ["b"]])
+    monkeypatch.setattr(lcs.lcsmodule, "similarityBatch", lambda *args: -1)
+
+    with pytest.raises(MemoryError):
+        lcs.similarity_batch(ids, offsets, np.array([[0, 1]]))
+
+
+def test_diff_sim_is_exact_lcs():
+    # diff_match_patch's default half-match heuristic scores this pair 0.5
+    a = ["b", "b", "a", "b", "a", "a"]
+    b = ["a", "b", "b", "b", "a", "b"]
+
+    ids, offsets = lcs.intern([a, b])
+    scores = lcs.similarity_batch(ids, offsets, np.array([[0, 1]]))[0]
+
+    assert scores[1] == pytest.approx(reference_diff_sim(a, b))
+    assert scores[1] == pytest.approx(2 / 3)
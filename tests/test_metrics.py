@@ -0,0 +1,54 @@
+import json
+import os
+
+from arxivedits import data, detex, metrics, state, tex
+
+
+def test_counters_are_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "METRICS_PATH", tmp_path / "metrics.json")
+    monkeypatch.setattr(data, "PROMETHEUS_PATH", tmp_path / "metrics.prom")
+
+    metrics.start("extract", queued=3)
+    metrics.record("extract", 100)
+    metrics.record("extract", failed=True)
+    metrics.finish("extract")
+
+    result = json.loads((tmp_path / "metrics.json").read_text())["extract"]
+
+    assert result["documents"] == 1
+    assert result["failures"] == 1
+    assert result["bytes"] == 100
+    assert result["queue_depth"] == 1
+
+    prometheus = (tmp_path / "metrics.prom").read_text()
+
+    assert 'arxivedits_documents_total{stage="extract"} 1' in prometheus
+    assert "# TYPE arxivedits_documents_total counter" in prometheus
+    assert "# TYPE arxivedits_queue_depth gauge" in prometheus
+
+
+def test_detex_all_reports_its_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(data, "METRICS_PATH", tmp_path / "metrics.json")
+    monkeypatch.setattr(data, "PROMETHEUS_PATH", tmp_path / "metrics.prom")
+
+    ids = [("1234.5678", 1), ("1234.5678", 2), ("1234.9999", 1)]
+    monkeypatch.setattr(data, "get_all_files", lambda: ids)
+
+    def fake_detex_file(latexpath, textpath, **kwargs):
+        os.makedirs(os.path.dirname(textpath), exist_ok=True)
+        with open(textpath, "w") as file:
+            file.write("Hello.")
+
+    monkeypatch.setattr(detex, "detex_file", fake_detex_file)
+
+    for arxivid, version in ids:
+        state.record(arxivid, version, state.EXTRACTED, "unused.tex")
+    state.record("1234.9999", 1, state.DETEXED, "unused.txt")
+
+    tex.detex_all()
+
+    assert metrics.STAGES["detex"].queued == 2
+    assert metrics.STAGES["detex"].documents == 2
+    assert metrics.STAGES["detex"].queue_depth == 0
@@ -45,3 +45,25 @@ def test_easy_tex():
 
     assert source.parse_filetype(mime, raw) == expected_filetype
 
+
+def test_sniff_signatures():
+    assert source.sniff_filetype(b"\x1f\x8b\x08\x00") == source.FileType.GZIP
+    assert source.sniff_filetype(b"%PDF-1.4\n") == source.FileType.PDF
+    assert (
+        source.sniff_filetype(b"%!PS-Adobe-3.0 EPSF-3.0\n")
+        == source.FileType.POSTSCRIPT
+    )
+    assert source.sniff_filetype(bytes(257) + b"ustar\x0000") == source.FileType.TAR
+    assert source.sniff_filetype(b"\x89PNG\r\n\x1a\n") == source.FileType.IMAGE
+
+
+def test_sniff_tex():
+    tex = b"% a comment\n\\documentclass[12pt]{article}\n\\begin{document}\n"
+
+    assert source.sniff_filetype(tex) == source.FileType.TEX
+
+
+def test_sniff_ambiguous():
+    # fragments without a \documentclass are left to magic
+    assert source.sniff_filetype(b"\\section{Introduction}\nHello.\n") is None
+    assert source.sniff_filetype(b"% \\documentclass{article}\n") is None
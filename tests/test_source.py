@@ -0,0 +1,193 @@
+import gzip
+import io
+import os
+import tarfile
+import time
+
+from arxivedits import data, source, state, store
+
+
+def make_tar(files):
+    buffer = io.BytesIO()
+
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    buffer.seek(0)
+    return tarfile.open(fileobj=buffer, mode="r")
+
+
+def test_tex_from_tar_resolves_includes_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    tar = make_tar(
+        {
+            "Main.tex": b"\\documentclass{article}\n\\begin{document}\n\\input{sections/Intro}\n\\end{document}\n",
+            "sections/Intro.tex": b"\\section{Introduction}\nHello world.\n",
+            "figure.png": b"\x89PNG\r\n\x1a\n" + bytes(64),
+        }
+    )
+
+    tex = source.tex_from_tar(tar)
+
+    assert tex is not None
+    assert "Hello world." in tex
+    assert r"\input" not in tex
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tex_from_tar_rereads_only_included_files(tmp_path, monkeypatch):
+    buffer = io.BytesIO()
+
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in {
+            "main.tex": b"\\documentclass{article}\n\\input{intro}\nThe end.\n",
+            "intro.tex": b"\\section{Introduction}\nHello world.\n",
+            "notes.tex": b"\\documentclass{article}\nSome notes.\n",
+        }.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    sourcefile = tmp_path / "source.tar.gz"
+    sourcefile.write_bytes(buffer.getvalue())
+
+    reads = []
+    read_tex_members = source.read_tex_members
+
+    def spy(tar, max_bytes=source.MAX_BYTES, names=None):
+        for filename, lines in read_tex_members(tar, max_bytes, names):
+            reads.append(filename)
+            yield filename, lines
+
+    monkeypatch.setattr(source, "read_tex_members", spy)
+
+    outfile = tmp_path / "paper.tex"
+    assert source.extract_file(str(sourcefile), str(outfile)) is None
+    assert outfile.read_text() == (
+        "\\documentclass{article}\n\\section{Introduction}\nHello world.\n\nThe end.\n"
+    )
+    assert sorted(reads) == [
+        "intro.tex",
+        "intro.tex",
+        "main.tex",
+        "main.tex",
+        "notes.tex",
+    ]
+
+
+def test_resolve_includes_handles_cycles():
+    files = {
+        "main.tex": [r"\documentclass{article}", r"\input{a}", "end"],
+        "a.tex": ["a", r"\input{b}"],
+        "b.tex": ["b", r"\input{a}", r"\input{missing}"],
+    }
+
+    resolved = source.resolve_includes(files)
+
+    assert resolved["main.tex"] == [r"\documentclass{article}", "a", "b", "end"]
+    assert resolved == source.resolve_includes(dict(reversed(list(files.items()))))
+
+
+def test_extract_file_streams_gzipped_tex(tmp_path):
+    tex = "\\documentclass{article}\n\\begin{document}\nCaf\u00e9 " * 10000
+
+    sourcefile = tmp_path / "source.gz"
+    sourcefile.write_bytes(gzip.compress(tex.encode("utf-8") + b"\xff"))
+
+    outfile = tmp_path / "paper.tex"
+
+    assert source.extract_file(str(sourcefile), str(outfile)) is None
+    assert outfile.read_text(encoding="utf-8") == tex
+
+    err = source.extract_file(str(sourcefile), str(outfile), max_bytes=1000)
+    assert isinstance(err, source.ExtractionError)
+    assert err.filetype == source.FileType.TEX
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["paper.tex", "source.gz"]
+
+
+def test_extract_all_skips_unchanged_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(data, "BLOB_DIR", tmp_path / "blobs")
+    monkeypatch.setattr(data, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(data, "EXTRACTION_LOG_PATH", tmp_path / "log.csv")
+    monkeypatch.setattr(data, "METRICS_PATH", tmp_path / "metrics.json")
+    monkeypatch.setattr(data, "PROMETHEUS_PATH", tmp_path / "metrics.prom")
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(data, "get_all_files", lambda: [("1234.5678", 1)])
+
+    sourcefile = data.source_path("1234.5678", 1)
+    os.makedirs(os.path.dirname(sourcefile))
+    with open(sourcefile, "wb") as file:
+        file.write(gzip.compress(b"\\documentclass{article}\nHello.\n"))
+
+    source.extract_all(again=True)
+    assert source.is_extracted("1234.5678", 1)
+    assert (
+        source.extraction_reason("1234.5678", 1, store.digest("1234.5678", 1)) is None
+    )
+
+    monkeypatch.setattr(source, "EXTRACTOR_VERSION", source.EXTRACTOR_VERSION + 1)
+    reason = source.extraction_reason("1234.5678", 1, store.digest("1234.5678", 1))
+    assert reason is not None and reason.startswith("extractor changed")
+
+    source.extract_all(again=True)
+
+    with open(data.EXTRACTION_LOG_PATH) as file:
+        reasons = [row.split(",")[-1].strip() for row in file]
+
+    assert reasons[0] == "never extracted"
+    assert reasons[1].startswith("extractor changed")
+    assert len(reasons) == 2
+
+
+def test_extract_all_in_parallel_records_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(data, "BLOB_DIR", tmp_path / "blobs")
+    monkeypatch.setattr(data, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(data, "EXTRACTION_LOG_PATH", tmp_path / "log.csv")
+    monkeypatch.setattr(data, "METRICS_PATH", tmp_path / "metrics.json")
+    monkeypatch.setattr(data, "PROMETHEUS_PATH", tmp_path / "metrics.prom")
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+
+    ids = [("1234.5678", 1), ("1234.5678", 2), ("1234.9999", 1)]
+    monkeypatch.setattr(data, "get_all_files", lambda: ids)
+
+    for arxivid, version in ids:
+        sourcefile = data.source_path(arxivid, version)
+        os.makedirs(os.path.dirname(sourcefile), exist_ok=True)
+        with open(sourcefile, "wb") as file:
+            file.write(gzip.compress(b"\\documentclass{article}\nHello.\n"))
+
+    source.extract_all(again=True, workers=2)
+
+    assert state.get_versions(state.EXTRACTED) == sorted(ids)
+
+
+def test_extract_parallel_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    slowpath = source.tmp_path(data.latex_path("slow", 1))
+
+    def fake_extract_cached(arxivid, version, sha256):
+        if arxivid == "slow":
+            os.makedirs(os.path.dirname(slowpath))
+            open(slowpath, "w").close()
+            time.sleep(10)
+        if arxivid == "bad":
+            return source.ExtractionError("not implemented", source.FileType.PDF)
+        return None
+
+    monkeypatch.setattr(source, "extract_cached", fake_extract_cached)
+
+    jobs = iter([("slow", 1, None), ("good", 1, None), ("bad", 1, None)])
+
+    results = source.extract_parallel(jobs, workers=2, timeout=1)
+
+    assert results[("good", 1)] is None
+    assert isinstance(results[("slow", 1)], source.ExtractionError)
+    assert results[("bad", 1)].filetype == source.FileType.PDF
+    assert not os.path.exists(slowpath)
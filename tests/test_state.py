@@ -0,0 +1,63 @@
+import os
+
+from arxivedits import data, state
+
+
+def test_stages_are_recorded_and_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+
+    textfile = tmp_path / "paper.txt"
+    textfile.write_text("Hello.")
+
+    state.record("math/0001001", 1, state.DETEXED, str(textfile))
+    state.record("1234.5678", 2, state.DETEXED, str(textfile))
+
+    assert state.count(state.DETEXED) == 2
+    assert state.count(state.SENTENCED) == 0
+    assert state.get_versions(state.DETEXED) == [("1234.5678", 2), ("math-0001001", 1)]
+
+    assert state.is_done("math/0001001", 1, state.DETEXED, str(textfile))
+
+    state.forget("math/0001001", 1, state.DETEXED)
+    assert state.count(state.DETEXED) == 1
+
+
+def test_is_done_trusts_the_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+
+    textfile = tmp_path / "paper.txt"
+    assert not state.is_done("1234.5678", 1, state.DETEXED, str(textfile))
+
+    textfile.write_text("Hello.")
+    assert not state.is_done("1234.5678", 1, state.DETEXED, str(textfile))
+
+    state.record("1234.5678", 1, state.DETEXED, str(textfile))
+    assert state.is_done("1234.5678", 1, state.DETEXED, str(textfile), verify=True)
+
+    # rewritten outside the pipeline
+    textfile.write_text("Hello again.")
+    assert state.is_done("1234.5678", 1, state.DETEXED, str(textfile))
+    assert not state.is_done("1234.5678", 1, state.DETEXED, str(textfile), verify=True)
+
+    # removed outside the pipeline
+    os.remove(textfile)
+    assert state.is_done("1234.5678", 1, state.DETEXED, str(textfile))
+    assert not state.is_done("1234.5678", 1, state.DETEXED, str(textfile), verify=True)
+    assert state.count(state.DETEXED) == 1
+
+
+def test_table_is_filled_when_created_and_rescanned_on_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path)
+
+    add_source(data.source_path("1234.5678", 1))
+    assert data.get_local_files() == [("1234.5678", 1)]  # new table: scanned
+
+    add_source(data.source_path("1234.9999", 1))
+    assert data.get_local_files() == [("1234.5678", 1)]
+    assert data.get_local_files(rescan=True) == [("1234.5678", 1), ("1234.9999", 1)]
+
+
+def add_source(sourcepath):
+    os.makedirs(os.path.dirname(sourcepath))
+    open(sourcepath, "w").close()
@@ -0,0 +1,42 @@
+import os
+
+from arxivedits import data, store
+
+
+def write_source(arxivid, version, content):
+    filepath = data.source_path(arxivid, version)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    with open(filepath, "wb") as file:
+        file.write(content)
+
+    return filepath
+
+
+def test_duplicate_sources_share_a_blob(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(data, "BLOB_DIR", tmp_path / "blobs")
+
+    v1 = write_source("1234.5678", 1, b"same bytes")
+    v2 = write_source("1234.5678", 2, b"same bytes")
+
+    digest1 = store.add("1234.5678", 1)
+    digest2 = store.add("1234.5678", 2)
+
+    assert digest1 == digest2 == store.digest("1234.5678", 2)
+    assert os.path.samefile(v1, v2)
+    assert store.verify("1234.5678", 1)
+
+
+def test_verify_and_restore(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(data, "BLOB_DIR", tmp_path / "blobs")
+
+    filepath = write_source("1234.5678", 1, b"original")
+    store.add("1234.5678", 1)
+
+    os.remove(filepath)
+    assert not store.verify("1234.5678", 1)
+
+    assert store.restore("1234.5678", 1)
+    assert store.verify("1234.5678", 1)
@@ -1,4 +1,7 @@
-from arxivedits.util import sliding_window, consecutive_values
+import numpy as np
+
+from arxivedits import data, state, util
+from arxivedits.util import sliding_window, consecutive_values, stack_windows
 
 
 def test_default_window():
@@ -91,3 +94,37 @@ def test_consecutive_values_end_of_list_false():
     actual_groups = consecutive_values(initial_list, comparison_test)
 
     assert actual_groups == expected_groups
+
+
+def test_stack_windows_matches_sliding_window():
+    matrix = np.arange(12, dtype=float).reshape(4, 3)
+
+    for size in range(1, 4):
+        expected = [
+            [value for row in window for value in row]
+            for window in sliding_window(matrix.tolist(), [0.0] * 3, size)
+        ]
+
+        assert stack_windows(matrix, size).tolist() == expected
+
+
+def test_stack_windows_empty():
+    assert stack_windows(np.zeros((0, 3)), 2).shape == (0, 15)
+
+
+def test_log_how_many_counts_the_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DB_FILE_NAME", str(tmp_path / "test.sqlite3"))
+    monkeypatch.setattr(
+        data, "get_all_files", lambda: [("1234.5678", 1), ("1234.5678", 2)]
+    )
+
+    def stat_per_file(*args):
+        raise AssertionError("log_how_many should not look at the disk")
+
+    monkeypatch.setattr(state, "is_done", stat_per_file)
+
+    state.record("1234.5678", 1, state.DETEXED, str(tmp_path / "missing.txt"))
+    assert not util.log_how_many(state.DETEXED, "detexed")
+
+    state.record("1234.5678", 2, state.DETEXED, str(tmp_path / "missing.txt"))
+    assert util.log_how_many(state.DETEXED, "detexed")